@@ -25,7 +25,7 @@ def get_ai_response(user_message, action_type, language='en', device_model='unkn
         model = genai.GenerativeModel(MODEL)
 
         # get current Wi-Fi network ssid & bssid
-        wifi_info = get_current_wifi()
+        wifi_info = get_current_wifi() or {}
         ssid = wifi_info.get('ssid', '')
         bssid = wifi_info.get('bssid', '')
 
@@ -1,24 +1,24 @@
 import json
 
 from speedtest_service import load_history
-from wifi_service import scan_networks
+from survey_store import load_points
+from wifi_service import get_networks
 
 
 # get stored scan data
 def get_scan_json():
-    # TODO: Replace with precomputed results (maybe save scan results into JSON and replace it
-    #  with each scan)
-    networks = scan_networks()
+    # останній результат сканування, якщо він ще свіжий (див. SCAN_CACHE_TTL)
+    networks = get_networks()
     return json.dumps(networks)
 
 
 def get_heatmap_json():
-    with open('heatmap_points.json', 'r') as f:
-        try:
-            return f.read()
-        except Exception as e:
-            print('Failed to load all heatmap points...')
-            print(str(e))
+    # точки останнього обходу зі сховища
+    try:
+        return json.dumps(load_points(), ensure_ascii=False)
+    except Exception as e:
+        print('Failed to load all heatmap points...')
+        print(str(e))
     return ''
 
 
@@ -0,0 +1,277 @@
+"""
+Heatmap performance benchmark.
+
+Runs fully offline on synthetic surveys and writes machine-readable JSON, so runs
+from different commits can be compared. Every case runs in a fresh process, so
+peak RSS is per case.
+
+    cd backend-py
+    python -m benchmarks.heatmap_bench
+    python -m benchmarks.heatmap_bench --points 100,1000,10000 --sizes 1920x1080 \\
+        --kernels multiquadric,thin_plate_spline --renderers direct --endpoint
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_OUTPUT = "heatmap_bench_results.json"
+
+
+def synthetic_survey(n_points: int, n_aps: int = 4, seed: int = 0):
+    """
+    Points scattered over a 0..100 floor with log-distance path loss from n_aps
+    access points plus 3 dB shadowing, clipped to the usual scan RSSI range.
+    """
+    from heatmap import SurveyPoint
+
+    rng = np.random.default_rng(seed)
+    aps = rng.uniform(0, 100, (n_aps, 2))
+    tx_power = rng.uniform(-35, -25, n_aps)
+    coords = rng.uniform(0, 100, (n_points, 2))
+
+    dist = np.linalg.norm(coords[:, None, :] - aps[None, :, :], axis=2)
+    rssi = tx_power[None, :] - 30 * np.log10(1 + dist)
+    rssi = rssi.max(axis=1) + rng.normal(0, 3, n_points)
+    rssi = np.clip(np.round(rssi), -95, -20).astype(int)
+
+    return [SurveyPoint(float(x), float(y), int(r)) for (x, y), r in zip(coords, rssi)]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: кілобайти, macOS: байти
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _process_peak_rss_mb(pid: int):
+    """Peak RSS of another live process (VmHWM); None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _median_timings(runs, key):
+    values = [run[key] for run in runs if key in run]
+    return round(statistics.median(values), 5) if values else None
+
+
+def run_render_case(case: dict) -> dict:
+    """
+    heatmap.generate_smooth_heatmap, the same call the render workers make, per
+    configuration (runs in a child process): cold (empty caches), resize (same
+    points, half the canvas - the fitted interpolator is reused) and warm (PNG cache).
+    """
+    import heatmap
+
+    width, height = case["width"], case["height"]
+    options = {
+        "renderer": case["renderer"], "engine": case["engine"], "kernel": case["kernel"],
+        "max_samples": case["max_samples"],
+    }
+    cold, resize, warm = [], [], []
+    size = 0
+
+    for repeat in range(case["repeat"]):
+        points = synthetic_survey(case["points"], seed=case["seed"] + repeat)
+        heatmap.clear_caches()
+
+        for runs, canvas in ((cold, (width, height)), (resize, (width // 2, height // 2)),
+                             (warm, (width // 2, height // 2))):
+            timings = {}
+            t0 = time.perf_counter()
+            png_bytes = heatmap.generate_smooth_heatmap(points, *canvas, timings=timings, **options)
+            timings["total_s"] = time.perf_counter() - t0
+            runs.append(timings)
+            if runs is cold:
+                size = len(png_bytes)
+
+    result = dict(case)
+    result["engine_used"] = heatmap.select_engine(case["points"]) if case["engine"] == "auto" else case["engine"]
+    result["lattice"] = cold[-1]["lattice"]
+    for key in ("fit_s", "eval_s", "encode_s", "total_s"):
+        result[key] = _median_timings(cold, key)
+    result["resize_fit_s"] = _median_timings(resize, "fit_s")
+    result["resize_total_s"] = _median_timings(resize, "total_s")
+    result["warm_total_s"] = _median_timings(warm, "total_s")
+    result["png_bytes"] = size
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_endpoint_case(case: dict) -> dict:
+    """
+    Latency of POST /api/generate_heatmap/png through the whole app, cold and cached.
+    Peak RSS is reported for the API process and for the render pool workers.
+    """
+    # бекенд пише свої файли (surveys.db, ...) у поточну папку - не чіпаємо робочі дані
+    os.chdir(tempfile.mkdtemp(prefix="heatmap_bench_"))
+
+    from fastapi.testclient import TestClient
+    import main
+
+    latencies = []
+    size = 0
+    worker_rss = {}
+    with TestClient(main.app) as client:
+        for repeat in range(case["repeat"]):
+            points = synthetic_survey(case["points"], seed=case["seed"] + repeat)
+            payload = {
+                "points": [{"x": p.x, "y": p.y, "rssi": p.rssi} for p in points],
+                "ssid": "bench",
+                "width": case["width"],
+                "height": case["height"],
+                "all_points_json": "[]",
+                "survey_id": "benchmark",
+            }
+            t0 = time.perf_counter()
+            response = client.post("/api/generate_heatmap/png", json=payload)
+            cold = time.perf_counter() - t0
+            response.raise_for_status()
+            size = len(response.content)
+
+            t0 = time.perf_counter()
+            client.post("/api/generate_heatmap/png", json=payload).raise_for_status()
+            warm = time.perf_counter() - t0
+            latencies.append((cold, warm))
+
+        # воркери ще живі - знімаємо їхній пік до зупинки пулу
+        for pid in main.heatmap_pool.stats()["worker_pids"]:
+            worker_rss[pid] = _process_peak_rss_mb(pid)
+
+    result = dict(case)
+    result["cold_s"] = round(statistics.median(c for c, _ in latencies), 5)
+    result["cached_s"] = round(statistics.median(w for _, w in latencies), 5)
+    result["png_bytes"] = size
+    result["peak_rss_mb"] = _peak_rss_mb()
+    known = [rss for rss in worker_rss.values() if rss is not None]
+    result["worker_peak_rss_mb"] = max(known) if known else None
+    result["workers_used"] = len(worker_rss)
+    return result
+
+
+def _run_isolated(fn, case: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        try:
+            return pool.submit(fn, case).result()
+        except Exception as e:
+            return {**case, "error": str(e)}
+
+
+def _meta() -> dict:
+    import scipy
+
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], encoding="utf-8", stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _csv(value, cast=str):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def _size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", default="50,200,1000", help="comma-separated point counts")
+    parser.add_argument("--sizes", default="400x300,1280x720", help="comma-separated WxH canvases")
+    parser.add_argument("--kernels", default="multiquadric", help="RBF kernels (ignored by idw)")
+    parser.add_argument("--engines", default="auto", help="auto, rbf, rbf_local, idw")
+    parser.add_argument("--renderers", default="direct,matplotlib", help="direct, matplotlib")
+    parser.add_argument("--max-samples", type=int, default=None,
+                        help="lattice cap, 0 = per-pixel (default: heatmap.GRID_MAX_SAMPLES)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--endpoint", action="store_true", help="also benchmark the HTTP endpoint")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    import heatmap
+    max_samples = heatmap.GRID_MAX_SAMPLES if args.max_samples is None else (args.max_samples or None)
+
+    results = []
+    for n_points in _csv(args.points, int):
+        for width, height in _csv(args.sizes, _size):
+            for engine in _csv(args.engines):
+                kernels = ["-"] if engine == "idw" else _csv(args.kernels)
+                for kernel in kernels:
+                    for renderer in _csv(args.renderers):
+                        case = {
+                            "kind": "render", "points": n_points, "width": width, "height": height,
+                            "engine": engine, "kernel": kernel if kernel != "-" else heatmap.RBF_KERNEL,
+                            "renderer": renderer, "max_samples": max_samples,
+                            "repeat": args.repeat, "seed": args.seed,
+                        }
+                        result = _run_isolated(run_render_case, case)
+                        results.append(result)
+                        print(_format_row(result), flush=True)
+
+            if args.endpoint:
+                case = {"kind": "endpoint", "points": n_points, "width": width, "height": height,
+                        "repeat": args.repeat, "seed": args.seed}
+                result = _run_isolated(run_endpoint_case, case)
+                results.append(result)
+                print(_format_row(result), flush=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(), "results": results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+def _format_row(result: dict) -> str:
+    head = f"{result['kind']:<8} n={result['points']:<6} {result['width']}x{result['height']:<5}"
+    if "error" in result:
+        return f"{head} ERROR {result['error']}"
+    if result["kind"] == "endpoint":
+        return (f"{head} cold={result['cold_s']:.3f}s cached={result['cached_s']:.3f}s "
+                f"png={result['png_bytes']}B rss={result['peak_rss_mb']}MB "
+                f"worker_rss={result['worker_peak_rss_mb']}MB")
+    return (f"{head} {result['engine_used']:<9} {result['kernel']:<13} {result['renderer']:<10} "
+            f"fit={result['fit_s']:.3f}s eval={result['eval_s']:.3f}s encode={result['encode_s']:.3f}s "
+            f"resize={result['resize_total_s']:.3f}s warm={result['warm_total_s']:.4f}s "
+            f"png={result['png_bytes']}B rss={result['peak_rss_mb']}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Scan pipeline load benchmark on the synthetic RF environment (rf_simulator).
+
+Measures per-stage latency (backend, enrich, triggers, listeners, assistant
+JSON), end-to-end scans/sec through the scan coordinator and peak RSS, for a
+growing number of APs. Every case runs in a fresh process; fully offline.
+
+    cd backend-py
+    python -m benchmarks.scan_bench
+    python -m benchmarks.scan_bench --aps 100,1000,5000,20000,50000 --scans 20 --budget 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.heatmap_bench import _meta, _peak_rss_mb, _csv
+
+DEFAULT_OUTPUT = "scan_bench_results.json"
+STAGES = ["backend", "enrich", "triggers", "stream", "rssi_history", "assistant_json"]
+
+
+def run_scan_case(case: dict) -> dict:
+    """Runs case["scans"] scans of case["aps"] APs stage by stage (in a child process)."""
+    # тригери пишуть notifications.json у поточну папку - не чіпаємо робочі дані
+    os.chdir(tempfile.mkdtemp(prefix="scan_bench_"))
+
+    import scan_backends
+    import wifi_service
+    from ai_assistant.data_preparation import get_scan_json
+    from rf_simulator import SyntheticBackend, SyntheticEnvironment
+    from rssi_history import RSSIHistory
+    from scan_stream import ScanStream
+    from triggers import check_scan_results
+
+    t0 = time.perf_counter()
+    backend = SyntheticBackend(SyntheticEnvironment(case["aps"], seed=case["seed"]))
+    setup_s = time.perf_counter() - t0
+    scan_backends.set_scan_backend(backend)
+
+    stream = ScanStream()
+    history = RSSIHistory(directory="")
+    timings = {stage: [] for stage in STAGES}
+    networks_seen = []
+
+    for _ in range(case["scans"]):
+        t = time.perf_counter()
+        raw = backend.scan()
+        timings["backend"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        seen, rows = set(), []
+        for network in raw:
+            if network.bssid not in seen:
+                seen.add(network.bssid)
+                rows.append(network)
+        networks = sorted((r.as_dict() for r in wifi_service.enrich_scan(rows)),
+                          key=lambda x: x["rssi"], reverse=True)
+        timings["enrich"].append(time.perf_counter() - t)
+        networks_seen.append(len(networks))
+
+        t = time.perf_counter()
+        check_scan_results(networks)
+        timings["triggers"].append(time.perf_counter() - t)
+
+        scanned_at = time.time()
+        t = time.perf_counter()
+        stream.publish(networks, scanned_at)
+        timings["stream"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        history.record(networks, scanned_at)
+        timings["rssi_history"].append(time.perf_counter() - t)
+
+    # наскрізно: координатор + слухачі, як у main.py
+    coordinator = wifi_service.scan_coordinator
+    coordinator.add_listener(stream.publish)
+    coordinator.add_listener(history.record)
+    t = time.perf_counter()
+    for _ in range(case["scans"]):
+        coordinator.get(max_age=0)
+    e2e_s = (time.perf_counter() - t) / case["scans"]
+
+    # асистент бере свіжий результат з кешу координатора
+    for _ in range(case["scans"]):
+        t = time.perf_counter()
+        payload = get_scan_json()
+        timings["assistant_json"].append(time.perf_counter() - t)
+
+    result = dict(case)
+    result["networks"] = round(statistics.mean(networks_seen))
+    result["setup_s"] = round(setup_s, 5)
+    for stage, values in timings.items():
+        result[f"{stage}_ms"] = round(statistics.median(values) * 1000, 3)
+    result["scan_ms"] = round(e2e_s * 1000, 3)
+    result["scans_per_s"] = round(1 / e2e_s, 2) if e2e_s else None
+    result["assistant_json_bytes"] = len(payload)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _run_isolated(case: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        try:
+            return pool.submit(run_scan_case, case).result()
+        except Exception as e:
+            return {**case, "error": str(e)}
+
+
+def _format_row(result: dict) -> str:
+    head = f"aps={result['aps']:<7}"
+    if "error" in result:
+        return f"{head} ERROR {result['error']}"
+    stages = " ".join(f"{stage}={result[f'{stage}_ms']:.1f}" for stage in STAGES)
+    return (f"{head} nets={result['networks']:<7} {stages} ms | scan={result['scan_ms']:.1f}ms "
+            f"({result['scans_per_s']}/s) rss={result['peak_rss_mb']}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aps", default="100,1000,5000,20000", help="comma-separated AP counts")
+    parser.add_argument("--scans", type=int, default=10, help="scans per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=float, default=10.0,
+                        help="seconds one scan may take end to end (background scan interval)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = []
+    breaking_point = None
+    for n_aps in _csv(args.aps, int):
+        result = _run_isolated({"aps": n_aps, "scans": args.scans, "seed": args.seed})
+        results.append(result)
+        print(_format_row(result), flush=True)
+        if breaking_point is None and ("error" in result or result["scan_ms"] / 1000 > args.budget):
+            breaking_point = n_aps
+
+    if breaking_point is None:
+        print(f"All cases fit the {args.budget}s budget")
+    else:
+        print(f"Over the {args.budget}s budget from {breaking_point} APs")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(), "budget_s": args.budget, "breaking_point": breaking_point,
+                   "results": results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
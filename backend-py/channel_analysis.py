@@ -0,0 +1,220 @@
+import math
+
+import numpy as np
+
+# Ширина каналу (МГц) мереж, для яких скан її не віддає (pywifi, netsh),
+# і каналів-кандидатів без поточної точки доступу
+CHANNEL_WIDTH_MHZ = 20
+
+# Кандидати для рекомендації: у 2.4 ГГц тільки канали, що не перекриваються
+CANDIDATE_CHANNELS = {
+    "2.4": [1, 6, 11],
+    "5": [36, 40, 44, 48, 52, 56, 60, 64, 100, 104, 108, 112, 116, 120, 124, 128,
+          132, 136, 140, 144, 149, 153, 157, 161, 165],
+    # нумерація як у wifi_service.get_wifi_details: (freq - 5930) // 5
+    "6": [(5955 + 20 * k - 5930) // 5 for k in range(59)],
+}
+
+# Сповіщення: мінімум перекритих мереж і виграш (дБ), щоб радити змінити канал
+CONGESTION_MIN_NETWORKS = 5
+CONGESTION_MIN_GAIN_DB = 6.0
+
+
+def channel_center_mhz(channel, band):
+    """Inverse of wifi_service.get_wifi_details; None for unknown bands."""
+    try:
+        ch = int(channel)
+    except (TypeError, ValueError):
+        return None
+    if band == "2.4":
+        return 2484 if ch == 14 else 2407 + 5 * ch
+    if band == "5":
+        return 5000 + 5 * ch
+    if band == "6":
+        return 5930 + 5 * ch
+    return None
+
+
+def normalize_bssid(bssid) -> str:
+    """
+    Comparable BSSID: hex digits only, lower case. pywifi on Windows formats MACs
+    with a trailing colon ("aa:bb:...:ff:"), netsh and Linux tools do not.
+    """
+    return "".join(c for c in str(bssid or "").lower() if c in "0123456789abcdef")
+
+
+def channel_width_mhz(network) -> int:
+    """Channel width the scan reported for the network, CHANNEL_WIDTH_MHZ if none."""
+    try:
+        width = int(network.get("width") or 0)
+    except (TypeError, ValueError):
+        width = 0
+    return width if width > 0 else CHANNEL_WIDTH_MHZ
+
+
+def _overlap(candidate_mhz, ap_mhz, width_mhz):
+    """
+    Spectral overlap factor 0..1 of two channels, with width_mhz the wider of the
+    two: 1 on the same channel, 0.75 one 2.4 GHz channel apart (5 MHz) at 20 MHz,
+    0 from width_mhz apart. Channels are placed at their primary 20 MHz centre,
+    since scans do not report where a bonded channel sits.
+    Shapes broadcast: (C, 1) x (1, N) -> (C, N).
+    """
+    return np.clip(1.0 - np.abs(candidate_mhz - ap_mhz) / width_mhz, 0.0, 1.0)
+
+
+def _to_dbm(power_mw):
+    return round(10 * math.log10(power_mw), 1) if power_mw > 0 else None
+
+
+def analyze_channels(networks, current_bssid=None):
+    """
+    Interference score for every channel in the bands present in the scan.
+
+    All channels are scored in one pass over an RSSI-weighted overlap matrix:
+    interference(c) = sum_i overlap(c, i) * 10^(rssi_i / 10), in dBm, where the
+    overlap uses the wider of the two channel widths. Candidates in the current
+    AP's band take its width. The current AP (current_bssid) is left out, since it
+    does not interfere with itself, and the least-interfered candidate channel in
+    its band is recommended.
+    """
+    current_bssid = normalize_bssid(current_bssid) or None
+
+    current = None
+    ap_bands, ap_mhz, ap_mw, ap_width = [], [], [], []
+    for n in networks:
+        center = channel_center_mhz(n.get("channel"), n.get("band"))
+        if center is None:
+            continue
+        if current_bssid and normalize_bssid(n.get("bssid")) == current_bssid:
+            current = n
+            continue
+        try:
+            rssi = float(n.get("rssi"))
+        except (TypeError, ValueError):
+            continue
+        ap_bands.append(n["band"])
+        ap_mhz.append(center)
+        ap_mw.append(10 ** (rssi / 10))
+        ap_width.append(channel_width_mhz(n))
+
+    bands = sorted(set(ap_bands) | ({current["band"]} if current else set()))
+    # канали-кандидати всіх смуг плюс канали, на яких реально є мережі
+    cand_bands, cand_channels = [], []
+    for band in bands:
+        used = {int(n["channel"]) for n in networks
+                if n.get("band") == band and channel_center_mhz(n.get("channel"), band) is not None}
+        for ch in sorted(set(CANDIDATE_CHANNELS[band]) | used):
+            cand_bands.append(band)
+            cand_channels.append(ch)
+
+    cand_mhz = np.array([channel_center_mhz(c, b) for c, b in zip(cand_channels, cand_bands)], dtype=float)
+    ap_mhz = np.array(ap_mhz, dtype=float)
+    ap_mw = np.array(ap_mw, dtype=float)
+    # кандидат у смузі поточної точки доступу - канал її ширини, інші - CHANNEL_WIDTH_MHZ
+    current_width = channel_width_mhz(current) if current else CHANNEL_WIDTH_MHZ
+    cand_width = np.array([current_width if current and band == current["band"] else CHANNEL_WIDTH_MHZ
+                           for band in cand_bands], dtype=float)
+    ap_width = np.array(ap_width, dtype=float)
+
+    # (C, N): перекриття лише в межах однієї смуги, по ширшому з двох каналів
+    same_band = np.array(cand_bands, dtype=object)[:, None] == np.array(ap_bands, dtype=object)[None, :]
+    width = np.maximum(cand_width[:, None], ap_width[None, :])
+    overlap = _overlap(cand_mhz[:, None], ap_mhz[None, :], width) * same_band
+    power = overlap @ ap_mw if len(ap_mw) else np.zeros(len(cand_mhz))
+    overlapping = (overlap > 0).sum(axis=1) if len(ap_mw) else np.zeros(len(cand_mhz), dtype=int)
+    co_channel = (overlap >= 1.0).sum(axis=1) if len(ap_mw) else np.zeros(len(cand_mhz), dtype=int)
+
+    scores = {band: [] for band in bands}
+    for i, (band, ch) in enumerate(zip(cand_bands, cand_channels)):
+        scores[band].append({
+            "channel": ch,
+            "interference_dbm": _to_dbm(power[i]),
+            "networks": int(overlapping[i]),
+            "co_channel": int(co_channel[i]),
+            "candidate": ch in CANDIDATE_CHANNELS[band],
+            "_power": float(power[i]),
+        })
+
+    best = {}
+    for band, rows in scores.items():
+        candidates = [r for r in rows if r["candidate"]]
+        best[band] = min(candidates, key=lambda r: (r["_power"], r["channel"]))
+
+    recommendation = None
+    current_info = None
+    if current is not None:
+        band = current["band"]
+        now = next(r for r in scores[band] if r["channel"] == int(current["channel"]))
+        target = best[band]
+        gain = _gain_db(now["_power"], target["_power"])
+        current_info = {
+            "bssid": current.get("bssid"),
+            "ssid": current.get("ssid"),
+            "band": band,
+            "channel": int(current["channel"]),
+            "interference_dbm": now["interference_dbm"],
+            "networks": now["networks"],
+        }
+        recommendation = {
+            "band": band,
+            "channel": target["channel"],
+            "interference_dbm": target["interference_dbm"],
+            "gain_db": gain,
+            "switch": target["channel"] != now["channel"] and gain >= CONGESTION_MIN_GAIN_DB,
+        }
+
+    for rows in scores.values():
+        for r in rows:
+            r.pop("_power")
+
+    return {
+        "bands": scores,
+        "best": {band: r["channel"] for band, r in best.items()},
+        "current": current_info,
+        "recommendation": recommendation,
+    }
+
+
+def _gain_db(from_mw, to_mw):
+    """How much less interference (dB) the target channel has; capped for empty channels."""
+    if from_mw <= 0:
+        return 0.0
+    if to_mw <= 0:
+        return 99.0
+    return round(10 * math.log10(from_mw / to_mw), 1)
+
+
+def congestion_alerts(analysis):
+    """
+    Notification source: (key, title, description) for the analysis; key identifies
+    the alert (AP / band and channel) so the caller can rate-limit repeats.
+    With a known current AP - one alert if switching its channel is worth it;
+    otherwise one per band whose busiest used channel overlaps many networks.
+    """
+    recommendation = analysis.get("recommendation")
+    current = analysis.get("current")
+    if current is not None:
+        if recommendation and recommendation["switch"]:
+            return [(
+                (current["bssid"], current["channel"]),
+                "Channel Congestion",
+                f"Your network {current['ssid'] or current['bssid']} on channel {current['channel']} "
+                f"({current['band']} GHz) overlaps {current['networks']} networks. "
+                f"Channel {recommendation['channel']} has {recommendation['gain_db']} dB less interference."
+            )]
+        return []
+
+    alerts = []
+    for band, rows in analysis["bands"].items():
+        busiest = max((r for r in rows if r["co_channel"]), key=lambda r: r["networks"], default=None)
+        if busiest is None or busiest["networks"] <= CONGESTION_MIN_NETWORKS:
+            continue
+        best_channel = analysis["best"][band]
+        alerts.append((
+            (band, busiest["channel"]),
+            "Channel Congestion",
+            f"Channel {busiest['channel']} ({band} GHz) is very crowded "
+            f"({busiest['networks']} overlapping networks). Channel {best_channel} is the least congested."
+        ))
+    return alerts
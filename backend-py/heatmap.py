@@ -1,40 +1,401 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata, RBFInterpolator
+from scipy.interpolate import RBFInterpolator
+from scipy.spatial import cKDTree
 from PIL import Image
+from collections import OrderedDict, namedtuple
+import hashlib
 import io
+import math
+import threading
+import time
 
 
-def generate_smooth_heatmap(points, width: int, height: int) -> bytes:
-    print(f'points {points}')
+MIN_RSSI = -90
+MAX_RSSI = -30
 
-    if not points:
-        img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        buf = io.BytesIO()
-        img.save(buf, format='PNG')
-        return buf.getvalue()
+# Прозорість шару теплової карти (як alpha=0.9 у pcolormesh)
+HEATMAP_ALPHA = 0.9
 
-    MIN_RSSI = -90
-    MAX_RSSI = -30
+RBF_KERNEL = 'multiquadric'
+RBF_EPSILON = 1
 
-    coords = np.array([[p.x, p.y] for p in points])
-    rssi_values = np.array([p.rssi for p in points])
-    normalized_values = np.clip((rssi_values - MIN_RSSI) / (MAX_RSSI - MIN_RSSI), 0, 1)
+# Вибір рушія інтерполяції за кількістю точок (engine='auto'):
+#   N <= DENSE_MAX_POINTS            -> 'rbf'       (глобальний RBF, O(N^3) підгонка)
+#   N <= LOCAL_RBF_MAX_POINTS        -> 'rbf_local' (RBF по K найближчих сусідах, KD-дерево)
+#   інакше                           -> 'idw'       (зважування 1/d^p по KD-дереву)
+#
+# Точність відносно 'rbf' (нормалізований сигнал 0..1, синтетичний обхід з
+# 4 точками доступу та шумом 2 dB, сітка 200x150):
+#   N      rbf_local MAE / max    idw MAE / max
+#   100    0.0001 / 0.003         0.020 / 0.10
+#   1000   0.0001 / 0.004         0.017 / 0.39
+#   3000   0.0002 / 0.008         0.028 / 0.58
+# Час підгонка + обчислення сітки 200x150 (одне ядро):
+#   N        rbf                   rbf_local   idw
+#   100      0.04 s                0.9 s       0.04 s
+#   1000     0.2 s                 2.2 s       0.06 s
+#   3000     1.3 s                 3.2 s       0.08 s
+#   10000    не запускали (~1 GB)  2.6 s       0.08 s
+#   50000    не запускали          3.1 s       0.11 s
+DENSE_MAX_POINTS = 3000
+LOCAL_RBF_MAX_POINTS = 20000
+LOCAL_RBF_NEIGHBORS = 64
+IDW_NEIGHBORS = 12
+IDW_POWER = 2
 
-    # 2. Інтерполяція (RBFInterpolator)
+# Роздільність обчислення: RBF рахується на грубішій решітці і білінійно
+# розтягується до (width, height). Поле сигналу гладке, тому різниці не видно.
+GRID_MAX_SAMPLES = 40000          # максимум вузлів решітки (~267x150 для 16:9)
+AUTO_START_SAMPLES = 32           # вузлів по довшій стороні на старті авто-режиму
+DEFAULT_MAX_ERROR = 0.01          # допустима похибка авто-режиму (частка шкали 0..1)
+
+# Карта покриття: поріг мертвої зони та запас сигналу, нижче якого клієнт може роумити
+DEAD_ZONE_RSSI = -75
+ROAMING_MARGIN_DB = 5
+
+# Категоріальна палітра для точок доступу (повторюється по колу)
+COVERAGE_PALETTE = np.array([
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207),
+    (174, 199, 232), (255, 187, 120), (152, 223, 138), (255, 152, 150), (197, 176, 213),
+    (196, 156, 148), (247, 182, 210), (199, 199, 199), (219, 219, 141), (158, 218, 229),
+], dtype=np.uint8)
+DEAD_ZONE_COLOR = (40, 40, 40, 200)
+
+# Розміри LRU кешів (кількість записів)
+INTERPOLATOR_CACHE_SIZE = 32
+PNG_CACHE_SIZE = 64
+
+# Точка вимірювання у вигляді, який можна передати в інший процес (pickle)
+SurveyPoint = namedtuple('SurveyPoint', ['x', 'y', 'rssi'])
+
+# Опорні точки колірної карти 'jet' з matplotlib (x, значення)
+_JET_SEGMENTS = {
+    'red': ((0.0, 0.0), (0.35, 0.0), (0.66, 1.0), (0.89, 1.0), (1.0, 0.5)),
+    'green': ((0.0, 0.0), (0.125, 0.0), (0.375, 1.0), (0.64, 1.0), (0.91, 0.0), (1.0, 0.0)),
+    'blue': ((0.0, 0.5), (0.11, 1.0), (0.34, 1.0), (0.65, 0.0), (1.0, 0.0)),
+}
+
+
+def _build_jet_r_lut(size: int = 256) -> np.ndarray:
+    """Builds a (size, 4) uint8 RGBA lookup table equal to matplotlib's 'jet_r'."""
+    xs = np.linspace(0, 1, size)
+    lut = np.empty((size, 4), dtype=np.uint8)
+    for channel, name in enumerate(('red', 'green', 'blue')):
+        seg_x, seg_y = zip(*_JET_SEGMENTS[name])
+        # matplotlib переводить float -> uint8 відкиданням дробової частини
+        lut[:, channel] = (np.interp(xs, seg_x, seg_y) * 255).astype(np.uint8)
+    lut[:, 3] = round(HEATMAP_ALPHA * 255)
+    # '_r' - розвернута карта: сильний сигнал червоний, слабкий синій
+    return lut[::-1].copy()
+
+
+JET_R_LUT = _build_jet_r_lut()
+
+# Версія рендера: міняємо разом з растеризатором, щоб старі ETag перестали збігатися
+HEATMAP_RENDER_VERSION = 1
+_LUT_DIGEST = hashlib.sha1(JET_R_LUT.tobytes()).hexdigest()[:8]
+
+
+class LRUCache:
+    """Small thread-safe LRU cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Рівень 1: підігнані інтерполятори, рівень 2: готові PNG
+_interpolator_cache = LRUCache(INTERPOLATOR_CACHE_SIZE)
+_png_cache = LRUCache(PNG_CACHE_SIZE)
+
+
+def get_cache_stats() -> dict:
+    return {
+        "interpolator": _interpolator_cache.stats(),
+        "png": _png_cache.stats(),
+    }
+
+
+def clear_caches():
+    _interpolator_cache.clear()
+    _png_cache.clear()
+
+
+def _points_to_arrays(points):
+    coords = np.array([[p.x, p.y] for p in points], dtype=np.float64)
+    rssi_values = np.array([p.rssi for p in points], dtype=np.float64)
+    return coords, rssi_values
+
+
+def points_digest(coords: np.ndarray, rssi_values: np.ndarray) -> str:
+    """Stable hash of a point set (order-sensitive, as RBF input is)."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(rssi_values, dtype=np.float64).tobytes())
+    return h.hexdigest()
 
-    # Створення сітки (H, W) для вихідних точок
-    grid_x, grid_y = np.mgrid[0:100:complex(0, width), 0:100:complex(0, height)]
 
-    # Перетворення сітки (H, W) на вектор точок (W*H, 2)
+class IDWInterpolator:
+    """Inverse-distance weighting over the k nearest points (cKDTree); values may be (N,) or (N, K)."""
+
+    def __init__(self, coords, values, neighbors: int = IDW_NEIGHBORS, power: float = IDW_POWER):
+        self.tree = cKDTree(coords)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.neighbors = min(neighbors, len(self.values))
+        self.power = power
+
+    def __call__(self, xi):
+        dist, idx = self.tree.query(xi, k=self.neighbors)
+        if self.neighbors == 1:
+            return self.values[idx]
+
+        # точка збігається з виміром -> беремо виміряне значення
+        exact = dist[:, 0] == 0
+        dist[exact] = 1.0
+        weights = 1.0 / dist ** self.power
+        weights /= weights.sum(axis=1, keepdims=True)
+        result = np.einsum('ij,ij...->i...', weights, self.values[idx])
+        result[exact] = self.values[idx[exact, 0]]
+        return result
+
+
+def select_engine(n_points: int) -> str:
+    if n_points <= DENSE_MAX_POINTS:
+        return 'rbf'
+    if n_points <= LOCAL_RBF_MAX_POINTS:
+        return 'rbf_local'
+    return 'idw'
+
+
+def heatmap_points_digest(points) -> str:
+    """points_digest of SurveyPoint-like objects (anything with x, y and rssi)."""
+    return points_digest(*_points_to_arrays(points))
+
+
+def heatmap_etag(points, width: int, height: int, renderer: str = 'direct', engine: str = 'auto',
+                 pixels_per_sample=None, max_samples=GRID_MAX_SAMPLES, max_error=None,
+                 kernel=RBF_KERNEL) -> str:
+    """
+    Strong ETag for the PNG generate_smooth_heatmap produces with the same arguments:
+    the point set, canvas size and render config (resolved engine, lattice settings,
+    renderer, LUT and HEATMAP_RENDER_VERSION).
+    """
+    if engine == 'auto':
+        engine = select_engine(len(points))
+    config = repr((HEATMAP_RENDER_VERSION, _LUT_DIGEST, renderer, engine, kernel,
+                   pixels_per_sample, max_samples, max_error))
+    config_digest = hashlib.sha1(config.encode('utf-8')).hexdigest()[:8]
+    return f'"{heatmap_points_digest(points)}-{width}x{height}-{config_digest}"'
+
+
+def _get_interpolator(digest: str, coords, normalized_values, engine: str = 'rbf',
+                      kernel=RBF_KERNEL, epsilon=RBF_EPSILON):
+    key = (digest, engine, kernel, epsilon)
+    rbfi = _interpolator_cache.get(key)
+    if rbfi is None:
+        if engine == 'idw':
+            rbfi = IDWInterpolator(coords, normalized_values)
+        elif engine == 'rbf_local':
+            neighbors = min(LOCAL_RBF_NEIGHBORS, len(normalized_values))
+            rbfi = RBFInterpolator(coords, normalized_values, kernel=kernel, epsilon=epsilon,
+                                   neighbors=neighbors)
+        else:
+            # O(N^3) - тому й кешуємо
+            rbfi = RBFInterpolator(coords, normalized_values, kernel=kernel, epsilon=epsilon)
+        _interpolator_cache.put(key, rbfi)
+    return rbfi
+
+
+def _empty_png(width: int, height: int) -> bytes:
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _evaluate_lattice(rbfi, nx: int, ny: int) -> np.ndarray:
+    """
+    Evaluates the interpolator on an (nx, ny) lattice spanning 0..100 on both axes.
+    Vector-valued interpolators give (nx, ny, K).
+    """
+    # Створення сітки (nx, ny) і перетворення на вектор точок (nx*ny, 2)
+    grid_x, grid_y = np.mgrid[0:100:complex(0, nx), 0:100:complex(0, ny)]
     grid_points = np.c_[grid_x.ravel(), grid_y.ravel()]
+    values = rbfi(grid_points)
+    return np.clip(values.reshape(nx, ny, *values.shape[1:]), 0, 1)
+
+
+def _bilinear_upsample(grid_z: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Stretches an (nx, ny) lattice to (width, height); lattice corners map to image corners."""
+    def axis(n_in, n_out):
+        pos = np.linspace(0, n_in - 1, n_out)
+        i0 = np.minimum(pos.astype(np.intp), max(n_in - 2, 0))
+        i1 = np.minimum(i0 + 1, n_in - 1)
+        return i0, i1, pos - i0
+
+    if grid_z.shape == (width, height):
+        return grid_z
+
+    x0, x1, tx = axis(grid_z.shape[0], width)
+    y0, y1, ty = axis(grid_z.shape[1], height)
+
+    along_x = grid_z[x0] * (1 - tx)[:, None] + grid_z[x1] * tx[:, None]
+    return along_x[:, y0] * (1 - ty) + along_x[:, y1] * ty
+
+
+def _lattice_size(width: int, height: int, pixels_per_sample=None, max_samples=GRID_MAX_SAMPLES):
+    nx, ny = width, height
+    if pixels_per_sample and pixels_per_sample > 1:
+        nx = math.ceil((width - 1) / pixels_per_sample) + 1
+        ny = math.ceil((height - 1) / pixels_per_sample) + 1
+
+    if max_samples and nx * ny > max_samples:
+        scale = math.sqrt(max_samples / (nx * ny))
+        nx = max(2, int(nx * scale))
+        ny = max(2, int(ny * scale))
+
+    return min(nx, width), min(ny, height)
+
+
+def _midpoint_error(rbfi, grid_z: np.ndarray) -> float:
+    """Max difference between the interpolator and bilinear estimate at lattice cell centres."""
+    nx, ny = grid_z.shape[:2]
+    if nx < 2 or ny < 2:
+        return 0.0
+
+    xs = np.linspace(0, 100, nx)
+    ys = np.linspace(0, 100, ny)
+    cx, cy = np.meshgrid((xs[:-1] + xs[1:]) / 2, (ys[:-1] + ys[1:]) / 2, indexing='ij')
+    actual = np.clip(rbfi(np.c_[cx.ravel(), cy.ravel()]).reshape(grid_z[1:, 1:].shape), 0, 1)
+    estimate = (grid_z[:-1, :-1] + grid_z[1:, :-1] + grid_z[:-1, 1:] + grid_z[1:, 1:]) / 4
+    return float(np.abs(actual - estimate).max())
+
+
+def _auto_lattice(rbfi, width: int, height: int, max_error: float) -> np.ndarray:
+    """Refines the lattice (n -> 2n - 1) until the midpoint error is within max_error."""
+    scale = AUTO_START_SAMPLES / max(width, height)
+    nx = min(width, max(2, math.ceil(width * scale)))
+    ny = min(height, max(2, math.ceil(height * scale)))
+
+    while True:
+        grid_z = _evaluate_lattice(rbfi, nx, ny)
+        if nx >= width and ny >= height:
+            return grid_z
+        if _midpoint_error(rbfi, grid_z) <= max_error:
+            return grid_z
+        nx = min(width, 2 * nx - 1)
+        ny = min(height, 2 * ny - 1)
 
-    rbfi = RBFInterpolator(coords, normalized_values, kernel='multiquadric', epsilon=1)
 
-    grid_z_vector = rbfi(grid_points)
-    grid_z = grid_z_vector.reshape(grid_x.shape)
+def _merge_duplicates(coords, values):
+    """Averages measurements taken at identical coordinates (they make the RBF system singular)."""
+    unique_coords, inverse = np.unique(coords, axis=0, return_inverse=True)
+    if len(unique_coords) == len(coords):
+        return coords, values
 
-    grid_z = np.clip(grid_z, 0, 1)
+    inverse = inverse.ravel()
+    sums = np.zeros((len(unique_coords),) + values.shape[1:])
+    np.add.at(sums, inverse, values)
+    counts = np.bincount(inverse).reshape((-1,) + (1,) * (values.ndim - 1))
+    return unique_coords, sums / counts
+
+
+def _interpolate_lattice(coords, rssi_values, digest: str, width: int, height: int, engine: str = 'rbf',
+                         pixels_per_sample=None, max_samples=GRID_MAX_SAMPLES, max_error=None,
+                         kernel=RBF_KERNEL, timings=None):
+    """
+    Fits (or reuses) the interpolator and evaluates it on the evaluation lattice.
+    rssi_values may be (N,) or (N, K) for K networks measured at the same points.
+    """
+    normalized_values = np.clip((rssi_values - MIN_RSSI) / (MAX_RSSI - MIN_RSSI), 0, 1)
+    coords, normalized_values = _merge_duplicates(coords, normalized_values)
+
+    start = time.perf_counter()
+    rbfi = _get_interpolator(digest, coords, normalized_values, engine, kernel=kernel)
+    if timings is not None:
+        timings['fit_s'] = time.perf_counter() - start
+
+    if max_error is not None:
+        lattice = _auto_lattice(rbfi, width, height, max_error)
+    else:
+        nx, ny = _lattice_size(width, height, pixels_per_sample, max_samples)
+        lattice = _evaluate_lattice(rbfi, nx, ny)
+
+    if timings is not None:
+        timings['lattice'] = list(lattice.shape[:2])
+    return lattice
+
+
+def _interpolate_grid(coords, rssi_values, digest: str, width: int, height: int, engine: str = 'rbf',
+                      pixels_per_sample=None, max_samples=GRID_MAX_SAMPLES, max_error=None,
+                      kernel=RBF_KERNEL, timings=None):
+    """Returns grid_z with shape (width, height), values in [0, 1]."""
+    grid_z = _interpolate_lattice(coords, rssi_values, digest, width, height, engine,
+                                  pixels_per_sample, max_samples, max_error, kernel, timings)
+    return np.clip(_bilinear_upsample(grid_z, width, height), 0, 1)
+
+
+def render_heatmap_png(grid_z: np.ndarray) -> bytes:
+    """
+    Direct rasterizer: maps grid_z (W, H) through JET_R_LUT into an RGBA image and
+    encodes it once. Does not touch pyplot, so it is safe to call from worker threads.
+    Unlike _render_matplotlib it draws no axes frame, so the outer 2 px differ;
+    see tests/test_heatmap_renderer.py for the tolerance inside.
+    """
+    # Той самий розподіл по кольорах, що й у Colormap: int(z * N), z == 1 -> N - 1
+    lut_size = len(JET_R_LUT)
+    indices = np.minimum((grid_z * lut_size).astype(np.intp), lut_size - 1)
+
+    # Рядок зображення - це y (вісь y інвертована, 0 зверху), стовпчик - x
+    rgba = JET_R_LUT[indices.T]
+
+    buf = io.BytesIO()
+    Image.fromarray(rgba, mode='RGBA').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _render_matplotlib(grid_z, width: int, height: int) -> bytes:
+    """Legacy pyplot renderer, kept as a reference for the direct rasterizer."""
+    import matplotlib.pyplot as plt
+
+    grid_x, grid_y = np.mgrid[0:100:complex(0, width), 0:100:complex(0, height)]
 
     fig, ax = plt.subplots(figsize=(width / 100, height / 100), dpi=100)
 
@@ -51,11 +412,11 @@ def generate_smooth_heatmap(points, width: int, height: int) -> bytes:
     plt.pcolormesh(
         grid_x,
         grid_y,
-        grid_z,  # (H, W)
+        grid_z,
         cmap='jet_r',
         vmin=0,
         vmax=1,
-        alpha=0.9,
+        alpha=HEATMAP_ALPHA,
         shading='nearest'
     )
 
@@ -75,3 +436,251 @@ def generate_smooth_heatmap(points, width: int, height: int) -> bytes:
     img.save(final_buf, format='PNG')
 
     return final_buf.getvalue()
+
+
+def generate_smooth_heatmap(points, width: int, height: int, renderer: str = 'direct',
+                            engine: str = 'auto', pixels_per_sample=None,
+                            max_samples: int = GRID_MAX_SAMPLES, max_error=None,
+                            kernel=RBF_KERNEL, timings=None) -> bytes:
+    """
+    renderer='direct' (default) rasterizes through the LUT; renderer='matplotlib'
+    uses the old pyplot figure round-trip. engine is 'rbf', 'rbf_local', 'idw' or
+    'auto' (picked by point count, see select_engine).
+
+    The field is evaluated on a lattice of at most max_samples nodes (optionally
+    one node every pixels_per_sample pixels) and bilinearly upsampled; pass
+    max_samples=None and pixels_per_sample=None for per-pixel evaluation. If
+    max_error is set (e.g. DEFAULT_MAX_ERROR), the lattice is refined
+    automatically until the bilinear error at cell centres is within it.
+
+    Fitted interpolators and finished PNGs are kept in LRU caches, see
+    get_cache_stats(). A timings dict, if given, receives the fit, evaluation
+    and encode times in seconds (or png_cached=True when the PNG came from cache).
+    """
+    if not points:
+        return _empty_png(width, height)
+
+    coords, rssi_values = _points_to_arrays(points)
+    digest = points_digest(coords, rssi_values)
+    if engine == 'auto':
+        engine = select_engine(len(coords))
+
+    png_key = (digest, width, height, renderer, engine, kernel, pixels_per_sample, max_samples, max_error)
+    png_bytes = _png_cache.get(png_key)
+    if png_bytes is not None:
+        if timings is not None:
+            timings['png_cached'] = True
+        return png_bytes
+
+    start = time.perf_counter()
+    grid_z = _interpolate_grid(coords, rssi_values, digest, width, height, engine,
+                               pixels_per_sample, max_samples, max_error, kernel, timings)
+    evaluated = time.perf_counter()
+
+    if renderer == 'matplotlib':
+        png_bytes = _render_matplotlib(grid_z, width, height)
+    else:
+        png_bytes = render_heatmap_png(grid_z)
+
+    if timings is not None:
+        timings['eval_s'] = evaluated - start - timings['fit_s']
+        timings['encode_s'] = time.perf_counter() - evaluated
+    _png_cache.put(png_key, png_bytes)
+    return png_bytes
+
+
+def survey_points(all_points, ssid: str, missing_rssi: int = -95) -> list:
+    """
+    SurveyPoints for one SSID from the raw survey (all_points_json), built the way
+    the frontend does it: successful points only, rounded coordinates, the first
+    matching network at a point, missing_rssi where the SSID was not heard.
+    """
+    points = []
+    for p in all_points:
+        if p.get('status', 'success') != 'success':
+            continue
+        network = next((n for n in p.get('data') or [] if n.get('ssid') == ssid), None)
+        rssi = network.get('rssi') if network else None
+        points.append(SurveyPoint(round(p['x']), round(p['y']), missing_rssi if rssi is None else rssi))
+    return points
+
+
+def survey_bssids(all_points) -> list:
+    """All BSSIDs heard in the survey (successful points), in first-seen order."""
+    seen = {}
+    for p in all_points:
+        if p.get('status', 'success') != 'success':
+            continue
+        for n in p.get('data') or []:
+            bssid = n.get('bssid')
+            if bssid and bssid.lower() not in seen:
+                seen[bssid.lower()] = bssid
+    return list(seen.values())
+
+
+def survey_series(all_points, ssids=(), bssids=(), missing_rssi: int = -95) -> dict:
+    """
+    Builds per-network (coords, rssi) arrays from the raw survey (all_points_json).
+    Keys are ('ssid', name) / ('bssid', mac). Like the frontend, only successful
+    points are used, coordinates are rounded and a network that was not heard at
+    a point gets missing_rssi, so every network shares the same coordinates.
+    """
+    survey = [p for p in all_points if p.get('status', 'success') == 'success']
+    coords = np.array([[round(p['x']), round(p['y'])] for p in survey], dtype=np.float64).reshape(-1, 2)
+
+    def matches(network, field, wanted):
+        value = network.get(field) or ''
+        # SSID чутливий до регістру, MAC адреса - ні
+        return value == wanted if field == 'ssid' else value.lower() == wanted.lower()
+
+    targets = [('ssid', s) for s in ssids] + [('bssid', b) for b in bssids]
+    series = {}
+    for field, wanted in targets:
+        rssi = np.full(len(survey), missing_rssi, dtype=np.float64)
+        for i, p in enumerate(survey):
+            heard = [n['rssi'] for n in p.get('data') or [] if matches(n, field, wanted)]
+            if heard:
+                rssi[i] = max(heard)
+        series[(field, wanted)] = (coords, rssi)
+    return series
+
+
+def generate_heatmaps_batch(series: dict, width: int, height: int, engine: str = 'auto',
+                            pixels_per_sample=None, max_samples: int = GRID_MAX_SAMPLES,
+                            max_error=None) -> dict:
+    """
+    Renders several networks in one pass. series maps any key -> (coords, rssi).
+    Networks measured at the same coordinates are fitted together as one
+    vector-valued RBF and evaluated on one shared lattice. Results land in the
+    same PNG cache as generate_smooth_heatmap, so single requests reuse them.
+    """
+    results = {}
+    groups = {}
+
+    for key, (coords, rssi_values) in series.items():
+        if len(coords) == 0:
+            results[key] = _empty_png(width, height)
+            continue
+
+        network_engine = select_engine(len(coords)) if engine == 'auto' else engine
+        digest = points_digest(coords, rssi_values)
+        png_key = (digest, width, height, 'direct', network_engine, RBF_KERNEL, pixels_per_sample, max_samples,
+                   max_error)
+
+        png_bytes = _png_cache.get(png_key)
+        if png_bytes is not None:
+            results[key] = png_bytes
+            continue
+
+        group_key = (points_digest(coords, np.empty(0)), network_engine)
+        group = groups.setdefault(group_key, (coords, network_engine, []))
+        group[2].append((key, rssi_values, png_key))
+
+    for coords, network_engine, members in groups.values():
+        values = np.column_stack([rssi_values for _, rssi_values, _ in members])
+        digest = points_digest(coords, values)
+
+        # одна підгонка та одна решітка на всю групу мереж
+        lattice = _interpolate_lattice(coords, values, digest, width, height, network_engine,
+                                       pixels_per_sample, max_samples, max_error)
+
+        for column, (key, _, png_key) in enumerate(members):
+            grid_z = np.clip(_bilinear_upsample(lattice[..., column], width, height), 0, 1)
+            png_bytes = render_heatmap_png(grid_z)
+            _png_cache.put(png_key, png_bytes)
+            results[key] = png_bytes
+
+    return results
+
+
+def _nearest_upsample(labels: np.ndarray, width: int, height: int) -> np.ndarray:
+    ix = np.rint(np.linspace(0, labels.shape[0] - 1, width)).astype(np.intp)
+    iy = np.rint(np.linspace(0, labels.shape[1] - 1, height)).astype(np.intp)
+    return labels[ix][:, iy]
+
+
+def generate_coverage_map(series: dict, width: int, height: int,
+                          dead_zone_rssi: float = DEAD_ZONE_RSSI,
+                          roaming_margin_db: float = ROAMING_MARGIN_DB,
+                          engine: str = 'auto', pixels_per_sample=None,
+                          max_samples: int = GRID_MAX_SAMPLES):
+    """
+    Best-AP coverage map. series maps key -> (coords, rssi) as built by survey_series
+    (all networks measured at the same coordinates). All surfaces are fitted as one
+    vector-valued interpolator and evaluated on one lattice; best AP, top-2 margin
+    and dead zones are array operations over the network axis.
+
+    Returns (png_bytes, stats). RSSI is interpolated on the same clipped
+    MIN_RSSI..MAX_RSSI scale as the heatmap, so margins above MAX_RSSI saturate.
+    """
+    keys = list(series)
+    if not keys:
+        return _empty_png(width, height), {"access_points": [], "dead_zone_pct": 100.0, "roaming_zone_pct": 0.0}
+
+    coords = series[keys[0]][0]
+    if any(not np.array_equal(series[key][0], coords) for key in keys):
+        raise ValueError("Coverage map needs all networks measured at the same points")
+    if len(coords) == 0:
+        return _empty_png(width, height), {"access_points": [], "dead_zone_pct": 100.0, "roaming_zone_pct": 0.0}
+
+    values = np.column_stack([series[key][1] for key in keys])
+    digest = points_digest(coords, values)
+    if engine == 'auto':
+        engine = select_engine(len(coords))
+
+    lattice = _interpolate_lattice(coords, values, digest, width, height, engine,
+                                   pixels_per_sample, max_samples)
+    lattice_dbm = MIN_RSSI + lattice * (MAX_RSSI - MIN_RSSI)
+
+    # Найсильніша та друга за силою мережа в кожному вузлі решітки
+    best_idx = np.argmax(lattice_dbm, axis=-1)
+    best = np.take_along_axis(lattice_dbm, best_idx[..., None], axis=-1)[..., 0]
+    if len(keys) > 1:
+        second = np.partition(lattice_dbm, len(keys) - 2, axis=-1)[..., -2]
+        margin = best - second
+    else:
+        margin = np.full(best.shape, float(MAX_RSSI - MIN_RSSI))
+
+    # Мітки - найближчим сусідом, значення - білінійно
+    labels = _nearest_upsample(best_idx, width, height)
+    best_px = _bilinear_upsample(best, width, height)
+    margin_px = _bilinear_upsample(margin, width, height)
+
+    dead = best_px < dead_zone_rssi
+    roaming = (margin_px < roaming_margin_db) & ~dead
+
+    rgba = np.empty((width, height, 4), dtype=np.uint8)
+    rgba[..., :3] = COVERAGE_PALETTE[labels % len(COVERAGE_PALETTE)]
+    rgba[..., 3] = round(HEATMAP_ALPHA * 255)
+    # межі роумінгу світліші, мертві зони - темні
+    rgba[roaming, :3] = rgba[roaming, :3] // 2 + 127
+    rgba[dead] = DEAD_ZONE_COLOR
+
+    buf = io.BytesIO()
+    Image.fromarray(rgba.transpose(1, 0, 2), mode='RGBA').save(buf, format='PNG')
+
+    total = labels.size
+    covered_labels = labels[~dead]
+    area = np.bincount(covered_labels, minlength=len(keys))
+    roaming_area = np.bincount(labels[roaming], minlength=len(keys))
+    rssi_sum = np.bincount(covered_labels, weights=best_px[~dead], minlength=len(keys))
+
+    access_points = []
+    for i, key in enumerate(keys):
+        access_points.append({
+            "key": list(key) if isinstance(key, tuple) else key,
+            "color": '#%02x%02x%02x' % tuple(int(c) for c in COVERAGE_PALETTE[i % len(COVERAGE_PALETTE)]),
+            "area_pct": round(float(100 * area[i] / total), 2),
+            "mean_rssi": round(float(rssi_sum[i] / area[i]), 1) if area[i] else None,
+            "roaming_pct": round(float(100 * roaming_area[i] / area[i]), 2) if area[i] else 0.0,
+        })
+    access_points.sort(key=lambda ap: ap["area_pct"], reverse=True)
+
+    stats = {
+        "access_points": access_points,
+        "dead_zone_pct": round(float(100 * dead.sum() / total), 2),
+        "roaming_zone_pct": round(float(100 * roaming.sum() / total), 2),
+        "dead_zone_rssi": dead_zone_rssi,
+        "roaming_margin_db": roaming_margin_db,
+    }
+    return buf.getvalue(), stats
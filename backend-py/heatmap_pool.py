@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from heatmap import LRUCache, PNG_CACHE_SIZE
+from heatmap_worker import render_with_stats
+
+# Кількість процесів для рендеру і скільки задач може чекати в черзі
+HEATMAP_WORKERS = int(os.getenv("HEATMAP_WORKERS", "2"))
+HEATMAP_QUEUE_SIZE = int(os.getenv("HEATMAP_QUEUE_SIZE", "4"))
+RETRY_AFTER_SECONDS = 5
+
+# Як часто перевіряємо, чи клієнт ще чекає на відповідь
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class HeatmapPoolBusy(Exception):
+    """Raised when all workers are busy and the queue is full."""
+
+    def __init__(self, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__("Heatmap renderer is busy, try again later")
+        self.retry_after = retry_after
+
+
+class HeatmapJobCancelled(Exception):
+    """Raised when the client disconnected before the render finished."""
+
+
+def _merge_cache_stats(per_worker: dict) -> dict:
+    """Sums the interpolator / png cache counters of all workers."""
+    merged = {}
+    for stats in per_worker.values():
+        for name, cache in stats.items():
+            total = merged.setdefault(name, {"size": 0, "maxsize": 0, "hits": 0, "misses": 0})
+            for key in total:
+                total[key] += cache[key]
+    for total in merged.values():
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = round(total["hits"] / lookups, 3) if lookups else 0.0
+    return merged
+
+
+class HeatmapRenderPool:
+    """
+    Runs CPU-bound heatmap renders in separate processes, so they do not hold the
+    GIL of the API process. Each worker is its own single-process executor: jobs
+    with the same route_key (the points digest) always land on the same worker
+    and reuse the interpolator it already fitted, e.g. when only the canvas size
+    changed. At most workers + queue_size jobs are admitted; the rest are rejected
+    with HeatmapPoolBusy.
+    """
+
+    def __init__(self, workers: int = HEATMAP_WORKERS, queue_size: int = HEATMAP_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        # Кеш результатів у головному процесі: кеші heatmap.py живуть у кожному воркері окремо
+        self.results = LRUCache(PNG_CACHE_SIZE)
+        self._executors = None
+        self._pending = 0
+        self._pending_per_worker = [0] * self.workers
+        self._rejected = 0
+        self._cancelled = 0
+        # pid воркера -> останні лічильники його кешів (кожен воркер кешує окремо)
+        self._worker_cache_stats = {}
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        # spawn, а не fork: до старту пулу вже працюють потоки планувальника,
+        # і fork процесу з потоками може зависнути на чужому локу
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        with self._lock:
+            if self._executors is None:
+                self._executors = [self._new_executor() for _ in range(self.workers)]
+
+    def shutdown(self):
+        with self._lock:
+            executors, self._executors = self._executors, None
+        for executor in executors or []:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pick_worker(self, route_key) -> int:
+        if route_key is not None:
+            return zlib.crc32(route_key.encode("utf-8")) % self.workers
+        # без ключа - найменш завантажений воркер
+        return min(range(self.workers), key=self._pending_per_worker.__getitem__)
+
+    def _admit(self, route_key) -> int:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise HeatmapPoolBusy()
+            index = self._pick_worker(route_key)
+            self._pending += 1
+            self._pending_per_worker[index] += 1
+            return index
+
+    def _release(self, index):
+        with self._lock:
+            self._pending -= 1
+            self._pending_per_worker[index] -= 1
+
+    def _submit(self, index, fn, *args):
+        executor = self._executors[index]
+        try:
+            return executor.submit(render_with_stats, fn, *args)
+        except BrokenProcessPool:
+            # воркер упав (наприклад, OOM) - замінюємо лише його
+            print(f"Heatmap worker {index} died, restarting it")
+            with self._lock:
+                if self._executors is not None and self._executors[index] is executor:
+                    self._executors[index] = self._new_executor()
+                executor = self._executors[index]
+            return executor.submit(render_with_stats, fn, *args)
+
+    async def run(self, request, cache_key, fn, *args, route_key: str = None):
+        """
+        Runs fn(*args) in a worker, picked by route_key when given. If request
+        (starlette Request) disconnects while the job is still queued, the job is
+        dropped; a job that already started finishes in its worker but the result
+        is discarded.
+        """
+        if cache_key is not None:
+            cached = self.results.get(cache_key)
+            if cached is not None:
+                return cached
+
+        self.start()
+        index = self._admit(route_key)
+        try:
+            future = self._submit(index, fn, *args)
+        except Exception:
+            self._release(index)
+            raise
+        # Слот звільняється, коли процес реально закінчив (або задачу скасовано)
+        future.add_done_callback(lambda _future: self._release(index))
+
+        waiter = asyncio.wrap_future(future)
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                break
+            if request is not None and await request.is_disconnected():
+                future.cancel()
+                with self._lock:
+                    self._cancelled += 1
+                raise HeatmapJobCancelled()
+
+        result, pid, cache_stats = waiter.result()
+        with self._lock:
+            self._worker_cache_stats[pid] = cache_stats
+        if cache_key is not None:
+            self.results.put(cache_key, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": self._pending,
+                "pending_per_worker": list(self._pending_per_worker),
+                "rejected": self._rejected,
+                "cancelled": self._cancelled,
+                "worker_pids": sorted(self._worker_cache_stats),
+                "results_cache": self.results.stats(),
+            }
+
+    def worker_cache_stats(self) -> dict:
+        """heatmap.py cache counters summed over the workers that have rendered so far."""
+        with self._lock:
+            merged = _merge_cache_stats(self._worker_cache_stats)
+            merged["workers_reporting"] = len(self._worker_cache_stats)
+            return merged
+
+
+heatmap_pool = HeatmapRenderPool()
@@ -0,0 +1,12 @@
+"""
+Entry point of the heatmap render workers (see heatmap_pool). Kept apart from
+main.py and heatmap_pool, so a spawned worker imports heatmap and nothing else.
+"""
+import os
+
+from heatmap import get_cache_stats
+
+
+def render_with_stats(fn, *args):
+    """Runs in a worker: the render result plus that worker's heatmap.py cache counters."""
+    return fn(*args), os.getpid(), get_cache_stats()
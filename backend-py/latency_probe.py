@@ -0,0 +1,234 @@
+"""
+Cheap periodic connectivity probe: TCP connect latency, jitter and loss to a few
+targets. Costs a handful of SYN/ACK round trips instead of a full speedtest, so it
+can run every minute; the scheduler starts a speedtest only when the probe sees
+degradation (see main.py).
+
+    PROBE_TARGETS=1.1.1.1:443,8.8.8.8:53 PROBE_INTERVAL=60 python main.py
+"""
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+PROBE_TARGETS = os.getenv("PROBE_TARGETS", "1.1.1.1:443,8.8.8.8:443,9.9.9.9:443")
+PROBE_INTERVAL = float(os.getenv("PROBE_INTERVAL", "60"))    # 0 - вимкнено
+PROBE_ATTEMPTS = int(os.getenv("PROBE_ATTEMPTS", "5"))
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "1.0"))
+PROBE_GAP = 0.1                 # пауза між спробами до однієї цілі
+PROBE_HISTORY_FILE = "latency_probe.db"
+PROBE_HISTORY_SIZE = 1440       # доба при PROBE_INTERVAL=60
+
+# Деградація: втрати, джитер або затримка відносно базової (медіана останніх нормальних).
+# Втрати рахуються по кожній цілі: одна недоступна ціль (фаєрвол, впав DNS-сервер)
+# ще не означає проблем з каналом, тому причиною вони стають, лише коли їх має більшість цілей
+PROBE_LOSS_THRESHOLD = 0.2
+PROBE_JITTER_MS = 30.0
+PROBE_LATENCY_FACTOR = 2.0
+PROBE_LATENCY_MIN_MS = 20.0
+BASELINE_PROBES = 30
+
+# Спідтест за деградацією - не частіше ніж раз на стільки секунд
+SPEEDTEST_MIN_INTERVAL = float(os.getenv("SPEEDTEST_MIN_INTERVAL", "1800"))
+
+
+def parse_targets(spec: str):
+    """'host:port,host:port' -> [(host, port)]; port defaults to 443."""
+    targets = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, sep, port = item.rpartition(":")
+        if not sep or not port.isdigit():
+            host, port = item, "443"
+        targets.append((host.strip("[]"), int(port)))
+    return targets
+
+
+def probe_target(host: str, port: int, attempts: int = PROBE_ATTEMPTS, timeout: float = PROBE_TIMEOUT,
+                 gap: float = PROBE_GAP) -> dict:
+    """
+    attempts TCP connects to host:port. Latency is the connect (SYN -> SYN/ACK) time;
+    jitter is the mean difference between consecutive RTTs (as in RFC 3550).
+    """
+    rtts = []
+    errors = 0
+    for i in range(attempts):
+        if i:
+            time.sleep(gap)
+        start = time.perf_counter()
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                rtts.append((time.perf_counter() - start) * 1000)
+        except OSError:
+            errors += 1
+
+    return {
+        "target": f"{host}:{port}",
+        "sent": attempts,
+        "received": len(rtts),
+        "loss": round(errors / attempts, 3) if attempts else 0.0,
+        "latency_ms": round(statistics.median(rtts), 2) if rtts else None,
+        "min_ms": round(min(rtts), 2) if rtts else None,
+        "max_ms": round(max(rtts), 2) if rtts else None,
+        "jitter_ms": _jitter(rtts),
+    }
+
+
+def _jitter(rtts):
+    if len(rtts) < 2:
+        return 0.0 if rtts else None
+    return round(statistics.mean(abs(b - a) for a, b in zip(rtts, rtts[1:])), 2)
+
+
+class LatencyProbe:
+    def __init__(self, targets=None, attempts: int = PROBE_ATTEMPTS, timeout: float = PROBE_TIMEOUT,
+                 history_file=PROBE_HISTORY_FILE, history_size: int = PROBE_HISTORY_SIZE,
+                 speedtest_min_interval: float = SPEEDTEST_MIN_INTERVAL):
+        self.targets = targets if targets is not None else parse_targets(PROBE_TARGETS)
+        self.attempts = attempts
+        self.timeout = timeout
+        self.history_file = history_file    # None - лише в пам'яті
+        self.speedtest_min_interval = speedtest_min_interval
+        self.history_size = history_size
+        self._history = deque(self._load(), maxlen=history_size)
+        self._lock = threading.Lock()
+        self._last_speedtest = None         # time.monotonic()
+
+    # --- storage ---
+
+    # Один рядок на замір: запис - це INSERT і DELETE найстаріших, а не перезапис усієї історії
+
+    def _connect(self):
+        conn = sqlite3.connect(self.history_file, timeout=10)
+        conn.execute("CREATE TABLE IF NOT EXISTS probes (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)")
+        return conn
+
+    def _load(self):
+        if not self.history_file or not os.path.exists(self.history_file):
+            return []
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT data FROM probes ORDER BY id DESC LIMIT ?",
+                                    (self.history_size,)).fetchall()
+            finally:
+                conn.close()
+            return [json.loads(data) for data, in reversed(rows)]
+        except Exception as e:
+            print(f"Failed to load {self.history_file}: {e}")
+            return []
+
+    def _save(self, result):
+        if not self.history_file:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("INSERT INTO probes (data) VALUES (?)", (json.dumps(result),))
+                conn.execute("DELETE FROM probes WHERE id <= ?", (cursor.lastrowid - self.history_size,))
+        finally:
+            conn.close()
+
+    # --- measurement ---
+
+    def baseline_ms(self):
+        """Median latency of the recent probes that were fine; None until there are any."""
+        recent = [p["latency_ms"] for p in list(self._history)[-BASELINE_PROBES * 2:]
+                  if p["status"] == "ok" and p["latency_ms"] is not None]
+        return round(statistics.median(recent[-BASELINE_PROBES:]), 2) if recent else None
+
+    def _assess(self, latency, jitter, per_target, lossy, baseline):
+        reasons = []
+        if not any(t["received"] for t in per_target):
+            return "down", ["all targets unreachable"]
+        if len(lossy) * 2 > len(per_target):
+            reasons.append(f"loss on {len(lossy)} of {len(per_target)} targets")
+        if jitter is not None and jitter >= PROBE_JITTER_MS:
+            reasons.append(f"jitter {jitter:.0f} ms")
+        if baseline is not None and latency is not None and \
+                latency > max(baseline * PROBE_LATENCY_FACTOR, baseline + PROBE_LATENCY_MIN_MS):
+            reasons.append(f"latency {latency:.0f} ms (baseline {baseline:.0f} ms)")
+        return ("degraded" if reasons else "ok"), reasons
+
+    def run(self) -> dict:
+        """Probes all targets in parallel, stores and returns the combined result."""
+        if not self.targets:
+            raise ValueError("No probe targets configured")
+        with ThreadPoolExecutor(max_workers=len(self.targets)) as pool:
+            per_target = list(pool.map(lambda t: probe_target(t[0], t[1], self.attempts, self.timeout),
+                                       self.targets))
+
+        # Загальні втрати - лише по досяжних цілях; недоступні видно в lossy_targets
+        reachable = [t for t in per_target if t["received"]]
+        lossy = [t["target"] for t in per_target if t["loss"] >= PROBE_LOSS_THRESHOLD]
+        sent = sum(t["sent"] for t in reachable)
+        received = sum(t["received"] for t in reachable)
+        latencies = [t["latency_ms"] for t in per_target if t["latency_ms"] is not None]
+        jitters = [t["jitter_ms"] for t in per_target if t["jitter_ms"] is not None]
+        latency = round(statistics.median(latencies), 2) if latencies else None
+        jitter = round(statistics.mean(jitters), 2) if jitters else None
+        loss = round(1 - received / sent, 3) if sent else 1.0
+
+        with self._lock:
+            baseline = self.baseline_ms()
+            previous = self._history[-1]["status"] if self._history else None
+            status, reasons = self._assess(latency, jitter, per_target, lossy, baseline)
+            result = {
+                "timestamp": datetime.now().isoformat(),
+                "status": status,
+                "previous_status": previous,
+                "reasons": reasons,
+                "latency_ms": latency,
+                "jitter_ms": jitter,
+                "loss": loss,
+                "lossy_targets": lossy,
+                "baseline_ms": baseline,
+                "targets": per_target,
+            }
+            self._history.append(result)
+            self._save(result)
+        return result
+
+    def should_speedtest(self, result) -> bool:
+        """
+        Full speedtest is worth it when the link is degraded (not down - it would just
+        fail) or right after an outage ends; rate-limited by speedtest_min_interval.
+        """
+        recovered = result["status"] == "ok" and result.get("previous_status") == "down"
+        if result["status"] != "degraded" and not recovered:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._last_speedtest is not None and now - self._last_speedtest < self.speedtest_min_interval:
+                return False
+            self._last_speedtest = now
+        return True
+
+    def history(self, limit=None):
+        with self._lock:
+            items = list(self._history)
+        return items[-limit:] if limit else items
+
+    def stats(self) -> dict:
+        with self._lock:
+            last = self._history[-1] if self._history else None
+            return {
+                "targets": [f"{host}:{port}" for host, port in self.targets],
+                "interval": PROBE_INTERVAL,
+                "attempts": self.attempts,
+                "timeout": self.timeout,
+                "probes": len(self._history),
+                "baseline_ms": self.baseline_ms(),
+                "last": last,
+            }
+
+
+latency_probe = LatencyProbe()
@@ -0,0 +1,257 @@
+"""
+Current Wi-Fi link on Linux without spawning processes:
+/proc/net/wireless (signal), sysfs (interfaces, link state) and nl80211 over
+generic netlink (SSID, BSSID, frequency).
+"""
+import os
+import socket
+import struct
+
+PROC_WIRELESS = "/proc/net/wireless"
+SYSFS_NET = "/sys/class/net"
+
+# cfg80211 віддає якість лінку в шкалі 0..70 (як iwconfig "Link Quality=XX/70")
+LINK_QUALITY_MAX = 70
+NETLINK_TIMEOUT = 0.5
+
+# netlink / generic netlink
+_NETLINK_GENERIC = 16
+_NLMSG_ERROR = 2
+_NLMSG_DONE = 3
+_NLM_F_REQUEST = 0x1
+_NLM_F_DUMP = 0x300
+_GENL_ID_CTRL = 0x10
+_CTRL_CMD_GETFAMILY = 3
+_CTRL_ATTR_FAMILY_ID = 1
+_CTRL_ATTR_FAMILY_NAME = 2
+
+# nl80211
+_NL80211_CMD_GET_INTERFACE = 5
+_NL80211_CMD_GET_STATION = 17
+_NL80211_ATTR_IFINDEX = 3
+_NL80211_ATTR_MAC = 6
+_NL80211_ATTR_STA_INFO = 21
+_NL80211_ATTR_WIPHY_FREQ = 38
+_NL80211_ATTR_SSID = 52
+_NL80211_STA_INFO_SIGNAL = 7
+_NLA_TYPE_MASK = 0x3FFF
+
+_NLMSG_HEADER = struct.Struct("=IHHII")
+_GENL_HEADER = struct.Struct("=BBH")
+_NLA_HEADER = struct.Struct("=HH")
+
+
+def wireless_interfaces():
+    """Names of wireless interfaces (sysfs marks them with a 'wireless' or 'phy80211' entry)."""
+    try:
+        names = os.listdir(SYSFS_NET)
+    except OSError:
+        return []
+    return sorted(
+        name for name in names
+        if os.path.exists(os.path.join(SYSFS_NET, name, "wireless"))
+        or os.path.exists(os.path.join(SYSFS_NET, name, "phy80211"))
+    )
+
+
+def _read_sysfs(iface, entry):
+    try:
+        with open(os.path.join(SYSFS_NET, iface, entry), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def link_fingerprint():
+    """
+    Cheap value that changes whenever a wireless link goes up/down or re-associates
+    (carrier_changes counts every carrier flip). Used to invalidate cached lookups.
+    """
+    return tuple(
+        (iface, _read_sysfs(iface, "operstate"), _read_sysfs(iface, "carrier_changes"))
+        for iface in wireless_interfaces()
+    )
+
+
+def read_proc_wireless():
+    """{iface: {"quality": link quality 0..70, "level": dBm}} from /proc/net/wireless."""
+    result = {}
+    try:
+        with open(PROC_WIRELESS, "r") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return result
+
+    for line in lines:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if len(fields) < 3:
+            continue
+        try:
+            result[name.strip()] = {
+                "quality": float(fields[1].rstrip(".")),
+                "level": float(fields[2].rstrip(".")),
+            }
+        except ValueError:
+            continue
+    return result
+
+
+# --- generic netlink ---
+
+def _nla(attr_type, payload: bytes) -> bytes:
+    length = _NLA_HEADER.size + len(payload)
+    return _NLA_HEADER.pack(length, attr_type) + payload + b"\0" * ((4 - length % 4) % 4)
+
+
+def _parse_attrs(data: bytes) -> dict:
+    attrs = {}
+    offset = 0
+    while offset + _NLA_HEADER.size <= len(data):
+        length, attr_type = _NLA_HEADER.unpack_from(data, offset)
+        if length < _NLA_HEADER.size:
+            break
+        attrs[attr_type & _NLA_TYPE_MASK] = data[offset + _NLA_HEADER.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+class _GenlSocket:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, _NETLINK_GENERIC)
+        self.sock.settimeout(NETLINK_TIMEOUT)
+        self.sock.bind((0, 0))
+        self.seq = 0
+
+    def close(self):
+        self.sock.close()
+
+    def request(self, family, cmd, attrs=b"", dump=False):
+        """Sends one generic netlink command; returns the attribute dicts of all replies."""
+        self.seq += 1
+        flags = _NLM_F_REQUEST | (_NLM_F_DUMP if dump else 0)
+        payload = _GENL_HEADER.pack(cmd, 1, 0) + attrs
+        self.sock.send(_NLMSG_HEADER.pack(_NLMSG_HEADER.size + len(payload), family, flags, self.seq, 0) + payload)
+
+        replies = []
+        while True:
+            data = self.sock.recv(65536)
+            offset = 0
+            while offset + _NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, seq, _ = _NLMSG_HEADER.unpack_from(data, offset)
+                body = data[offset + _NLMSG_HEADER.size:offset + length]
+                offset += (length + 3) & ~3
+                if seq != self.seq:
+                    continue
+                if msg_type == _NLMSG_DONE:
+                    return replies
+                if msg_type == _NLMSG_ERROR:
+                    error = struct.unpack_from("=i", body)[0]
+                    if error:
+                        raise OSError(-error, os.strerror(-error))
+                    return replies
+                replies.append(_parse_attrs(body[_GENL_HEADER.size:]))
+                if not dump:
+                    return replies
+
+    def family_id(self, name: str) -> int:
+        replies = self.request(_GENL_ID_CTRL, _CTRL_CMD_GETFAMILY,
+                               _nla(_CTRL_ATTR_FAMILY_NAME, name.encode() + b"\0"))
+        return struct.unpack("=H", replies[0][_CTRL_ATTR_FAMILY_ID][:2])[0]
+
+
+def _format_mac(raw: bytes) -> str:
+    return ":".join(f"{b:02x}" for b in raw)
+
+
+def nl80211_link(iface: str):
+    """
+    SSID, BSSID, frequency and signal of the association on iface via nl80211.
+    None if the interface is not connected; raises OSError if nl80211 is unavailable.
+    """
+    ifindex = socket.if_nametoindex(iface)
+    genl = _GenlSocket()
+    try:
+        family = genl.family_id("nl80211")
+        ifindex_attr = _nla(_NL80211_ATTR_IFINDEX, struct.pack("=I", ifindex))
+
+        info = genl.request(family, _NL80211_CMD_GET_INTERFACE, ifindex_attr)[0]
+        ssid = info.get(_NL80211_ATTR_SSID)
+        if not ssid:
+            return None
+        freq = info.get(_NL80211_ATTR_WIPHY_FREQ)
+
+        # у режимі клієнта єдина "станція" - це точка доступу
+        bssid, signal = None, None
+        for station in genl.request(family, _NL80211_CMD_GET_STATION, ifindex_attr, dump=True):
+            if _NL80211_ATTR_MAC not in station:
+                continue
+            bssid = _format_mac(station[_NL80211_ATTR_MAC][:6])
+            sta_info = _parse_attrs(station.get(_NL80211_ATTR_STA_INFO, b""))
+            if _NL80211_STA_INFO_SIGNAL in sta_info:
+                signal = struct.unpack("=b", sta_info[_NL80211_STA_INFO_SIGNAL][:1])[0]
+            break
+    finally:
+        genl.close()
+
+    return {
+        "ssid": ssid,
+        "bssid": bssid,
+        "freq": struct.unpack("=I", freq[:4])[0] if freq else None,
+        "signal_dbm": signal,
+    }
+
+
+def _decode_ssid(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1251", errors="replace")
+
+
+def current_link():
+    """
+    Current connection in get_current_wifi() format, or None if no wireless
+    interface is associated. Raises OSError when the kernel interfaces are not
+    usable (no nl80211, restricted netlink), so the caller can fall back to tools.
+    """
+    interfaces = wireless_interfaces()
+    if not interfaces:
+        if os.path.isdir(SYSFS_NET):
+            return None
+        raise OSError(f"{SYSFS_NET} is not available")
+
+    proc = read_proc_wireless()
+    errors = []
+    for iface in interfaces:
+        if _read_sysfs(iface, "operstate") not in ("up", "dormant", "unknown"):
+            continue
+        try:
+            link = nl80211_link(iface)
+        except OSError as e:
+            errors.append(e)
+            continue
+        if link is None:
+            continue
+
+        stats = proc.get(iface)
+        if stats is not None:
+            signal_pct = int(min(stats["quality"], LINK_QUALITY_MAX) / LINK_QUALITY_MAX * 100)
+        elif link["signal_dbm"] is not None:
+            # як у cfg80211: quality = signal + 110, в межах 0..70
+            signal_pct = int(min(max(link["signal_dbm"] + 110, 0), LINK_QUALITY_MAX) / LINK_QUALITY_MAX * 100)
+        else:
+            signal_pct = 0
+
+        return {
+            "ssid": _decode_ssid(link["ssid"]),
+            "bssid": link["bssid"] or "Unknown",
+            "signal": signal_pct,
+            "platform": "Linux (nl80211)",
+            "interface": iface,
+            "freq": link["freq"],
+        }
+
+    if errors:
+        raise errors[0]
+    return None
@@ -1,66 +1,158 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from heatmap import generate_smooth_heatmap
-from wifi_service import scan_networks
-import uvicorn
+from heatmap import (generate_smooth_heatmap, heatmap_etag, heatmap_points_digest, survey_points,
+                     survey_series, generate_heatmaps_batch, SurveyPoint,
+                     survey_bssids, generate_coverage_map, DEAD_ZONE_RSSI, ROAMING_MARGIN_DB)
+from heatmap_pool import heatmap_pool, HeatmapPoolBusy, HeatmapJobCancelled
+from wifi_service import scan_coordinator, get_current_wifi
+from channel_analysis import analyze_channels
 import time
-from speedtest_service import run_speedtest, get_history
+from speedtest_service import speedtest_jobs, get_history, SpeedtestBusy
+from speedtest_store import query_results, query_rollups, recent_results
+from throughput import (throughput_server, measure_segments, ThroughputBusy, THROUGHPUT_SERVER_PORT,
+                        THROUGHPUT_TARGET, THROUGHPUT_STREAMS, THROUGHPUT_DURATION, THROUGHPUT_WARMUP)
 from ai_assistant.assistant_service import get_ai_response
 from history_service import load_history, save_history_entry, clear_history
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response, JSONResponse
+from fastapi import FastAPI, HTTPException, Header, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any
 import base64
+import hashlib
+import json
+import os
+import sys
 from typing import List
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
-from triggers import check_speedtest_result
+from triggers import check_speedtest_result, check_probe_result
 from notification_service import load_notifications, clear_notifications, mark_all_read
+from scan_stream import scan_stream, BACKGROUND_SCAN_INTERVAL
+from survey_store import save_points_json, load_points, list_surveys, create_survey, delete_survey
+from rssi_history import rssi_history
+from latency_probe import latency_probe, PROBE_INTERVAL
 
 scheduler = None
 JOB_ID = 'speedtest_job'
+SCAN_JOB_ID = 'background_scan_job'
+PROBE_JOB_ID = 'latency_probe_job'
+# Спідтест за розкладом незалежно від проби (0 - лише коли проба бачить деградацію)
+SPEEDTEST_INTERVAL_HOURS = float(os.getenv("SPEEDTEST_INTERVAL_HOURS", "0"))
+
+# кожне сканування (з UI, асистента чи фонове) потрапляє в потік змін
+scan_coordinator.add_listener(scan_stream.publish)
+scan_coordinator.add_listener(rssi_history.record)
+
+
+def check_speedtest_rules(result):
+    try:
+        check_speedtest_result(
+            result['download'],
+            result['upload'],
+            result['ping']
+        )
+    except Exception as e:
+        print(f"--- [TRIGGER ERROR] Failed to check rules: {e} ---")
+
+
+# тригери перевіряють кожен успішний тест - ручний чи за розкладом
+speedtest_jobs.add_listener(check_speedtest_rules)
 
 
 def scheduled_speedtest():
     print("--- [SCHEDULED JOB] Auto-speedtest started... ---", flush=True)
     try:
-        result = run_speedtest()
-        if result:
-            print(f"--- [SCHEDULED JOB] Success: {result['download']} Mbps ---", flush=True)
-            
-            try:
-                check_speedtest_result(
-                    result['download'],
-                    result['upload'],
-                    result['ping']
-                )
-            except Exception as e:
-                print(f"--- [TRIGGER ERROR] Failed to check rules: {e} ---")
-                    
-            else:
-                print("--- [SCHEDULED JOB] Failed ---", flush=True)
-                
+        # якщо тест уже йде (наприклад, запущений з UI) - просто чекаємо на нього
+        job = speedtest_jobs.run(source="scheduled")
+        if job.result:
+            print(f"--- [SCHEDULED JOB] Success: {job.result['download']} Mbps ---", flush=True)
+        else:
+            print(f"--- [SCHEDULED JOB] Failed: {job.error} ---", flush=True)
     except Exception as e:
         print(f"--- [SCHEDULED JOB] Error: {e} ---", flush=True)
 
 
+def scheduled_probe():
+    try:
+        result = latency_probe.run()
+    except Exception as e:
+        print(f"--- [PROBE] Error: {e} ---", flush=True)
+        return
+
+    try:
+        check_probe_result(result)
+    except Exception as e:
+        print(f"--- [TRIGGER ERROR] Failed to check probe: {e} ---")
+
+    if latency_probe.should_speedtest(result):
+        reason = ", ".join(result["reasons"]) or "connection restored"
+        print(f"--- [PROBE] {result['status']}: {reason}, starting speedtest ---", flush=True)
+        try:
+            speedtest_jobs.start(source="probe")
+        except SpeedtestBusy as e:
+            print(f"--- [PROBE] Speedtest skipped: {e} ---", flush=True)
+
+
+def background_scan():
+    try:
+        # якщо хтось щойно сканував - використовуємо його результат
+        scan_coordinator.get(max_age=BACKGROUND_SCAN_INTERVAL / 2)
+    except Exception as e:
+        print(f"--- [BACKGROUND SCAN] Error: {e} ---", flush=True)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     scheduler = BackgroundScheduler()
 
-    scheduler.add_job(scheduled_speedtest, 'interval', hours=6, id=JOB_ID)
+    if PROBE_INTERVAL > 0:
+        # дешева проба щохвилини, повний спідтест - лише коли вона бачить деградацію
+        scheduler.add_job(
+            scheduled_probe, 'interval', seconds=PROBE_INTERVAL, id=PROBE_JOB_ID,
+            max_instances=1, coalesce=True
+        )
+        print(f"--- [SCHEDULER] Latency probe every {PROBE_INTERVAL}s ---", flush=True)
+
+    if SPEEDTEST_INTERVAL_HOURS > 0:
+        scheduler.add_job(scheduled_speedtest, 'interval', hours=SPEEDTEST_INTERVAL_HOURS, id=JOB_ID)
+        print(f"--- [SCHEDULER] Speedtest every {SPEEDTEST_INTERVAL_HOURS}h ---", flush=True)
+
+    if BACKGROUND_SCAN_INTERVAL > 0:
+        scheduler.add_job(
+            background_scan, 'interval', seconds=BACKGROUND_SCAN_INTERVAL, id=SCAN_JOB_ID,
+            max_instances=1, coalesce=True
+        )
+        print(f"--- [SCHEDULER] Background scan every {BACKGROUND_SCAN_INTERVAL}s ---", flush=True)
 
     scheduler.start()
-    print("--- [SCHEDULER] Background scheduler started (Every 6 hours) ---", flush=True)
+    print("--- [SCHEDULER] Background scheduler started ---", flush=True)
+
+    heatmap_pool.start()
+    print(f"--- [HEATMAP] Render pool started ({heatmap_pool.workers} workers) ---", flush=True)
+
+    if THROUGHPUT_SERVER_PORT > 0:
+        try:
+            throughput_server.start()
+            print(f"--- [THROUGHPUT] Server listening on {throughput_server.host}:{throughput_server.port} ---",
+                  flush=True)
+        except (OSError, ValueError) as e:
+            print(f"--- [THROUGHPUT] Failed to start server: {e} ---", flush=True)
 
     yield
 
     scheduler.shutdown()
     print("--- [SCHEDULER] Shut down", flush=True)
 
+    heatmap_pool.shutdown()
+    print("--- [HEATMAP] Render pool shut down", flush=True)
+
+    rssi_history.flush()
+
+    throughput_server.shutdown()
+
 app = FastAPI(lifespan=lifespan)
 
 # CORS
@@ -80,51 +172,172 @@ def read_root():
 
 
 @app.get("/api/scan")
-def get_scan_results():
+def get_scan_results(max_age: float | None = None):
+    """max_age - максимальний вік результату в секундах (0 - примусове сканування)."""
     print("Received scan request...")
     try:
-        networks = scan_networks()
-        return {"success": True, "data": networks}
+        networks, scanned_at = scan_coordinator.get(max_age)
+        return {"success": True, "data": networks, "scanned_at": scanned_at}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-@app.get("/api/speedtest/history")
-def get_speedtest_history():
-    return {"success": True, "data": get_history()}
-
-
-def execute_speedtest_task():
-    print("--- [MANUAL] Speedtest started in background... ---", flush=True)
-    start_time = time.time()
-    
-    try:
-        result = run_speedtest()  # Це займає 20-30 сек
-        duration = round(time.time() - start_time, 2)
-        
-        if result:
-            print(f"--- [MANUAL] Finished in {duration}s. Result saved. ---", flush=True)
-
-            try:
-                check_speedtest_result(
-                    result['download'], 
-                    result['upload'], 
-                    result['ping']
-                )
-            except Exception as e:
-                print(f"--- [TRIGGER ERROR] {e} ---")
+@app.get("/api/scan/stream")
+async def stream_scan_changes(request: Request):
+    """
+    SSE потік: спочатку повний знімок (event: snapshot), далі лише зміни (event: diff).
+    Фонове сканування вмикається змінною BACKGROUND_SCAN_INTERVAL.
+    """
+    return StreamingResponse(
+        scan_stream.events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-        else:
-            print("--- [MANUAL] Failed to get result ---", flush=True)
+
+@app.get("/api/scan/stats")
+def get_scan_stats():
+    return {"success": True, "data": scan_coordinator.stats()}
+
+
+@app.get("/api/channels")
+def get_channel_analysis(bssid: str | None = None, max_age: float | None = None):
+    """
+    Оцінка завантаженості каналів (інтерференція в дБм) і рекомендований канал.
+    bssid - точка доступу, для якої шукаємо канал (за замовчуванням - поточне підключення).
+    """
+    try:
+        networks, scanned_at = scan_coordinator.get(max_age)
+        if bssid is None:
+            current = get_current_wifi() or {}
+            bssid = current.get("bssid")
+        data = analyze_channels(networks, bssid)
+        data["scanned_at"] = scanned_at
+        return {"success": True, "data": data}
     except Exception as e:
-        print(f"--- [MANUAL] Error: {e} ---", flush=True)
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/api/rssi_history")
+def get_rssi_history_bssids():
+    """BSSID, для яких є історія сигналу (останні побачені - першими)."""
+    return {"success": True, "data": rssi_history.list_bssids()}
+
+
+@app.get("/api/rssi_history/stats")
+def get_rssi_history_stats():
+    return {"success": True, "data": rssi_history.stats()}
+
+
+@app.get("/api/rssi_history/{bssid}")
+def get_rssi_history(bssid: str, start: float | None = None, end: float | None = None,
+                     step: float | None = None, max_points: int = 1000):
+    """
+    start / end - unix-час у секундах. step (секунди) - min/mean/max по вікнах;
+    без step - сирі точки, проріджені до max_points вікон (0 - без проріджування).
+    """
+    if step is not None and step <= 0:
+        raise HTTPException(status_code=400, detail="step must be positive")
+    data = rssi_history.query(bssid, start, end, step, max_points)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown BSSID")
+    return {"success": True, "data": data}
+
+
+@app.get("/api/speedtest/history")
+def get_speedtest_history(start: float | None = None, end: float | None = None, limit: int = 1000):
+    """Last 100 results, or every result in [start, end] (epoch seconds) at full resolution."""
+    if start is None and end is None:
+        return {"success": True, "data": get_history()}
+    return {"success": True, "data": query_results(start, end, limit)}
+
+
+@app.get("/api/speedtest/rollups")
+def get_speedtest_rollups(resolution: str = "hour", start: float | None = None, end: float | None = None):
+    """Hourly / daily min, max, mean, p50 and p95 of download, upload and ping."""
+    try:
+        data = query_rollups(resolution, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": data}
 
 
 @app.post("/api/speedtest/run")
-def trigger_speedtest(background_tasks: BackgroundTasks):
-    background_tasks.add_task(execute_speedtest_task)
-    
-    return {"success": True, "message": "Test started in background"}
+def trigger_speedtest():
+    try:
+        job, joined = speedtest_jobs.start(source="manual")
+    except SpeedtestBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    message = "Joined the running test" if joined else "Test started in background"
+    return {"success": True, "message": message, "data": {"job_id": job.id, "joined": joined}}
+
+
+@app.get("/api/speedtest/status")
+def get_speedtest_status():
+    """Running test, if any, and job manager counters."""
+    job = speedtest_jobs.current()
+    return {"success": True, "data": {"job": job.as_dict() if job else None, **speedtest_jobs.stats()}}
+
+
+@app.get("/api/speedtest/status/{job_id}")
+def get_speedtest_job(job_id: str):
+    job = speedtest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown speedtest job")
+    return {"success": True, "data": job.as_dict()}
+
+
+@app.get("/api/probe/status")
+def get_probe_status():
+    return {"success": True, "data": latency_probe.stats()}
+
+
+@app.get("/api/probe/history")
+def get_probe_history(limit: int = 100):
+    return {"success": True, "data": latency_probe.history(limit)}
+
+
+@app.post("/api/probe/run")
+def run_probe():
+    """Runs the probe now; does not start a speedtest by itself."""
+    try:
+        return {"success": True, "data": latency_probe.run()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class ThroughputRequest(BaseModel):
+    target: str | None = None        # host:port сервера в LAN, за замовчуванням THROUGHPUT_TARGET
+    wan_target: str | None = None    # host:port сервера поза LAN; без нього WAN - останній спідтест
+    streams: int = THROUGHPUT_STREAMS
+    duration: float = THROUGHPUT_DURATION
+    warmup: float = THROUGHPUT_WARMUP
+
+
+@app.post("/api/throughput/run")
+def run_throughput(request: ThroughputRequest):
+    """Wi-Fi segment throughput to our own server, compared with the WAN."""
+    target = request.target or THROUGHPUT_TARGET
+    if not target:
+        raise HTTPException(status_code=400, detail="No throughput target (host:port) given")
+
+    latest = recent_results(1)
+    try:
+        data = measure_segments(target, request.wan_target, request.streams, request.duration,
+                                request.warmup, wan_reference=latest[-1] if latest else None)
+    except ThroughputBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=502, detail=f"Throughput server unreachable: {e}")
+    return {"success": True, "data": data}
+
+
+@app.get("/api/throughput/server")
+def get_throughput_server():
+    return {"success": True, "data": {"running": throughput_server.running(), "host": throughput_server.host,
+                                         "port": throughput_server.port}}
 
 
 class PromptData(BaseModel):
@@ -211,30 +424,74 @@ class HeatmapRequest(BaseModel):
     width: int  
     height: int
     all_points_json: str
+    survey_id: str | None = None
+
+
+def save_heatmap_points(request):
+    """Appends new survey points to the survey store; returns the survey id."""
+    try:
+        # незмінений обхід упізнається за хешем без розбору JSON
+        return save_points_json(request.all_points_json, request.survey_id)
+    except Exception as e:
+        print('Failed to save all heatmap points...')
+        print(str(e))
+        return request.survey_id
+
+
+async def render_in_pool(http_request: Request, cache_key, fn, *args, route_key: str = None):
+    """Runs a render in the heatmap process pool, mapping admission errors to HTTP."""
+    try:
+        return await heatmap_pool.run(http_request, cache_key, fn, *args, route_key=route_key)
+    except HeatmapPoolBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+class NoResponse(Response):
+    """Sends nothing: the client has already closed the connection."""
+
+    async def __call__(self, scope, receive, send):
+        return
+
+
+@app.exception_handler(HeatmapJobCancelled)
+async def heatmap_job_cancelled_handler(request: Request, exc: HeatmapJobCancelled):
+    # відповідь ніхто не прочитає, тому й не вигадуємо для неї статус
+    print('Client disconnected, heatmap job dropped')
+    return NoResponse()
+
+
+def survey_route_key(all_points_json: str) -> str:
+    """Routes renders of the same survey to the same pool worker (and its caches)."""
+    return hashlib.sha1((all_points_json or '').encode('utf-8')).hexdigest()
+
+
+async def render_heatmap(http_request: Request, points, width: int, height: int, etag: str) -> bytes:
+    points = [SurveyPoint(p.x, p.y, p.rssi) for p in points]
+    return await render_in_pool(http_request, etag, generate_smooth_heatmap, points, width, height,
+                                route_key=heatmap_points_digest(points))
 
 
 @app.post("/api/generate_heatmap")
-def generate_heatmap_endpoint(request: HeatmapRequest):
+async def generate_heatmap_endpoint(request: HeatmapRequest, http_request: Request):
     print('Handling heatmap generation request')
     """
     Приймає точки та повертає зображення теплової карти.
     """
-    print(f'All heatmap points: {request.all_points_json}')
-    with open('heatmap_points.json', 'w') as f:
-        try:
-            f.write(request.all_points_json)
-        except Exception as e:
-            print('Failed to save all heatmap points...')
-            print(str(e))
+    survey_id = await run_in_threadpool(save_heatmap_points, request)
 
     try:
         if not request.points:
             print('NO POINTS!!!')
-            return JSONResponse(content={"heatmap_base64": ""})
+            return JSONResponse(content={"heatmap_base64": "", "survey_id": survey_id})
 
         print('GENERATING HEATMAP IMAGE')
-        # 1. Генерація PNG байтів
-        png_bytes = generate_smooth_heatmap(request.points, request.width, request.height)
+        # 1. Генерація PNG байтів (в окремому процесі)
+        etag = heatmap_etag(request.points, request.width, request.height)
+        png_bytes = await render_heatmap(http_request, request.points, request.width, request.height, etag)
 
         print('ENCODING HEATMAP IMAGE')
         # 2. Кодування PNG в Base64 для передачі на фронтенд
@@ -243,12 +500,200 @@ def generate_heatmap_endpoint(request: HeatmapRequest):
         # 3. префікс для Data URL
         data_url = f"data:image/png;base64,{base64_encoded}"
 
-        return JSONResponse(content={"heatmap_base64": data_url})
+        return JSONResponse(content={"heatmap_base64": data_url, "survey_id": survey_id})
 
+    except (HTTPException, HeatmapJobCancelled):
+        raise
     except Exception as e:
         print(f"Error during heatmap generation: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+async def heatmap_png_response(http_request: Request, points, width: int, height: int,
+                               if_none_match: str | None, headers: dict | None = None) -> Response:
+    """PNG response with an ETag; 304 if the client already has this exact image."""
+    etag = heatmap_etag(points, width, height)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        png_bytes = await render_heatmap(http_request, points, width, height, etag)
+        return Response(content=png_bytes, media_type="image/png", headers=headers)
+
+    except (HTTPException, HeatmapJobCancelled):
+        raise
+    except Exception as e:
+        print(f"Error during heatmap generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+@app.post("/api/generate_heatmap/png")
+async def generate_heatmap_png_endpoint(request: HeatmapRequest, http_request: Request,
+                                        if_none_match: str | None = Header(default=None)):
+    """
+    Те саме, що /api/generate_heatmap, але повертає PNG байти (image/png) без base64.
+    ETag залежить від точок, розміру і налаштувань рендера, тому повторний запит
+    з If-None-Match -> 304.
+    """
+    survey_id = await run_in_threadpool(save_heatmap_points, request)
+    headers = {"X-Survey-Id": survey_id} if survey_id else None
+    return await heatmap_png_response(http_request, request.points, request.width, request.height,
+                                      if_none_match, headers)
+
+
+@app.get("/api/heatmap.png")
+async def get_heatmap_png(ssid: str, width: int, height: int, http_request: Request,
+                          survey_id: str | None = None, if_none_match: str | None = Header(default=None)):
+    """
+    Теплова карта збереженого обходу (за замовчуванням - останнього) для одного SSID.
+    GET, тож браузер сам кешує картинку і перепитує з If-None-Match -> 304 без рендера.
+    """
+    if width <= 0 or height <= 0:
+        raise HTTPException(status_code=400, detail="width and height must be positive")
+    all_points = await run_in_threadpool(load_points, survey_id)
+    points = survey_points(all_points, ssid)
+    return await heatmap_png_response(http_request, points, width, height, if_none_match)
+
+
+class HeatmapBatchRequest(BaseModel):
+    """Запит на карти для кількох мереж з одного обходу."""
+    ssids: List[str] = []
+    bssids: List[str] = []
+    width: int
+    height: int
+    all_points_json: str
+    missing_rssi: int = -95
+    survey_id: str | None = None
+
+
+@app.post("/api/generate_heatmap/batch")
+async def generate_heatmap_batch_endpoint(request: HeatmapBatchRequest, http_request: Request):
+    """
+    Повертає теплові карти для списку SSID/BSSID за один запит.
+    Мережі з однаковими точками вимірювання рахуються однією RBF підгонкою.
+    """
+    survey_id = await run_in_threadpool(save_heatmap_points, request)
+
+    try:
+        all_points = json.loads(request.all_points_json or '[]')
+        series = survey_series(all_points, request.ssids, request.bssids, request.missing_rssi)
+        rendered = await render_in_pool(
+            http_request, None, generate_heatmaps_batch, series, request.width, request.height,
+            route_key=survey_route_key(request.all_points_json)
+        )
+
+        heatmaps = {"ssid": {}, "bssid": {}}
+        for (field, name), png_bytes in rendered.items():
+            base64_encoded = base64.b64encode(png_bytes).decode('utf-8')
+            heatmaps[field][name] = f"data:image/png;base64,{base64_encoded}"
+
+        return JSONResponse(content={"heatmaps": heatmaps, "survey_id": survey_id})
+
+    except (HTTPException, HeatmapJobCancelled):
+        raise
+    except Exception as e:
+        print(f"Error during batch heatmap generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+class CoverageRequest(BaseModel):
+    """Запит на карту покриття: найсильніша точка доступу в кожному пікселі."""
+    bssids: List[str] = []
+    width: int
+    height: int
+    all_points_json: str
+    missing_rssi: int = -95
+    dead_zone_rssi: float = DEAD_ZONE_RSSI
+    roaming_margin_db: float = ROAMING_MARGIN_DB
+    survey_id: str | None = None
+
+
+@app.post("/api/heatmap/coverage")
+async def generate_coverage_endpoint(request: CoverageRequest, http_request: Request):
+    """
+    Карта покриття по BSSID (усі з обходу, якщо список порожній): колір - найсильніша
+    точка доступу, світліші зони - запас до другої менший за roaming_margin_db,
+    темні - сигнал нижче dead_zone_rssi. Плюс статистика площі по кожній точці.
+    """
+    survey_id = await run_in_threadpool(save_heatmap_points, request)
+
+    try:
+        all_points = json.loads(request.all_points_json or '[]')
+        bssids = request.bssids or survey_bssids(all_points)
+        series = survey_series(all_points, bssids=bssids, missing_rssi=request.missing_rssi)
+
+        png_bytes, stats = await render_in_pool(
+            http_request, None, generate_coverage_map, series, request.width, request.height,
+            request.dead_zone_rssi, request.roaming_margin_db,
+            route_key=survey_route_key(request.all_points_json)
+        )
+
+        for ap in stats["access_points"]:
+            # ключ ('bssid', mac) -> просто mac
+            ap["bssid"] = ap.pop("key")[1]
+
+        base64_encoded = base64.b64encode(png_bytes).decode('utf-8')
+        return JSONResponse(content={
+            "coverage_base64": f"data:image/png;base64,{base64_encoded}",
+            "stats": stats,
+            "survey_id": survey_id
+        })
+
+    except (HTTPException, HeatmapJobCancelled):
+        raise
+    except Exception as e:
+        print(f"Error during coverage map generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+class SurveyCreate(BaseModel):
+    name: str | None = None
+
+
+@app.get("/api/surveys")
+def get_surveys():
+    return {"success": True, "data": list_surveys()}
+
+
+@app.post("/api/surveys")
+def add_survey(item: SurveyCreate):
+    return {"success": True, "data": {"id": create_survey(item.name)}}
+
+
+@app.get("/api/surveys/{survey_id}/points")
+def get_survey_points(survey_id: str, ssid: str | None = None, bssid: str | None = None,
+                      x0: float | None = None, y0: float | None = None,
+                      x1: float | None = None, y1: float | None = None):
+    """Точки обходу; можна відфільтрувати мережу (ssid/bssid) і прямокутну область."""
+    region = None
+    if None not in (x0, y0, x1, y1):
+        region = (x0, y0, x1, y1)
+    return {"success": True, "data": load_points(survey_id, ssid, bssid, region)}
+
+
+@app.delete("/api/surveys/{survey_id}")
+def delete_survey_route(survey_id: str):
+    delete_survey(survey_id)
+    return {"success": True}
+
+
+@app.get("/api/heatmap/cache_stats")
+def get_heatmap_cache_stats():
+    # рендер іде у воркерах пулу - їхні кеші heatmap.py, сумарно, + стан пулу
+    return {"success": True, "data": {**heatmap_pool.worker_cache_stats(), "pool": heatmap_pool.stats()}}
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # Воркери рендера стартують через spawn, а він перевиконує скрипт __main__ (весь main.py
+    # з FastAPI, планувальником і асистентом) у кожному процесі. Модуль uvicorn.__main__
+    # spawn пропускає, тому сервер запускаємо через нього: воркер імпортує лише heatmap.
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", "8000"])
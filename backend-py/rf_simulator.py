@@ -0,0 +1,189 @@
+"""
+Deterministic synthetic RF environment for load-testing the scan pipeline.
+
+Same (n_aps, seed) always gives the same access points, and scan(i) always gives
+the same i-th scan, so runs on different machines / commits are comparable.
+
+    SCAN_BACKEND=synthetic SYNTHETIC_APS=2000 python main.py
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from scan_backends import RawNetwork, ScanBackend, _network_to_fixture, _record_scan_duration
+
+SYNTHETIC_APS = int(os.getenv("SYNTHETIC_APS", "300"))
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+# Секунди "ефіру" між сусідніми сканами (для дрейфу RSSI)
+SYNTHETIC_SCAN_INTERVAL = 10.0
+
+# Реальні OUI поширених виробників; вага ~ частка в житловому / стадіонному ефірі
+VENDORS = [
+    # (OUI, вага, шаблон SSID)
+    (["C0:06:C3", "CC:68:B6", "E8:48:B8"], 18, "TP-Link_{hex4}"),
+    (["FC:AB:90", "FC:BC:D1", "FC:E3:3C"], 12, "HUAWEI-{hex4}"),
+    (["F8:32:E4", "FC:34:97", "FC:C2:33"], 9, "ASUS_{hex2}"),
+    (["FC:19:99", "FC:64:BA", "FC:D9:08"], 8, "Xiaomi_{hex4}"),
+    (["FC:8A:3D", "FC:94:CE", "FC:C8:97"], 7, "Kyivstar_{hex4}"),
+    (["50:FF:20"], 5, "Keenetic-{num4}"),
+    (["E4:F4:C6", "E8:FC:AF", "F8:73:94"], 5, "NETGEAR{num2}"),
+    (["34:08:04", "5C:D9:98", "F0:7D:68"], 5, "DLink-{hex4}"),
+    (["CC:2D:21", "D8:32:14", "E8:65:D4"], 4, "Tenda_{hex4}"),
+    (["D4:CA:6D", "DC:2C:6E", "E4:8D:8C"], 4, "MikroTik-{hex4}"),
+    (["F4:EB:38", "F8:08:4F", "F8:AB:05"], 3, "Volia_{hex4}"),
+    (["F4:92:BF", "F4:E2:C6", "FC:EC:DA"], 7, "Stadium-WiFi"),
+    (["FC:5B:39", "FC:99:47", "FC:FB:FB"], 6, "Guest"),
+    (["F4:2E:7F", "F8:60:F0", "FC:7F:F1"], 4, "Staff-{num2}"),
+    (["F0:B0:52", "F8:E7:1E", "FC:5C:45"], 3, "Press"),
+]
+
+# Кириличні назви і форми, в яких їх віддають драйвери (усі обробляє fix_encoding)
+CYRILLIC_NAMES = ["Домівка", "Квартира_12", "Кав'ярня", "Офіс", "Гості", "Під'їзд_3", "Бабуся", "Стадіон"]
+SSID_ENCODINGS = [
+    ("utf8_str", 4),      # нормальний str
+    ("latin1_mojibake", 3),  # UTF-8 байти, прочитані як latin1 (pywifi на Linux)
+    ("utf8_bytes", 2),    # сирі байти (iw)
+    ("cp1251_bytes", 1),  # старі роутери з cp1251
+]
+CYRILLIC_SHARE = 0.12
+HIDDEN_SHARE = 0.05
+
+# Розподіл каналів: (канал, частота МГц, вага)
+CHANNELS_24 = [(ch, 2407 + 5 * ch, 30 if ch in (1, 6, 11) else 1.5) for ch in range(1, 14)]
+CHANNELS_5 = [(ch, 5000 + 5 * ch, 6 if ch <= 48 or ch >= 149 else 2)
+              for ch in [36, 40, 44, 48, 52, 56, 60, 64, 100, 104, 108, 112, 116, 120, 124, 128,
+                         132, 136, 140, 144, 149, 153, 157, 161, 165]]
+# 6 ГГц: 20-МГц канали, PSC (кожен четвертий) частіші
+CHANNELS_6 = [(k, 5955 + 20 * k, 4 if k % 4 == 1 else 1) for k in range(59)]
+BAND_SHARE = {"2.4": 0.5, "5": 0.42, "6": 0.08}
+WIDTHS = {"2.4": ([20, 40], [0.85, 0.15]), "5": ([20, 40, 80, 160], [0.2, 0.2, 0.5, 0.1]),
+          "6": ([80, 160], [0.6, 0.4])}
+SECURITY = (["WPA2", "WPA2 / WPA", "WPA3", "Open"], [0.7, 0.1, 0.12, 0.08])
+
+
+def _weighted(rng, n, items, weights):
+    weights = np.asarray(weights, dtype=float)
+    return rng.choice(len(items), size=n, p=weights / weights.sum())
+
+
+def _encode_ssid(name: str, encoding: str):
+    if encoding == "latin1_mojibake":
+        return name.encode("utf-8").decode("latin1")
+    if encoding == "utf8_bytes":
+        return name.encode("utf-8")
+    if encoding == "cp1251_bytes":
+        return name.encode("cp1251")
+    return name
+
+
+class SyntheticEnvironment:
+    """
+    n_aps BSSIDs around an observer. Each has a fixed mean RSSI from log-distance
+    path loss, slow drift (two sinusoids with AP-specific period/phase) and per-scan
+    shadowing noise. Weak APs drop out of some scans, as they do on real radios.
+    """
+
+    def __init__(self, n_aps: int = SYNTHETIC_APS, seed: int = SYNTHETIC_SEED,
+                 scan_interval: float = SYNTHETIC_SCAN_INTERVAL):
+        self.n_aps = n_aps
+        self.seed = seed
+        self.scan_interval = scan_interval
+        rng = np.random.default_rng(seed)
+
+        # MAC: OUI виробника + випадкові 24 біти
+        vendor_idx = _weighted(rng, n_aps, VENDORS, [v[1] for v in VENDORS])
+        nic = rng.choice(2 ** 24, size=n_aps, replace=n_aps > 2 ** 20)
+        self.bssids = []
+        ssids = []
+        for i, (v, tail) in enumerate(zip(vendor_idx, nic)):
+            ouis, _, template = VENDORS[v]
+            oui = ouis[i % len(ouis)].lower()
+            self.bssids.append(f"{oui}:{tail >> 16:02x}:{(tail >> 8) & 0xff:02x}:{tail & 0xff:02x}")
+            ssids.append(template.format(hex4=f"{tail & 0xffff:04X}", hex2=f"{tail & 0xff:02X}",
+                                         num4=f"{tail % 10000:04d}", num2=f"{tail % 100:02d}"))
+
+        # кирилиця в різних кодуваннях і приховані мережі
+        kind = rng.random(n_aps)
+        names = rng.integers(0, len(CYRILLIC_NAMES), n_aps)
+        encodings = _weighted(rng, n_aps, SSID_ENCODINGS, [e[1] for e in SSID_ENCODINGS])
+        for i in range(n_aps):
+            if kind[i] < HIDDEN_SHARE:
+                ssids[i] = ""
+            elif kind[i] < HIDDEN_SHARE + CYRILLIC_SHARE:
+                ssids[i] = _encode_ssid(CYRILLIC_NAMES[names[i]], SSID_ENCODINGS[encodings[i]][0])
+        self.ssids = ssids
+
+        # смуга, канал, ширина
+        bands = list(BAND_SHARE)
+        band_idx = _weighted(rng, n_aps, bands, list(BAND_SHARE.values()))
+        self.freqs = np.zeros(n_aps, dtype=np.int64)
+        self.widths = np.zeros(n_aps, dtype=np.int64)
+        for b, band in enumerate(bands):
+            mask = band_idx == b
+            count = int(mask.sum())
+            table = {"2.4": CHANNELS_24, "5": CHANNELS_5, "6": CHANNELS_6}[band]
+            picks = _weighted(rng, count, table, [c[2] for c in table])
+            self.freqs[mask] = [table[p][1] for p in picks]
+            widths, weights = WIDTHS[band]
+            self.widths[mask] = np.asarray(widths)[_weighted(rng, count, widths, weights)]
+
+        self.security = [SECURITY[0][i] for i in _weighted(rng, n_aps, *SECURITY)]
+
+        # середній RSSI: log-distance (n=3) від 2 до 150 м, потужність 17..23 dBm
+        distance = np.exp(rng.uniform(np.log(2), np.log(150), n_aps))
+        tx_power = rng.uniform(17, 23, n_aps)
+        freq_term = 20 * np.log10(self.freqs) - 27.55
+        self.mean_rssi = tx_power - freq_term - 30 * np.log10(distance)
+
+        self.drift_amplitude = rng.uniform(1, 6, n_aps)
+        self.drift_period = rng.uniform(600, 6 * 3600, n_aps)
+        self.drift_phase = rng.uniform(0, 2 * np.pi, n_aps)
+
+    def rssi_at(self, scan_index: int):
+        """RSSI of every AP in scan scan_index (NaN = not heard)."""
+        t = scan_index * self.scan_interval
+        drift = self.drift_amplitude * np.sin(2 * np.pi * t / self.drift_period + self.drift_phase)
+        drift += 0.5 * self.drift_amplitude * np.sin(2 * np.pi * t / (self.drift_period / 7.3) + 2 * self.drift_phase)
+
+        rng = np.random.default_rng([self.seed, scan_index])
+        rssi = np.round(self.mean_rssi + drift + rng.normal(0, 2.0, self.n_aps))
+        # поріг чутливості ~ -92 dBm, біля нього мережа то є, то немає
+        heard = rssi + rng.normal(0, 3.0, self.n_aps) > -92
+        return np.where(heard, np.clip(rssi, -100, -20), np.nan)
+
+    def scan(self, scan_index: int):
+        rssi = self.rssi_at(scan_index)
+        return [
+            RawNetwork(self.ssids[i], self.bssids[i], int(rssi[i]), int(self.freqs[i]),
+                       self.security[i], int(self.widths[i]))
+            for i in np.flatnonzero(~np.isnan(rssi))
+        ]
+
+    def write_fixture(self, path: str, n_scans: int, start: int = 0):
+        """Saves scans start..start+n_scans as a JSON lines fixture for FakeBackend."""
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(start, start + n_scans):
+                f.write(json.dumps([_network_to_fixture(n) for n in self.scan(i)], ensure_ascii=False) + "\n")
+
+
+class SyntheticBackend(ScanBackend):
+    """Scan backend that walks through the synthetic environment one scan per call."""
+
+    name = "synthetic"
+
+    def __init__(self, environment: SyntheticEnvironment = None):
+        self.environment = environment or SyntheticEnvironment()
+        self._lock = threading.Lock()
+        self._index = 0
+
+    def scan(self):
+        start = time.monotonic()
+        with self._lock:
+            index = self._index
+            self._index += 1
+        networks = self.environment.scan(index)
+        _record_scan_duration(self.name, time.monotonic() - start)
+        return networks
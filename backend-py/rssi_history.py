@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Скільки сканів пам'ятаємо (120960 = 14 днів при скануванні кожні 10 с)
+RSSI_HISTORY_SLOTS = int(os.getenv("RSSI_HISTORY_SLOTS", "120960"))
+# Скільки BSSID відстежуємо одночасно; найдовше не бачені витісняються
+RSSI_HISTORY_MAX_BSSIDS = int(os.getenv("RSSI_HISTORY_MAX_BSSIDS", "256"))
+# Папка для memmap-файлів; порожній рядок - тільки в пам'яті (історія зникає при рестарті)
+RSSI_HISTORY_DIR = os.getenv("RSSI_HISTORY_DIR", "rssi_history")
+
+# Значення "мережу в цьому скані не було чути"
+MISSING = -128
+# Без step відповідь range проріджується до стількох точок
+DEFAULT_MAX_POINTS = 1000
+# meta.json пишемо одразу лише при зміні рядків BSSID, інакше (last_seen) - не частіше
+META_SAVE_INTERVAL = 60
+
+
+class RSSIHistory:
+    """
+    Fixed-size ring buffers of RSSI readings, one per BSSID.
+
+    All buffers share one scan clock: slot i holds the i-th scan (times[i]) and
+    rssi[i, row] is what BSSID `row` measured in it (int8, MISSING if not heard).
+    A scan is one contiguous write, and memory is bounded by
+    slots * (max_bssids + 8) bytes regardless of how long the app runs. With a
+    directory the arrays are memory-mapped .npy files and survive restarts; head
+    and count are recovered from the times array, so meta.json (the BSSID -> row
+    map) is only rewritten when that map changes or every META_SAVE_INTERVAL.
+    """
+
+    def __init__(self, slots: int = RSSI_HISTORY_SLOTS, max_bssids: int = RSSI_HISTORY_MAX_BSSIDS,
+                 directory: str = RSSI_HISTORY_DIR):
+        self.slots = slots
+        self.max_bssids = max_bssids
+        self.directory = directory or None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._times = None
+        self._rssi = None
+        self._head = 0          # наступний слот для запису
+        self._count = 0         # скільки слотів заповнено
+        self._bssids = {}       # bssid -> {"row", "ssid", "last_seen", "since"}, за last_seen
+        self._free_rows = []
+        self._rows_changed = False
+        self._meta_saved_at = None      # time.monotonic()
+
+    # --- storage ---
+
+    def _paths(self):
+        return (os.path.join(self.directory, "times.npy"),
+                os.path.join(self.directory, "rssi.npy"),
+                os.path.join(self.directory, "meta.json"))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        if self.directory is None:
+            self._times = np.full(self.slots, np.nan)
+            self._rssi = np.full((self.slots, self.max_bssids), MISSING, dtype=np.int8)
+            self._set_bssids({})
+        else:
+            self._open_files()
+        self._meta_saved_at = time.monotonic()
+        self._loaded = True
+
+    def _open_files(self):
+        os.makedirs(self.directory, exist_ok=True)
+        times_path, rssi_path, meta_path = self._paths()
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("slots") != self.slots or meta.get("max_bssids") != self.max_bssids:
+                raise ValueError("history size changed")
+            self._times = np.lib.format.open_memmap(times_path, mode="r+")
+            self._rssi = np.lib.format.open_memmap(rssi_path, mode="r+")
+            self._head, self._count = _ring_position(self._times)
+            self._set_bssids(meta["bssids"])
+            return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"RSSI history reset ({e})")
+
+        self._times = np.lib.format.open_memmap(times_path, mode="w+", dtype=np.float64, shape=(self.slots,))
+        self._times[:] = np.nan
+        self._rssi = np.lib.format.open_memmap(
+            rssi_path, mode="w+", dtype=np.int8, shape=(self.slots, self.max_bssids)
+        )
+        self._rssi[:] = MISSING
+        self._head = 0
+        self._count = 0
+        self._set_bssids({})
+        self._save_meta()
+
+    def _set_bssids(self, bssids: dict):
+        self._bssids = dict(sorted(bssids.items(), key=lambda item: item[1]["last_seen"]))
+        used = {entry["row"] for entry in self._bssids.values()}
+        self._free_rows = [row for row in reversed(range(self.max_bssids)) if row not in used]
+
+    def _save_meta(self):
+        self._rows_changed = False
+        self._meta_saved_at = time.monotonic()
+        if self.directory is None:
+            return
+        _, _, meta_path = self._paths()
+        meta = {"slots": self.slots, "max_bssids": self.max_bssids, "bssids": self._bssids}
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _row_for(self, bssid: str, ssid, now: float):
+        """Row of the BSSID, allocating one if needed; None if every row is taken by this scan."""
+        entry = self._bssids.pop(bssid, None)
+        if entry is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                # місця немає - забираємо рядок BSSID, який найдовше не з'являвся
+                # (словник упорядкований за last_seen, тож це перший ключ)
+                oldest = next(iter(self._bssids), None)
+                if oldest is None or self._bssids[oldest]["last_seen"] >= now:
+                    return None
+                row = self._bssids.pop(oldest)["row"]
+            # старі значення в рядку не стираємо - читання відсікає все до "since"
+            entry = {"row": row, "ssid": ssid, "last_seen": now, "since": now}
+            self._rows_changed = True
+        entry["last_seen"] = now
+        if ssid:
+            entry["ssid"] = ssid
+        self._bssids[bssid] = entry
+        return entry["row"]
+
+    # --- writes ---
+
+    def record(self, networks, scanned_at=None):
+        """Scan listener: appends one scan (list of network dicts) to every buffer."""
+        now = scanned_at or time.time()
+        with self._lock:
+            self._ensure_loaded()
+
+            readings = np.full(self.max_bssids, MISSING, dtype=np.int8)
+            # якщо мереж більше, ніж рядків, місце дістається найсильнішим
+            if len(networks) > self.max_bssids:
+                networks = sorted(networks, key=lambda n: n.get("rssi") or -999, reverse=True)
+            for n in networks:
+                bssid = (n.get("bssid") or "").lower()
+                if not bssid:
+                    continue
+                try:
+                    rssi = int(n["rssi"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                row = self._row_for(bssid, n.get("ssid"), now)
+                if row is not None:
+                    readings[row] = max(MISSING + 1, min(rssi, 127))
+
+            self._times[self._head] = now
+            self._rssi[self._head] = readings
+            self._head = (self._head + 1) % self.slots
+            self._count = min(self._count + 1, self.slots)
+            # без нового BSSID змінились лише last_seen - їх можна записати пізніше
+            if self._rows_changed or time.monotonic() - self._meta_saved_at >= META_SAVE_INTERVAL:
+                self._save_meta()
+
+    def flush(self):
+        with self._lock:
+            if self.directory is not None and self._loaded:
+                self._times.flush()
+                self._rssi.flush()
+                self._save_meta()
+
+    # --- reads ---
+
+    def _series(self, bssid: str, start=None, end=None):
+        """Chronological (times, rssi) of one BSSID in [start, end], only scans where it was heard."""
+        entry = self._bssids.get(bssid.lower())
+        if entry is None:
+            return None
+        row = entry["row"]
+
+        # розгортаємо кільце: від найстаріших слотів до head
+        if self._count < self.slots:
+            order = [slice(0, self._count)]
+        else:
+            order = [slice(self._head, self.slots), slice(0, self._head)]
+        times = np.concatenate([self._times[s] for s in order])
+        values = np.concatenate([self._rssi[s, row] for s in order])
+
+        mask = (values != MISSING) & (times >= entry.get("since", 0))
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return times[mask], values[mask].astype(np.int64)
+
+    def list_bssids(self):
+        with self._lock:
+            self._ensure_loaded()
+            last_slot = (self._head - 1) % self.slots
+            result = []
+            for bssid, entry in self._bssids.items():
+                last_rssi = int(self._rssi[last_slot, entry["row"]]) if self._count else MISSING
+                result.append({
+                    "bssid": bssid,
+                    "ssid": entry.get("ssid"),
+                    "last_seen": entry["last_seen"],
+                    "last_rssi": last_rssi if last_rssi != MISSING else None,
+                })
+        return sorted(result, key=lambda x: x["last_seen"], reverse=True)
+
+    def query(self, bssid: str, start=None, end=None, step=None, max_points: int = DEFAULT_MAX_POINTS):
+        """
+        Readings of one BSSID between start and end (unix seconds).
+        With step (seconds) - one {t, min, mean, max, count} row per window;
+        without it raw {t, rssi} points, downsampled to max_points windows if there are more.
+        "mode" says which one came back: "raw" (under "points") or "windows".
+        Returns None for an unknown BSSID.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            series = self._series(bssid, start, end)
+        if series is None:
+            return None
+        times, values = series
+
+        summary = {"count": int(len(values))}
+        if len(values):
+            summary.update(min=int(values.min()), mean=round(float(values.mean()), 2), max=int(values.max()))
+
+        if step is None and max_points and len(values) > max_points:
+            step = (times[-1] - times[0]) / max_points or 1.0
+
+        if step is None:
+            points = [{"t": t, "rssi": v} for t, v in zip(times.tolist(), values.tolist())]
+            return {"bssid": bssid.lower(), "mode": "raw", "step": None, "summary": summary, "points": points}
+
+        return {"bssid": bssid.lower(), "mode": "windows", "step": step, "summary": summary,
+                "windows": _aggregate(times, values, step, start)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_loaded()
+            oldest = None
+            if self._count:
+                oldest = float(self._times[0 if self._count < self.slots else self._head])
+            return {
+                "slots": self.slots,
+                "filled": self._count,
+                "bssids": len(self._bssids),
+                "max_bssids": self.max_bssids,
+                "oldest": oldest,
+                "memory_bytes": int(self._times.nbytes + self._rssi.nbytes),
+                "persistent": self.directory is not None,
+            }
+
+
+def _ring_position(times):
+    """(head, count) of a ring whose unused slots are NaN and whose times only grow."""
+    filled = ~np.isnan(times)
+    count = int(filled.sum())
+    if count < len(times):
+        # кільце ще не обернулося - заповнено рівно перші count слотів
+        return count, count
+    return (int(np.argmax(times)) + 1) % len(times), count
+
+
+def _aggregate(times, values, step: float, start=None):
+    """min/mean/max per fixed window of `step` seconds (times are sorted)."""
+    if not len(values):
+        return []
+    origin = start if start is not None else times[0]
+    window = np.floor((times - origin) / step).astype(np.int64)
+
+    # вікна йдуть підряд, тож reduceat по межах вікон
+    bounds = np.flatnonzero(np.r_[True, window[1:] != window[:-1]])
+    counts = np.diff(np.r_[bounds, len(values)])
+    sums = np.add.reduceat(values, bounds)
+    mins = np.minimum.reduceat(values, bounds)
+    maxs = np.maximum.reduceat(values, bounds)
+    starts = origin + window[bounds] * step
+
+    return [
+        {"t": float(t), "min": int(lo), "mean": round(float(s) / int(c), 2), "max": int(hi), "count": int(c)}
+        for t, lo, s, hi, c in zip(starts, mins, sums, maxs, counts)
+    ]
+
+
+rssi_history = RSSIHistory()
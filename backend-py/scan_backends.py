@@ -0,0 +1,501 @@
+"""
+Wi-Fi scan backends. Every backend returns RawNetwork tuples, which
+wifi_service.enrich_scan turns into the API rows.
+
+    pywifi - pywifi (wpa_supplicant / WLAN API), triggers a real scan
+    iw     - parses `iw dev <if> scan dump` (kernel scan cache, all interfaces)
+    fake   - replays recorded fixtures, for CI / benchmarks without a radio
+    synthetic - generated RF environment (rf_simulator), for load tests
+
+Select with SCAN_BACKEND=auto|pywifi|iw|fake|synthetic (auto: pywifi, then iw).
+"""
+import abc
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+try:
+    import pywifi
+except ImportError:  # на частині машин pywifi не підтримується
+    pywifi = None
+
+from link_state import wireless_interfaces
+
+SCAN_BACKEND = os.getenv("SCAN_BACKEND", "auto")
+# Через кому; за замовчуванням - усі бездротові інтерфейси з sysfs
+SCAN_INTERFACES = [name for name in os.getenv("SCAN_INTERFACES", "").split(",") if name]
+SCAN_FIXTURE = os.getenv("SCAN_FIXTURE", os.path.join(os.path.dirname(__file__), "fixtures", "scans"))
+# Імітація часу сканування для fake-бекенду (секунди)
+SCAN_FAKE_DELAY = float(os.getenv("SCAN_FAKE_DELAY", "0"))
+# Якщо задано - кожен "сирий" скан дописується сюди (JSON lines), це і є fixture для fake
+SCAN_RECORD_PATH = os.getenv("SCAN_RECORD_PATH", "")
+IW_TIMEOUT = 10
+# Якщо жоден бекенд недоступний - шукаємо знову не частіше, ніж раз на стільки секунд
+BACKEND_RETRY_INTERVAL = 60
+
+RawNetwork = namedtuple("RawNetwork", ["ssid", "bssid", "signal", "freq", "security", "width"],
+                        defaults=[None])
+
+
+# --- scan timing (per interface) ---
+
+# Останні тривалості сканування по інтерфейсах - для підбору параметрів під адаптер
+_scan_durations = {}
+_scan_durations_lock = threading.Lock()
+
+
+def _record_scan_duration(iface_name, seconds):
+    with _scan_durations_lock:
+        _scan_durations.setdefault(iface_name, deque(maxlen=50)).append(seconds)
+
+
+def get_scan_timing_stats() -> dict:
+    """Observed scan durations per interface (last 50 scans)."""
+    stats = {}
+    with _scan_durations_lock:
+        for name, durations in _scan_durations.items():
+            ordered = sorted(durations)
+            stats[name] = {
+                "count": len(ordered),
+                "last": round(durations[-1], 2),
+                "p50": round(ordered[len(ordered) // 2], 2),
+                "p90": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 2),
+                "max": round(ordered[-1], 2),
+            }
+    return stats
+
+
+class ScanBackend(abc.ABC):
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def scan(self):
+        """One scan: list of RawNetwork (duplicates allowed, wifi_service dedups)."""
+
+
+# --- pywifi ---
+
+# Очікування завершення сканування (секунди): не менше MIN, не більше MAX
+SCAN_MIN_WAIT = float(os.getenv("SCAN_MIN_WAIT", "0.5"))
+SCAN_MAX_WAIT = float(os.getenv("SCAN_MAX_WAIT", "5"))
+SCAN_POLL_INTERVAL = 0.2
+# Скільки опитувань поспіль список має не змінюватися
+SCAN_STABLE_POLLS = 2
+# Якщо список так і не змінився відносно попереднього (тихий ефір) - чекаємо стільки
+SCAN_QUIET_WAIT = 2.0
+
+
+def _scan_fingerprint(results):
+    return frozenset((p.bssid, p.signal) for p in results)
+
+
+def _iface_scanning(iface):
+    """True/False from the driver state, None if the driver does not report it."""
+    try:
+        return iface.status() == pywifi.const.IFACE_SCANNING
+    except Exception:
+        return None
+
+
+def _wait_for_scan(iface, before):
+    """
+    Polls the interface after iface.scan() until the scan looks complete: the driver
+    no longer reports scanning and the result set stopped changing. Returns
+    (scan_results, seconds waited).
+    """
+    start = time.monotonic()
+    changed = False
+    stable_polls = 0
+    last = before
+    results = []
+
+    while True:
+        time.sleep(SCAN_POLL_INTERVAL)
+        elapsed = time.monotonic() - start
+
+        results = iface.scan_results()
+        fingerprint = _scan_fingerprint(results)
+        changed = changed or fingerprint != before
+        stable_polls = stable_polls + 1 if fingerprint == last else 0
+        last = fingerprint
+
+        if elapsed >= SCAN_MAX_WAIT:
+            break
+        if elapsed < SCAN_MIN_WAIT or _iface_scanning(iface):
+            continue
+        if stable_polls >= SCAN_STABLE_POLLS and (changed or elapsed >= SCAN_QUIET_WAIT):
+            break
+
+    return results, time.monotonic() - start
+
+
+class PywifiBackend(ScanBackend):
+    name = "pywifi"
+
+    def available(self) -> bool:
+        if pywifi is None:
+            return False
+        try:
+            return bool(pywifi.PyWiFi().interfaces())
+        except Exception:
+            return False
+
+    def scan(self):
+        wifi = pywifi.PyWiFi()
+
+        try:
+            iface = wifi.interfaces()[0]
+        except Exception as e:
+            print(f"Error getting interface: {e}")
+            return []
+
+        # знімок до сканування, щоб побачити, коли драйвер віддасть нові дані
+        try:
+            before = _scan_fingerprint(iface.scan_results())
+        except Exception:
+            before = frozenset()
+
+        iface.scan()
+        print("Scanning... (waiting for the driver)")
+        scan_results, duration = _wait_for_scan(iface, before)
+        _record_scan_duration(iface.name(), duration)
+        print(f"Scan finished in {duration:.2f}s")
+
+        networks = []
+        for profile in scan_results:
+            security_types = []
+            for akm in profile.akm:
+                if akm == pywifi.const.AKM_TYPE_WPA2PSK: security_types.append("WPA2")
+                elif akm == pywifi.const.AKM_TYPE_WPAPSK: security_types.append("WPA")
+                elif akm == pywifi.const.AKM_TYPE_NONE: security_types.append("Open")
+
+            networks.append(RawNetwork(profile.ssid, profile.bssid, profile.signal, profile.freq,
+                                       " / ".join(security_types) or "Open"))
+        return networks
+
+
+# --- iw scan dump ---
+
+_BSS_RE = re.compile(r"^BSS ([0-9a-fA-F:]{17})")
+_CHANNEL_WIDTH_RE = re.compile(r"channel width:\s*(\d+)", re.IGNORECASE)
+_SSID_ESCAPE_RE = re.compile(rb"\\x([0-9a-fA-F]{2})")
+
+# коди ширини з VHT / HE (6 GHz) / EHT operation
+_VHT_WIDTHS = {1: 80, 2: 160, 3: 160}
+_HE_EHT_WIDTHS = {0: 20, 1: 40, 2: 80, 3: 160, 4: 320}
+
+
+def _unescape_ssid(text: str) -> bytes:
+    """iw prints non-printable SSID bytes as \\xNN; returns the raw SSID bytes."""
+    raw = text.encode("utf-8", errors="surrogateescape")
+    return _SSID_ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 16)]), raw)
+
+
+class _BssBuilder:
+    """Accumulates the lines of one `BSS ...` block."""
+
+    def __init__(self, bssid):
+        self.bssid = bssid.lower()
+        self.ssid = b""
+        self.freq = None
+        self.signal = None
+        self.privacy = False
+        self.rsn = False
+        self.wpa = False
+        self.psk = False
+        self.sae = False
+        self.ht_40 = False
+        self.width = 20
+        self.vht_seg2 = 0
+        self.section = None
+
+    def feed(self, line: str):
+        if line.startswith("\t") and not line.startswith("\t\t") and not line.startswith("\t *"):
+            key, _, value = line[1:].partition(":")
+            self.section = key.strip()
+            value = value.strip()
+            if self.section == "freq":
+                self.freq = int(float(value))
+            elif self.section == "signal":
+                self.signal = int(round(float(value.split()[0])))
+            elif self.section == "SSID":
+                self.ssid = _unescape_ssid(line[1:].partition(": ")[2].rstrip("\n"))
+            elif self.section == "capability":
+                self.privacy = "Privacy" in value
+            elif self.section == "RSN":
+                self.rsn = True
+            elif self.section == "WPA":
+                self.wpa = True
+            self._feed_detail(value)
+            return
+        self._feed_detail(line.strip())
+
+    def _feed_detail(self, text: str):
+        section = self.section
+        if section == "RSN" and "Authentication suites" in text:
+            suites = text.partition(":")[2].split()
+            # PSK, FT/PSK, PSK-SHA256 / SAE, FT/SAE, SAE-EXT-KEY
+            self.psk = self.psk or any("PSK" in suite for suite in suites)
+            self.sae = self.sae or any("SAE" in suite for suite in suites)
+        elif section == "HT operation":
+            if "secondary channel offset" in text and ("above" in text or "below" in text):
+                self.ht_40 = True
+            elif "STA channel width" in text and "20 MHz" in text:
+                self.ht_40 = False
+        elif section == "VHT operation":
+            match = _CHANNEL_WIDTH_RE.search(text)
+            if match and int(match.group(1)) in _VHT_WIDTHS:
+                self.width = max(self.width, _VHT_WIDTHS[int(match.group(1))])
+            elif "center freq segment 2" in text:
+                self.vht_seg2 = int(text.rsplit(":", 1)[1].strip() or 0)
+        elif section in ("HE operation", "HE Operation", "EHT operation", "EHT Operation"):
+            match = _CHANNEL_WIDTH_RE.search(text)
+            if match and int(match.group(1)) in _HE_EHT_WIDTHS:
+                self.width = max(self.width, _HE_EHT_WIDTHS[int(match.group(1))])
+
+    def build(self) -> RawNetwork:
+        width = self.width
+        if self.ht_40:
+            width = max(width, 40)
+        if width == 80 and self.vht_seg2:
+            # нова сигналізація 160 МГц: width=1 і ненульовий другий сегмент
+            width = 160
+
+        security = []
+        if self.rsn:
+            # PSK + SAE - перехідний режим, до мережі можна підключитися і по WPA2
+            if self.sae:
+                security.append("WPA2/WPA3" if self.psk else "WPA3")
+            else:
+                security.append("WPA2")
+        if self.wpa:
+            security.append("WPA")
+        if not security and self.privacy:
+            security.append("WEP")
+        return RawNetwork(self.ssid, self.bssid, self.signal, self.freq,
+                          " / ".join(security) or "Open", width)
+
+
+def parse_iw_scan(lines):
+    """
+    Stream parser for `iw dev <if> scan [dump]` output: yields a RawNetwork as soon
+    as its BSS block ends, so the whole output is never held in memory.
+    """
+    current = None
+    for line in lines:
+        match = _BSS_RE.match(line)
+        if match:
+            if current is not None:
+                yield current.build()
+            current = _BssBuilder(match.group(1))
+        elif current is not None and line.strip():
+            try:
+                current.feed(line.rstrip("\n"))
+            except (ValueError, IndexError):
+                continue
+    if current is not None:
+        yield current.build()
+
+
+class IwBackend(ScanBackend):
+    """
+    Reads the kernel scan cache of every interface; no new scan is triggered.
+    A dump is a few KB per interface, so it is read whole with a deadline: an iw
+    that hangs is killed after IW_TIMEOUT instead of blocking the scan.
+    """
+
+    name = "iw"
+
+    def __init__(self, interfaces=None):
+        self._interfaces = interfaces or SCAN_INTERFACES
+
+    def interfaces(self):
+        return self._interfaces or wireless_interfaces()
+
+    def available(self) -> bool:
+        return shutil.which("iw") is not None and bool(self.interfaces())
+
+    def _dump(self, iface):
+        start = time.monotonic()
+        try:
+            # run() вбиває процес, якщо він не встиг за timeout
+            result = subprocess.run(
+                ["iw", "dev", iface, "scan", "dump"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=IW_TIMEOUT,
+                encoding="utf-8", errors="surrogateescape"
+            )
+        finally:
+            _record_scan_duration(iface, time.monotonic() - start)
+        return parse_iw_scan(result.stdout.splitlines(keepends=True))
+
+    def scan(self):
+        # кілька інтерфейсів на одному радіо бачать ті самі BSS - лишаємо найсильніший
+        best = {}
+        for iface in self.interfaces():
+            try:
+                for network in self._dump(iface):
+                    known = best.get(network.bssid)
+                    if known is None or (network.signal or -999) > (known.signal or -999):
+                        best[network.bssid] = network
+            except Exception as e:
+                print(f"iw scan dump failed on {iface}: {e}")
+        return list(best.values())
+
+
+# --- fixtures ---
+
+def _network_from_fixture(entry: dict) -> RawNetwork:
+    ssid = bytes.fromhex(entry["ssid_hex"]) if "ssid_hex" in entry else entry.get("ssid", "")
+    return RawNetwork(ssid, entry.get("bssid"), entry.get("signal", entry.get("rssi")), entry.get("freq"),
+                      entry.get("security", "Open"), entry.get("width"))
+
+
+def _network_to_fixture(network: RawNetwork) -> dict:
+    entry = network._asdict()
+    if isinstance(network.ssid, bytes):
+        entry["ssid_hex"] = entry.pop("ssid").hex()
+    return entry
+
+
+def load_fixture_scans(path):
+    """
+    Recorded scans from a file or a directory of files:
+    .jsonl - one scan (list of networks) per line, .json - a scan or a list of scans,
+    .txt - `iw ... scan dump` output (one scan).
+    """
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.json*")) + glob.glob(os.path.join(path, "*.txt")))
+    else:
+        files = [path]
+
+    scans = []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            if file_path.endswith(".txt"):
+                scans.append(list(parse_iw_scan(f)))
+            elif file_path.endswith(".jsonl"):
+                scans.extend([_network_from_fixture(n) for n in json.loads(line)] for line in f if line.strip())
+            else:
+                data = json.load(f)
+                if data and isinstance(data[0], dict):
+                    data = [data]
+                scans.extend([_network_from_fixture(n) for n in scan] for scan in data)
+    return scans
+
+
+class FakeBackend(ScanBackend):
+    """Replays recorded scans in a loop; scans can also be passed in directly."""
+
+    name = "fake"
+
+    def __init__(self, scans=None, fixture_path=SCAN_FIXTURE, delay: float = SCAN_FAKE_DELAY):
+        self._scans = scans
+        self._fixture_path = fixture_path
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._index = 0
+
+    def _load(self):
+        if self._scans is None:
+            self._scans = load_fixture_scans(self._fixture_path)
+        return self._scans
+
+    def available(self) -> bool:
+        try:
+            return bool(self._load())
+        except OSError:
+            return False
+
+    def scan(self):
+        start = time.monotonic()
+        with self._lock:
+            scans = self._load()
+            if not scans:
+                return []
+            scan = scans[self._index % len(scans)]
+            self._index += 1
+        if self.delay:
+            time.sleep(self.delay)
+        _record_scan_duration("fake", time.monotonic() - start)
+        return list(scan)
+
+
+class RecordingBackend(ScanBackend):
+    """Wraps a backend and appends every raw scan to a JSON lines fixture."""
+
+    def __init__(self, inner: ScanBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self.name = inner.name
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def scan(self):
+        networks = self.inner.scan()
+        try:
+            line = json.dumps([_network_to_fixture(n) for n in networks], ensure_ascii=False)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            print(f"Failed to record scan: {e}")
+        return networks
+
+
+BACKENDS = {
+    "pywifi": PywifiBackend,
+    "iw": IwBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+_backend_checked_at = None     # time.monotonic() останнього пошуку бекенду
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = SCAN_BACKEND):
+    """Backend by name; 'auto' picks the first available of pywifi, iw. None if nothing works."""
+    if name == "synthetic":
+        from rf_simulator import SyntheticBackend
+        backend = SyntheticBackend()
+    elif name != "auto":
+        backend = BACKENDS[name]()
+    else:
+        backend = next((b for b in (PywifiBackend(), IwBackend()) if b.available()), None)
+    if backend is not None and SCAN_RECORD_PATH:
+        backend = RecordingBackend(backend, SCAN_RECORD_PATH)
+    return backend
+
+
+def get_scan_backend():
+    """
+    The active backend, created on first use. "Nothing available" is remembered
+    too and re-checked at most every BACKEND_RETRY_INTERVAL seconds, so scans on
+    a machine without a radio do not probe pywifi and iw every time.
+    """
+    global _backend, _backend_checked_at
+    with _backend_lock:
+        now = time.monotonic()
+        if _backend is None and (_backend_checked_at is None or now - _backend_checked_at >= BACKEND_RETRY_INTERVAL):
+            _backend_checked_at = now
+            _backend = create_backend()
+            if _backend is not None:
+                print(f"Scan backend: {_backend.name}")
+        return _backend
+
+
+def set_scan_backend(backend):
+    """Replaces the active backend (e.g. FakeBackend in benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
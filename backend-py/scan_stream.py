@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+# Фонове сканування вмикається, якщо інтервал > 0 (секунди)
+BACKGROUND_SCAN_INTERVAL = float(os.getenv("BACKGROUND_SCAN_INTERVAL", "0"))
+# Мінімальна зміна RSSI (dB), про яку повідомляємо підписників
+RSSI_CHANGE_THRESHOLD = int(os.getenv("RSSI_CHANGE_THRESHOLD", "3"))
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Runs in the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # клієнт не встигає - викидаємо черговість і просимо повний знімок
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class ScanStream:
+    """
+    Keeps the latest scan in memory and fans out only the changes to subscribers:
+    BSSIDs that appeared or disappeared and RSSI moves of at least RSSI_CHANGE_THRESHOLD
+    dB since the value last reported for that BSSID.
+    """
+
+    def __init__(self, threshold: int = RSSI_CHANGE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._reported_rssi = {}
+        self._scanned_at = None
+        self._seq = 0
+        self._subscribers = set()
+
+    def publish(self, networks, scanned_at=None):
+        """Scan listener: called from whichever thread finished the scan."""
+        # мережі без сигналу (iw може не віддати signal) у потік не потрапляють
+        current = {n["bssid"]: n for n in networks if n.get("rssi") is not None}
+
+        with self._lock:
+            appeared = [n for bssid, n in current.items() if bssid not in self._latest]
+            disappeared = [bssid for bssid in self._latest if bssid not in current]
+
+            changed = []
+            for bssid, n in current.items():
+                reported = self._reported_rssi.get(bssid)
+                if reported is None:
+                    self._reported_rssi[bssid] = n["rssi"]
+                elif abs(n["rssi"] - reported) >= self.threshold:
+                    changed.append({"bssid": bssid, "rssi": n["rssi"], "delta": n["rssi"] - reported})
+                    self._reported_rssi[bssid] = n["rssi"]
+            for bssid in disappeared:
+                self._reported_rssi.pop(bssid, None)
+
+            self._latest = current
+            self._scanned_at = scanned_at or time.time()
+
+            if not (appeared or disappeared or changed):
+                return
+
+            self._seq += 1
+            event = {
+                "type": "diff",
+                "seq": self._seq,
+                "scanned_at": self._scanned_at,
+                "appeared": appeared,
+                "disappeared": disappeared,
+                "changed": changed,
+            }
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            networks = sorted(self._latest.values(), key=lambda x: x["rssi"], reverse=True)
+            return {"type": "snapshot", "seq": self._seq, "scanned_at": self._scanned_at, "networks": networks}
+
+    def subscribe(self) -> _Subscriber:
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    async def events(self, request):
+        """Server-Sent Events: a snapshot first, then diffs; heartbeats keep proxies open."""
+        subscriber = self.subscribe()
+        try:
+            yield _sse(self.snapshot())
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event["type"] == "resync":
+                    event = self.snapshot()
+                yield _sse(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+scan_stream = ScanStream()
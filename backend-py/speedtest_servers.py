@@ -0,0 +1,157 @@
+"""
+Speedtest server selection cache.
+
+speedtest.Speedtest() downloads the config and get_best_server() downloads the
+server list and pings the closest candidates - several seconds per test. The
+config and the ranked candidates are kept for SPEEDTEST_SERVER_TTL; a test with a
+fresh cache only pings the cached best server. If that latency got noticeably
+worse than when the server was ranked, the ranking is refreshed in the background
+after the test, so the next one picks a better server.
+"""
+import copy
+import os
+import threading
+import time
+
+import speedtest
+
+SPEEDTEST_SERVER_TTL = float(os.getenv("SPEEDTEST_SERVER_TTL", str(6 * 3600)))
+# Переранжування, якщо пінг до сервера виріс у стільки разів і щонайменше на стільки мс
+SPEEDTEST_RERANK_FACTOR = float(os.getenv("SPEEDTEST_RERANK_FACTOR", "1.5"))
+SPEEDTEST_RERANK_MIN_MS = 10.0
+SPEEDTEST_SERVER_CANDIDATES = 5
+# Скільки чекаємо фонове переранжування, якщо тест стартував під час нього
+RERANK_WAIT_SECONDS = 30
+
+# get_best_server рахує 3600 с на кожну невдалу спробу: 3 з 3 -> 1 800 000 мс
+_UNREACHABLE_MS = 3600 * 3 / 6 * 1000
+
+
+class _CachedConfigSpeedtest(speedtest.Speedtest):
+    """Speedtest that takes the already downloaded config instead of fetching it again."""
+
+    def __init__(self, cached_config: dict, **kwargs):
+        self._cached_config = cached_config
+        super().__init__(**kwargs)
+
+    def get_config(self):
+        self.config = copy.deepcopy(self._cached_config)
+        client = self.config["client"]
+        self.lat_lon = (float(client["lat"]), float(client["lon"]))
+        return self.config
+
+
+class ServerSelectionCache:
+    def __init__(self, ttl: float = SPEEDTEST_SERVER_TTL, rerank_factor: float = SPEEDTEST_RERANK_FACTOR,
+                 speedtest_cls=speedtest.Speedtest, cached_cls=_CachedConfigSpeedtest):
+        self.ttl = ttl
+        self.rerank_factor = rerank_factor
+        self._speedtest_cls = speedtest_cls
+        self._cached_cls = cached_cls
+        self._lock = threading.Lock()
+        self._config = None
+        self._servers = []          # кандидати, найближчі першими
+        self._best = None           # сервер з latency на момент ранжування
+        self._ranked_at = None      # time.monotonic()
+        self._rerank_requested = False
+        self._rerank_thread = None
+        self._hits = 0
+        self._misses = 0
+        self._reranks = 0
+
+    def _fresh(self) -> bool:
+        return self._best is not None and time.monotonic() - self._ranked_at <= self.ttl
+
+    def _rank(self):
+        """Full discovery: config, server list and ping of the closest candidates."""
+        st = self._speedtest_cls()
+        st.get_closest_servers(SPEEDTEST_SERVER_CANDIDATES)
+        best = st.get_best_server()
+        with self._lock:
+            self._config = copy.deepcopy(st.config)
+            self._servers = copy.deepcopy(st.closest)
+            self._best = copy.deepcopy(best)
+            self._ranked_at = time.monotonic()
+        return st
+
+    def create(self):
+        """Speedtest instance with the best server already selected (results.ping is set)."""
+        self._wait_for_rerank()
+        with self._lock:
+            fresh = self._fresh()
+            config, best = self._config, copy.deepcopy(self._best)
+
+        if fresh:
+            try:
+                st = self._cached_cls(config)
+                server = st.get_best_server([best])
+                if server["latency"] < _UNREACHABLE_MS:
+                    with self._lock:
+                        self._hits += 1
+                    self._check_latency(server["latency"])
+                    return st
+            except Exception as e:
+                print(f"Cached speedtest server failed: {e}")
+            # кешований сервер недоступний - шукаємо заново зараз
+
+        with self._lock:
+            self._misses += 1
+        return self._rank()
+
+    def _check_latency(self, latency_ms: float):
+        with self._lock:
+            ranked = self._best["latency"]
+            if latency_ms > max(ranked * self.rerank_factor, ranked + SPEEDTEST_RERANK_MIN_MS):
+                print(f"Speedtest server latency {latency_ms:.0f} ms (ranked at {ranked:.0f} ms), "
+                      f"re-ranking after the test")
+                self._rerank_requested = True
+
+    def after_test(self):
+        """Called when a test finished: re-ranks in the background if latency degraded."""
+        with self._lock:
+            if not self._rerank_requested or self._rerank_thread is not None:
+                return
+            self._rerank_requested = False
+            self._rerank_thread = threading.Thread(target=self._background_rerank,
+                                                   name="speedtest-rerank", daemon=True)
+        self._rerank_thread.start()
+
+    def _background_rerank(self):
+        try:
+            self._rank()
+            with self._lock:
+                self._reranks += 1
+            print(f"Speedtest servers re-ranked, best: {self._best.get('sponsor')} "
+                  f"({self._best['latency']:.0f} ms)")
+        except Exception as e:
+            print(f"Speedtest server re-rank failed: {e}")
+        finally:
+            with self._lock:
+                self._rerank_thread = None
+
+    def _wait_for_rerank(self):
+        thread = self._rerank_thread
+        if thread is not None:
+            thread.join(RERANK_WAIT_SECONDS)
+
+    def invalidate(self):
+        with self._lock:
+            self._best = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = time.monotonic() - self._ranked_at if self._ranked_at is not None else None
+            return {
+                "ttl": self.ttl,
+                "server": self._best.get("sponsor") if self._best else None,
+                "ranked_latency_ms": self._best["latency"] if self._best else None,
+                "candidates": len(self._servers),
+                "age": round(age, 1) if age is not None else None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "reranks": self._reranks,
+                "rerank_pending": self._rerank_requested or self._rerank_thread is not None,
+            }
+
+
+server_cache = ServerSelectionCache()
@@ -1,34 +1,58 @@
-import speedtest
-import json
-import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 
-HISTORY_FILE = "speedtest_history.json"
+from speedtest_servers import server_cache
+from speedtest_store import add_result, recent_results
+from throughput import link_test_lock
+
+# Скільки завершених задач пам'ятаємо для /api/speedtest/status
+SPEEDTEST_JOBS_KEEP = 20
+
+# Фази тесту і їхня частка в загальному прогресі
+PHASES = [("server_selection", 0.1), ("download", 0.45), ("upload", 0.45)]
 
 def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return []
+    """Last 100 results; the full history and rollups live in speedtest_store."""
     try:
-        with open(HISTORY_FILE, "r") as f:
-            return json.load(f)
-    except:
+        return recent_results(100)
+    except Exception as e:
+        print(f"Failed to load speedtest history: {e}")
         return []
 
 def save_result(result):
-    history = load_history()
-    history.append(result)
-    history = history[-100:] 
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
+    add_result(result)
+
+def _phase_callback(progress, phase):
+    """speedtest callback(i, count, start=/end=) -> progress(phase, fraction of finished requests)."""
+    done = [0]
 
-def run_speedtest():
+    def callback(i, count, start=False, end=False):
+        if end:
+            done[0] += 1
+            progress(phase, done[0] / count if count else 1.0)
+
+    return callback
+
+
+def run_speedtest(progress=None):
+    """
+    Runs one speedtest and saves it to history. progress(phase, fraction) is called
+    as the test moves through PHASES. Prefer speedtest_jobs.run(), which makes sure
+    only one test uses the link at a time.
+    """
+    progress = progress or (lambda phase, fraction: None)
     try:
-        st = speedtest.Speedtest()
-        st.get_best_server()
-        
+        progress("server_selection", 0.0)
+        # конфіг і рейтинг серверів кешуються між тестами (speedtest_servers)
+        st = server_cache.create()
+        progress("server_selection", 1.0)
+
         # швидкість (повертає біти/с, ділимо на 10^6 для Мбіт/с)
-        download_speed = round(st.download() / 1_000_000, 2)
-        upload_speed = round(st.upload() / 1_000_000, 2)
+        download_speed = round(st.download(callback=_phase_callback(progress, "download")) / 1_000_000, 2)
+        upload_speed = round(st.upload(callback=_phase_callback(progress, "upload")) / 1_000_000, 2)
         ping = round(st.results.ping, 1)
         
         result = {
@@ -43,7 +67,158 @@ def run_speedtest():
         return result
     except Exception as e:
         print(f"Speedtest error: {e}")
+        # можливо, винен кешований сервер - наступний тест обере заново
+        server_cache.invalidate()
         return None
+    finally:
+        server_cache.after_test()
 
 def get_history():
-    return load_history()
\ No newline at end of file
+    return load_history()
+
+
+class SpeedtestBusy(Exception):
+    """Raised when a throughput measurement holds the link and no test can start."""
+
+
+class SpeedtestJob:
+    """One speedtest run; fields are read by the status endpoint."""
+
+    def __init__(self, source: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.status = "running"        # running | done | failed
+        self.phase = None
+        self.phase_progress = 0.0
+        self.progress = 0.0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.joined = 0
+        self.done = threading.Event()
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "status": self.status,
+            "phase": self.phase,
+            "phase_progress": round(self.phase_progress, 3),
+            "progress": round(self.progress, 3),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": round((self.finished_at or time.time()) - self.started_at, 2),
+            "joined": self.joined,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class SpeedtestJobManager:
+    """
+    Runs speedtests one at a time: two tests saturating the same link corrupt both
+    results. A request while a test is running joins it and gets the same job;
+    while a throughput measurement holds link_test_lock, start() raises SpeedtestBusy.
+    """
+
+    def __init__(self, run_fn=run_speedtest, keep: int = SPEEDTEST_JOBS_KEEP):
+        self._run_fn = run_fn
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._active = None
+        self._jobs = OrderedDict()     # id -> SpeedtestJob, старі видаляються
+        self._listeners = []
+        self._started = 0
+        self._joined = 0
+
+    def start(self, source: str = "manual"):
+        """Starts a test in a background thread, or returns the running one. -> (job, joined)"""
+        with self._lock:
+            if self._active is not None:
+                self._active.joined += 1
+                self._joined += 1
+                return self._active, True
+
+            # спільний з throughput лок: поки йде вимір пропускної здатності, тест не стартує
+            if not link_test_lock.acquire(blocking=False):
+                raise SpeedtestBusy("Throughput measurement is running")
+            job = self._active = SpeedtestJob(source)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+            self._started += 1
+
+        threading.Thread(target=self._execute, args=(job,), name=f"speedtest-{job.id}", daemon=True).start()
+        return job, False
+
+    def run(self, source: str = "scheduled", timeout=None):
+        """Blocking variant for the scheduler: starts or joins a test and waits for it."""
+        job, _ = self.start(source)
+        job.done.wait(timeout)
+        return job
+
+    def _progress(self, job, phase, fraction):
+        weights = dict(PHASES)
+        before = 0.0
+        for name, weight in PHASES:
+            if name == phase:
+                break
+            before += weight
+        job.phase = phase
+        job.phase_progress = min(max(fraction, 0.0), 1.0)
+        job.progress = before + weights.get(phase, 0.0) * job.phase_progress
+
+    def _execute(self, job):
+        print(f"--- [SPEEDTEST] Job {job.id} ({job.source}) started ---", flush=True)
+        try:
+            result = self._run_fn(progress=lambda phase, fraction: self._progress(job, phase, fraction))
+            if result is None:
+                job.status = "failed"
+                job.error = "Speedtest failed"
+            else:
+                job.status = "done"
+                job.result = result
+                job.progress = 1.0
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active = None
+            link_test_lock.release()
+            job.done.set()
+
+        print(f"--- [SPEEDTEST] Job {job.id} {job.status} in {job.finished_at - job.started_at:.1f}s ---", flush=True)
+        if job.result is not None:
+            for listener in self._listeners:
+                try:
+                    listener(job.result)
+                except Exception as e:
+                    print(f"Error in speedtest listener: {e}")
+
+    def add_listener(self, listener):
+        """listener(result) is called after every successful test."""
+        self._listeners.append(listener)
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def current(self):
+        with self._lock:
+            return self._active
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active.id if self._active else None,
+                "started": self._started,
+                "joined": self._joined,
+                "recent": [job.id for job in reversed(self._jobs.values())],
+                "servers": server_cache.stats(),
+            }
+
+
+speedtest_jobs = SpeedtestJobManager()
@@ -0,0 +1,232 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+SPEEDTEST_DB_FILE = "speedtest.db"
+LEGACY_HISTORY_FILE = "speedtest_history.json"
+
+METRICS = ("download", "upload", "ping")
+RESOLUTIONS = ("hour", "day")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    download REAL,
+    upload REAL,
+    ping REAL,
+    server TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    p50 REAL,
+    p95 REAL,
+    PRIMARY KEY (resolution, bucket, metric)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# Файли баз, для яких схема вже створена в цьому процесі
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(SPEEDTEST_DB_FILE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    if SPEEDTEST_DB_FILE not in _initialized:
+        with _init_lock:
+            if SPEEDTEST_DB_FILE not in _initialized:
+                # WAL зберігається у файлі бази, а схема ідемпотентна - досить раз на процес
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _import_legacy_file(conn)
+                _initialized.add(SPEEDTEST_DB_FILE)
+    return conn
+
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _import_legacy_file(conn):
+    """
+    One-time import of the old speedtest_history.json (last 100 results). The meta
+    row is checked and written in the same write transaction, so concurrent first
+    connections import it only once.
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            legacy = []
+            existing = conn.execute("SELECT 1 FROM results LIMIT 1").fetchone()
+            if not existing and os.path.exists(LEGACY_HISTORY_FILE):
+                try:
+                    with open(LEGACY_HISTORY_FILE, "r", encoding="utf-8") as f:
+                        legacy = json.load(f)
+                except Exception as e:
+                    print(f"Failed to import {LEGACY_HISTORY_FILE}: {e}")
+            for result in legacy:
+                _add_result(conn, result)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                         (datetime.now().isoformat(),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _bucket_range(ts: float, resolution: str):
+    """[start, end) of the local-time hour / day that contains ts, as epoch seconds."""
+    moment = datetime.fromtimestamp(ts)
+    if resolution == "hour":
+        start = moment.replace(minute=0, second=0, microsecond=0)
+        end = start + timedelta(hours=1)
+    else:
+        start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=1)
+    return start.timestamp(), end.timestamp()
+
+
+def _percentile(sorted_values, q):
+    """Linear interpolation between closest ranks (numpy's default method)."""
+    position = (len(sorted_values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _summarize(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "min": values[0],
+        "max": values[-1],
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(_percentile(values, 50), 3),
+        "p95": round(_percentile(values, 95), 3),
+    }
+
+
+def _update_rollups(conn, ts: float):
+    """
+    Recomputes the hour and day buckets that contain ts. Only the rows of those
+    two buckets are read (by the ts index), so the cost does not grow with history;
+    percentiles stay exact.
+    """
+    for resolution in RESOLUTIONS:
+        start, end = _bucket_range(ts, resolution)
+        rows = conn.execute(
+            "SELECT download, upload, ping FROM results WHERE ts >= ? AND ts < ?", (start, end)
+        ).fetchall()
+        for metric in METRICS:
+            summary = _summarize(row[metric] for row in rows)
+            if summary is None:
+                conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket = ? AND metric = ?",
+                             (resolution, start, metric))
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO rollups (resolution, bucket, metric, count, min, max, mean, p50, p95) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (resolution, start, metric, summary["count"], summary["min"], summary["max"],
+                 summary["mean"], summary["p50"], summary["p95"])
+            )
+
+
+def _add_result(conn, result: dict):
+    try:
+        ts = datetime.fromisoformat(result["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        ts = datetime.now().timestamp()
+    conn.execute(
+        "INSERT INTO results (ts, timestamp, download, upload, ping, server, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (ts, result.get("timestamp") or datetime.fromtimestamp(ts).isoformat(), result.get("download"),
+         result.get("upload"), result.get("ping"), result.get("server"), json.dumps(result, ensure_ascii=False))
+    )
+    _update_rollups(conn, ts)
+
+
+def add_result(result: dict):
+    """Stores one speedtest result at full resolution and updates its hour/day rollups."""
+    with _db() as conn:
+        _add_result(conn, result)
+
+
+def recent_results(limit: int = 100):
+    """Last results, oldest first (the format of the old speedtest_history.json)."""
+    with _db() as conn:
+        rows = conn.execute("SELECT data FROM results ORDER BY ts DESC, id DESC LIMIT ?", (limit,)).fetchall()
+    return [json.loads(row["data"]) for row in reversed(rows)]
+
+
+def query_results(start=None, end=None, limit: int = 1000):
+    """Raw results with start <= ts <= end (epoch seconds), oldest first."""
+    with _db() as conn:
+        rows = conn.execute(
+            "SELECT data FROM results WHERE ts >= ? AND ts <= ? ORDER BY ts LIMIT ?",
+            (start if start is not None else 0, end if end is not None else math.inf, limit)
+        ).fetchall()
+    return [json.loads(row["data"]) for row in rows]
+
+
+def query_rollups(resolution: str = "hour", start=None, end=None):
+    """
+    Pre-aggregated buckets whose start is in [start, end] (epoch seconds):
+    [{"bucket", "start", "download": {count, min, max, mean, p50, p95}, "upload", "ping"}].
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    with _db() as conn:
+        rows = conn.execute(
+            "SELECT * FROM rollups WHERE resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (resolution, start if start is not None else 0, end if end is not None else math.inf)
+        ).fetchall()
+
+    buckets = {}
+    for row in rows:
+        bucket = buckets.setdefault(row["bucket"], {
+            "bucket": row["bucket"],
+            "start": datetime.fromtimestamp(row["bucket"]).isoformat(),
+            **{metric: None for metric in METRICS},
+        })
+        bucket[row["metric"]] = {key: row[key] for key in ("count", "min", "max", "mean", "p50", "p95")}
+    return list(buckets.values())
+
+
+def rebuild_rollups():
+    """Recomputes every rollup from the raw results (after manual edits of the DB)."""
+    with _db() as conn:
+        conn.execute("DELETE FROM rollups")
+        seen = set()
+        for row in conn.execute("SELECT ts FROM results").fetchall():
+            start, _ = _bucket_range(row["ts"], "hour")
+            if start not in seen:
+                seen.add(start)
+                _update_rollups(conn, row["ts"])
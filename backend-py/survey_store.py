@@ -0,0 +1,332 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+SURVEY_DB_FILE = "surveys.db"
+LEGACY_POINTS_FILE = "heatmap_points.json"
+
+# Розмір просторової комірки індексу (координати точок у відсотках 0..100)
+CELL_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS surveys (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created TEXT NOT NULL,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS points (
+    survey_id TEXT NOT NULL,
+    point_id TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    cx INTEGER NOT NULL,
+    cy INTEGER NOT NULL,
+    status TEXT,
+    seq INTEGER NOT NULL,
+    digest TEXT,
+    PRIMARY KEY (survey_id, point_id)
+);
+CREATE INDEX IF NOT EXISTS idx_points_cell ON points (survey_id, cx, cy);
+CREATE TABLE IF NOT EXISTS measurements (
+    survey_id TEXT NOT NULL,
+    point_id TEXT NOT NULL,
+    ssid TEXT,
+    bssid TEXT,
+    rssi INTEGER,
+    network TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_measurements_ssid ON measurements (survey_id, ssid);
+CREATE INDEX IF NOT EXISTS idx_measurements_bssid ON measurements (survey_id, bssid);
+CREATE INDEX IF NOT EXISTS idx_measurements_point ON measurements (survey_id, point_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# Файли баз, для яких схема вже створена в цьому процесі
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(SURVEY_DB_FILE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    if SURVEY_DB_FILE not in _initialized:
+        with _init_lock:
+            if SURVEY_DB_FILE not in _initialized:
+                # WAL зберігається у файлі бази, а схема ідемпотентна - досить раз на процес
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _import_legacy_file(conn)
+                _initialized.add(SURVEY_DB_FILE)
+    return conn
+
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _import_legacy_file(conn):
+    """
+    One-time import of the old heatmap_points.json as the first survey. The meta
+    row is checked and written in the same write transaction, so concurrent first
+    connections import it only once.
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            legacy_points = []
+            # база до появи meta вже містить імпорт (або власні обходи) - не імпортуємо вдруге
+            existing = conn.execute("SELECT 1 FROM surveys LIMIT 1").fetchone()
+            if not existing and os.path.exists(LEGACY_POINTS_FILE):
+                try:
+                    with open(LEGACY_POINTS_FILE, "r", encoding="utf-8") as f:
+                        legacy_points = json.load(f)
+                except Exception as e:
+                    print(f"Failed to import {LEGACY_POINTS_FILE}: {e}")
+            if legacy_points:
+                survey_id = _create_survey(conn, "Imported survey")
+                _append_points(conn, survey_id, legacy_points)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                         (datetime.now().isoformat(),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _cell(value: float) -> int:
+    return int(min(max(value, 0), 100) // CELL_SIZE)
+
+
+def _create_survey(conn, name=None) -> str:
+    survey_id = uuid.uuid4().hex[:12]
+    conn.execute(
+        "INSERT INTO surveys (id, name, created) VALUES (?, ?, ?)",
+        (survey_id, name, datetime.now().isoformat())
+    )
+    return survey_id
+
+
+def _point_digest(p) -> str:
+    """Hash of what can change on a resent point: position, status and scan data."""
+    payload = json.dumps([p.get("x"), p.get("y"), p.get("status"), p.get("data") or []],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _point_key(p, index: int) -> str:
+    """Point id as stored; points without an id are keyed by their position in the walk."""
+    point_id = p.get("id")
+    return f"#{index}" if point_id is None else str(point_id)
+
+
+def _insert_measurements(conn, survey_id: str, point_id: str, networks):
+    conn.executemany(
+        "INSERT INTO measurements (survey_id, point_id, ssid, bssid, rssi, network) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (survey_id, point_id, n.get("ssid"), (n.get("bssid") or "").lower(),
+             n.get("rssi"), json.dumps(n, ensure_ascii=False))
+            for n in networks or []
+        ]
+    )
+
+
+def _append_points(conn, survey_id: str, all_points) -> int:
+    """
+    Inserts new points and updates stored ones whose status or data changed
+    (the frontend sends a point as "pending" first and with its scan later).
+    Unchanged points are skipped. Returns how many points were added or updated.
+    """
+    stored = {row[0]: row[1] for row in conn.execute(
+        "SELECT point_id, digest FROM points WHERE survey_id = ?", (survey_id,)
+    )}
+    next_seq = len(stored)
+
+    changed = 0
+    for index, p in enumerate(all_points):
+        point_id = _point_key(p, index)
+        digest = _point_digest(p)
+        x, y = float(p["x"]), float(p["y"])
+
+        if point_id in stored:
+            if stored[point_id] == digest:
+                continue
+            conn.execute(
+                "UPDATE points SET x = ?, y = ?, cx = ?, cy = ?, status = ?, digest = ? "
+                "WHERE survey_id = ? AND point_id = ?",
+                (x, y, _cell(x), _cell(y), p.get("status"), digest, survey_id, point_id)
+            )
+            conn.execute("DELETE FROM measurements WHERE survey_id = ? AND point_id = ?",
+                         (survey_id, point_id))
+        else:
+            conn.execute(
+                "INSERT INTO points (survey_id, point_id, x, y, cx, cy, status, seq, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (survey_id, point_id, x, y, _cell(x), _cell(y), p.get("status"), next_seq, digest)
+            )
+            next_seq += 1
+        stored[point_id] = digest
+        _insert_measurements(conn, survey_id, point_id, p.get("data"))
+        changed += 1
+    return changed
+
+
+def create_survey(name=None) -> str:
+    with _db() as conn:
+        return _create_survey(conn, name)
+
+
+def list_surveys():
+    with _db() as conn:
+        rows = conn.execute(
+            "SELECT s.id, s.name, s.created, COUNT(p.point_id) AS points "
+            "FROM surveys s LEFT JOIN points p ON p.survey_id = s.id "
+            "GROUP BY s.id ORDER BY s.created DESC"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def latest_survey_id():
+    with _db() as conn:
+        row = conn.execute("SELECT id FROM surveys ORDER BY created DESC LIMIT 1").fetchone()
+    return row["id"] if row else None
+
+
+def save_points(all_points, survey_id=None, digest=None) -> str:
+    """
+    Appends survey points (frontend all_points_json format). Points already stored
+    (same point id) are updated only if their status or data changed, so resending
+    the whole walk only writes new and changed points.
+    Without survey_id the latest survey is used, unless none of the incoming point
+    ids belong to it - then the frontend started a new walk and a new survey is created.
+    digest is the hash of the raw payload, see save_points_json.
+    """
+    with _db() as conn:
+        # вибір / створення обходу і запис точок - одна транзакція запису,
+        # тож два паралельні перші запити не створять два обходи
+        conn.execute("BEGIN IMMEDIATE")
+        if survey_id is None:
+            row = conn.execute("SELECT id FROM surveys ORDER BY created DESC LIMIT 1").fetchone()
+            # достатньо перевірити перші точки: обхід або продовжується, або новий
+            incoming = [_point_key(p, i) for i, p in enumerate(all_points[:500])]
+            if row and incoming:
+                placeholders = ",".join("?" * len(incoming))
+                shared = conn.execute(
+                    f"SELECT 1 FROM points WHERE survey_id = ? AND point_id IN ({placeholders}) LIMIT 1",
+                    [row["id"], *incoming]
+                ).fetchone()
+                survey_id = row["id"] if shared else None
+            elif row:
+                survey_id = row["id"]
+
+        if survey_id is None:
+            survey_id = _create_survey(conn)
+        elif not conn.execute("SELECT 1 FROM surveys WHERE id = ?", (survey_id,)).fetchone():
+            conn.execute(
+                "INSERT INTO surveys (id, name, created) VALUES (?, ?, ?)",
+                (survey_id, None, datetime.now().isoformat())
+            )
+
+        _append_points(conn, survey_id, all_points)
+        conn.execute("UPDATE surveys SET digest = ? WHERE id = ?", (digest, survey_id))
+    return survey_id
+
+
+def save_points_json(all_points_json: str, survey_id=None) -> str:
+    """
+    save_points for the raw all_points_json the frontend sends with every render.
+    The payload hash is kept per survey, so an unchanged walk is recognised without
+    parsing the JSON or reading its points.
+    """
+    all_points_json = all_points_json or "[]"
+    digest = hashlib.sha1(all_points_json.encode("utf-8")).hexdigest()
+    with _db() as conn:
+        if survey_id is None:
+            row = conn.execute("SELECT id, digest FROM surveys ORDER BY created DESC LIMIT 1").fetchone()
+        else:
+            row = conn.execute("SELECT id, digest FROM surveys WHERE id = ?", (survey_id,)).fetchone()
+    if row and row["digest"] == digest:
+        return row["id"]
+    return save_points(json.loads(all_points_json), survey_id, digest)
+
+
+def load_points(survey_id=None, ssid=None, bssid=None, region=None):
+    """
+    Returns points in the frontend format ({id, x, y, status, data}).
+    ssid / bssid keep only that network in data (and only points where it was heard);
+    region=(x0, y0, x1, y1) keeps points inside the rectangle, using the cell index.
+    """
+    if survey_id is None:
+        survey_id = latest_survey_id()
+        if survey_id is None:
+            return []
+
+    region_sql = ""
+    region_args = []
+    if region is not None:
+        x0, y0, x1, y1 = region
+        # спочатку відсікаємо по індексу комірок, потім точно по координатах
+        region_sql = (" AND p.cx BETWEEN ? AND ? AND p.cy BETWEEN ? AND ?"
+                      " AND p.x BETWEEN ? AND ? AND p.y BETWEEN ? AND ?")
+        region_args = [_cell(x0), _cell(x1), _cell(y0), _cell(y1), x0, x1, y0, y1]
+
+    point_sql = "SELECT p.point_id, p.x, p.y, p.status FROM points p WHERE p.survey_id = ?" + region_sql
+    point_sql += " ORDER BY p.seq"
+    point_args = [survey_id, *region_args]
+
+    network_sql = ("SELECT m.point_id, m.network FROM measurements m "
+                   "JOIN points p ON p.survey_id = m.survey_id AND p.point_id = m.point_id "
+                   "WHERE m.survey_id = ?" + region_sql)
+    network_args = [survey_id, *region_args]
+    if ssid is not None:
+        network_sql += " AND m.ssid = ?"
+        network_args.append(ssid)
+    if bssid is not None:
+        network_sql += " AND m.bssid = ?"
+        network_args.append(bssid.lower())
+
+    with _db() as conn:
+        point_rows = conn.execute(point_sql, point_args).fetchall()
+        networks = {}
+        for row in conn.execute(network_sql, network_args):
+            networks.setdefault(row["point_id"], []).append(json.loads(row["network"]))
+
+    filtered = ssid is not None or bssid is not None
+    result = []
+    for row in point_rows:
+        if filtered and row["point_id"] not in networks:
+            continue
+        point_id = row["point_id"]
+        result.append({
+            "id": int(point_id) if point_id.isdigit() else point_id,
+            "x": row["x"],
+            "y": row["y"],
+            "status": row["status"],
+            "data": networks.get(point_id, []),
+        })
+    return result
+
+
+def delete_survey(survey_id: str):
+    with _db() as conn:
+        conn.execute("DELETE FROM measurements WHERE survey_id = ?", (survey_id,))
+        conn.execute("DELETE FROM points WHERE survey_id = ?", (survey_id,))
+        conn.execute("DELETE FROM surveys WHERE id = ?", (survey_id,))
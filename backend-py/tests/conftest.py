@@ -0,0 +1,5 @@
+import os
+import sys
+
+# модулі бекенду лежать пласко в backend-py/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+"""enrich_scan against the per-row helpers of the old scan_networks loop."""
+import random
+
+from wifi_service import (calculate_distance, calculate_quality, enrich_scan, fix_encoding,
+                          get_vendor, get_wifi_details)
+
+FREQS = [2412, 2437, 2462, 2472, 2484, 5180, 5500, 5825, 5955, 6415, 7115,
+         2437000, 5180000, 900, 5850, 0, None, "garbage", "2412"]
+SIGNALS = [-30, -50, -67, -99, -100, -101, -20, 0, -60.7, "-72", None, "garbage"]
+SSIDS = ["Home", "", None, "Домівка", "Домівка".encode("utf-8"), "Кафе".encode("cp1251"),
+         "Домівка".encode("utf-8").decode("latin1"), "Guest 5G"]
+SECURITIES = ["WPA2", "WPA3", "Open", "WPA2 / WPA"]
+
+
+def _raw_rows(n=2000, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        bssid = ":".join(f"{rng.getrandbits(8):02x}" for _ in range(6))
+        rows.append((rng.choice(SSIDS), bssid, rng.choice(SIGNALS), rng.choice(FREQS), rng.choice(SECURITIES)))
+    return rows
+
+
+def _old_loop(raw_rows):
+    networks = []
+    for ssid, bssid, signal, freq, security in raw_rows:
+        channel, band = get_wifi_details(freq)
+        networks.append({
+            "ssid": fix_encoding(ssid),
+            "bssid": bssid,
+            "rssi": signal,
+            "channel": channel,
+            "band": band,
+            "security": security,
+            "quality": calculate_quality(signal),
+            "distance": calculate_distance(signal, freq),
+            "vendor": get_vendor(bssid),
+        })
+    return networks
+
+
+def test_matches_per_row_helpers():
+    raw_rows = _raw_rows()
+    batched = [row.as_dict() for row in enrich_scan(raw_rows)]
+    expected = _old_loop(raw_rows)
+
+    for got, want in zip(batched, expected):
+        assert got.pop("width") is None
+        assert got == want
+        # значення мають бути звичайними int / float Python, не numpy-скалярами
+        assert type(got["channel"]) is int and type(got["quality"]) is int
+        assert type(got["distance"]) is float
+    assert len(batched) == len(expected)
+
+
+def test_width_column_and_empty_scan():
+    assert enrich_scan([]) == []
+    row = enrich_scan([("Home", "aa:bb:cc:dd:ee:ff", -60, 5180, "WPA2", 80)])[0]
+    assert (row.channel, row.band, row.width) == (36, "5", 80)
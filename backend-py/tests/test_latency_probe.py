@@ -0,0 +1,71 @@
+"""LatencyProbe against local listening sockets and a closed port."""
+import socket
+
+import pytest
+
+from latency_probe import LatencyProbe
+
+
+@pytest.fixture
+def listeners():
+    socks = []
+    for _ in range(3):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(64)
+        socks.append(sock)
+    yield [("127.0.0.1", s.getsockname()[1]) for s in socks]
+    for sock in socks:
+        sock.close()
+
+
+@pytest.fixture
+def closed_port():
+    # порт, який щойно звільнили: connect отримує RST одразу, без таймауту
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return ("127.0.0.1", port)
+
+
+def _probe(targets, **kwargs):
+    return LatencyProbe(targets=targets, attempts=3, timeout=0.5, speedtest_min_interval=0, **kwargs)
+
+
+def test_one_unreachable_target_is_not_degradation(listeners, closed_port):
+    result = _probe(listeners[:2] + [closed_port], history_file=None).run()
+    assert result["status"] == "ok", result["reasons"]
+    assert result["loss"] == 0.0
+    assert result["lossy_targets"] == ["127.0.0.1:%d" % closed_port[1]]
+
+
+def test_loss_on_most_targets_degrades(listeners, closed_port):
+    result = _probe(listeners[:1] + [closed_port, closed_port], history_file=None).run()
+    assert result["status"] == "degraded"
+    assert result["reasons"] == ["loss on 2 of 3 targets"]
+
+
+def test_all_targets_unreachable_is_down_then_recovery_triggers_speedtest(listeners, closed_port):
+    probe = _probe([closed_port], history_file=None)
+    down = probe.run()
+    assert down["status"] == "down" and not probe.should_speedtest(down)
+
+    probe.targets = listeners
+    recovered = probe.run()
+    assert recovered["status"] == "ok" and recovered["previous_status"] == "down"
+    assert probe.should_speedtest(recovered)
+
+
+def test_history_is_appended_and_pruned(tmp_path, listeners):
+    path = str(tmp_path / "probe.db")
+    probe = _probe(listeners[:1], history_file=path, history_size=3)
+    results = [probe.run() for _ in range(5)]
+
+    reloaded = _probe(listeners[:1], history_file=path, history_size=3)
+    assert reloaded.history() == results[-3:]
+    conn = reloaded._connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0] == 3
+    finally:
+        conn.close()
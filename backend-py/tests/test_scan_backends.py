@@ -0,0 +1,63 @@
+"""iw scan dump parser and fixture backends on fixtures/scans."""
+import os
+
+import pytest
+
+import scan_backends
+from scan_backends import FakeBackend, RawNetwork, ScanBackend, load_fixture_scans, parse_iw_scan
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "scans")
+IW_DUMP = os.path.join(FIXTURE_DIR, "iw_scan_dump.txt")
+
+
+def _parse():
+    with open(IW_DUMP, "r", encoding="utf-8", errors="surrogateescape") as f:
+        return list(parse_iw_scan(f))
+
+
+def test_parse_iw_scan_dump():
+    networks = _parse()
+    assert [n.bssid for n in networks] == [
+        "10:7b:44:a1:00:01", "10:7b:44:a1:00:02", "44:d9:e7:0b:10:03", "34:60:f9:22:00:04",
+    ]
+    home, kyivstar, cafe, hidden = networks
+
+    # \xNN-екранований UTF-8 SSID повертається сирими байтами
+    assert home.ssid == "Домівка".encode("utf-8")
+    assert (home.freq, home.signal, home.width) == (5180, -48, 80)
+    assert home.security == "WPA2/WPA3"
+
+    assert (kyivstar.ssid, kyivstar.freq, kyivstar.width) == (b"Kyivstar_5F2A", 2437, 20)
+    assert kyivstar.security == "WPA2 / WPA"
+
+    assert cafe.security == "Open"
+    assert (hidden.ssid, hidden.freq, hidden.width, hidden.security) == (b"", 5955, 160, "WPA3")
+
+
+def test_parser_skips_garbage_lines():
+    lines = ["BSS 00:11:22:33:44:55(on wlan0)\n", "\tfreq: not-a-number\n", "\tsignal: -70.00 dBm\n"]
+    assert list(parse_iw_scan(lines)) == [RawNetwork(b"", "00:11:22:33:44:55", -70, None, "Open", 20)]
+
+
+def test_fixture_directory_replays_in_a_loop():
+    scans = load_fixture_scans(FIXTURE_DIR)
+    assert scans == [_parse()]
+
+    backend = FakeBackend(scans=[scans[0][:1], scans[0][1:]])
+    assert [len(backend.scan()) for _ in range(3)] == [1, 3, 1]
+
+
+def test_scan_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ScanBackend()
+
+
+def test_missing_backend_is_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scan_backends, "create_backend", lambda: calls.append(1))
+    monkeypatch.setattr(scan_backends, "_backend", None)
+    monkeypatch.setattr(scan_backends, "_backend_checked_at", None)
+
+    assert scan_backends.get_scan_backend() is None
+    assert scan_backends.get_scan_backend() is None
+    assert len(calls) == 1
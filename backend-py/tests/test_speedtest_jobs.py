@@ -0,0 +1,59 @@
+"""SpeedtestJobManager: one test at a time, joins, listeners and the shared link lock."""
+import threading
+import time
+
+import pytest
+
+from speedtest_service import SpeedtestBusy, SpeedtestJobManager
+from throughput import link_test_lock
+
+
+def _blocking_run(release, calls):
+    def run(progress=None):
+        calls.append(1)
+        progress("download", 0.5)
+        release.wait(5)
+        return {"download": 100.0, "upload": 20.0, "ping": 12.0}
+    return run
+
+
+def test_concurrent_requests_join_the_running_test():
+    release, calls, seen = threading.Event(), [], []
+    manager = SpeedtestJobManager(run_fn=_blocking_run(release, calls))
+    manager.add_listener(seen.append)
+
+    job, joined = manager.start("manual")
+    again, joined_again = manager.start("scheduled")
+    assert (joined, joined_again) == (False, True)
+    assert again is job and job.joined == 1
+
+    release.set()
+    assert job.done.wait(5)
+    assert job.status == "done" and job.progress == 1.0
+    assert calls == [1]
+    assert manager.current() is None and not link_test_lock.locked()
+
+    # слухачі викликаються після done - чекаємо, поки потік задачі їх обійде
+    for _ in range(50):
+        if seen:
+            break
+        time.sleep(0.1)
+    assert seen == [job.result]
+    assert manager.stats()["started"] == 1 and manager.stats()["joined"] == 1
+
+
+def test_failed_run_releases_the_link():
+    def run(progress=None):
+        raise RuntimeError("no route to host")
+
+    job = SpeedtestJobManager(run_fn=run).run("scheduled", timeout=5)
+    assert job.status == "failed" and job.error == "no route to host"
+    assert not link_test_lock.locked()
+
+
+def test_busy_while_throughput_holds_the_link():
+    manager = SpeedtestJobManager(run_fn=lambda progress=None: {})
+    with link_test_lock:
+        with pytest.raises(SpeedtestBusy):
+            manager.start()
+    assert manager.current() is None
@@ -0,0 +1,52 @@
+"""speedtest_store rollups on a temporary database."""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import speedtest_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(speedtest_store, "SPEEDTEST_DB_FILE", str(tmp_path / "speedtest.db"))
+    monkeypatch.setattr(speedtest_store, "LEGACY_HISTORY_FILE", str(tmp_path / "missing.json"))
+    return speedtest_store
+
+
+def _result(moment, download, upload=None, ping=None):
+    return {"timestamp": moment.isoformat(), "download": download, "upload": upload, "ping": ping}
+
+
+def test_rollups_match_numpy_on_known_rows(store):
+    downloads = [120.0, 80.5, 95.25, 101.0, 60.0]
+    for minute, value in enumerate(downloads):
+        store.add_result(_result(datetime(2026, 3, 2, 10, minute * 10), value, upload=value / 4, ping=10 + minute))
+    store.add_result(_result(datetime(2026, 3, 2, 11, 5), 50.0))
+
+    hours = store.query_rollups("hour")
+    assert [h["start"] for h in hours] == ["2026-03-02T10:00:00", "2026-03-02T11:00:00"]
+    first = hours[0]["download"]
+    assert first["count"] == 5 and (first["min"], first["max"]) == (60.0, 120.0)
+    assert first["mean"] == pytest.approx(np.mean(downloads), abs=1e-3)
+    assert first["p50"] == pytest.approx(np.percentile(downloads, 50), abs=1e-3)
+    assert first["p95"] == pytest.approx(np.percentile(downloads, 95), abs=1e-3)
+    # у другій годині немає upload/ping - метрика відсутня, а не нулі
+    assert hours[1]["upload"] is None and hours[1]["download"]["count"] == 1
+
+    (day,) = store.query_rollups("day")
+    assert day["download"]["count"] == 6 and day["ping"]["count"] == 5
+
+
+def test_rebuild_reproduces_incremental_rollups(store):
+    for i in range(12):
+        store.add_result(_result(datetime(2026, 3, 2 + i // 5, i, 30), 40.0 + i * 7, ping=8.0 + i))
+    before = store.query_rollups("hour") + store.query_rollups("day")
+    store.rebuild_rollups()
+    assert store.query_rollups("hour") + store.query_rollups("day") == before
+    assert [r["download"] for r in store.recent_results(3)] == [103.0, 110.0, 117.0]
+
+
+def test_unknown_resolution(store):
+    with pytest.raises(ValueError):
+        store.query_rollups("week")
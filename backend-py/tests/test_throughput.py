@@ -0,0 +1,58 @@
+"""Loopback throughput measurement against our own server."""
+import socket
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import throughput
+from throughput import ThroughputServer, measure
+
+
+@pytest.fixture
+def server():
+    server = ThroughputServer("127.0.0.1", 0, token="s3cret", max_connections=4)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.mark.parametrize("direction", ["download", "upload"])
+def test_loopback_measure(server, direction):
+    result = measure("127.0.0.1", server.port, direction, streams=2, duration=1, warmup=1, token="s3cret")
+    assert result["mbps"] > 0
+    assert len(result["per_stream_mbps"]) == 2 and all(m > 0 for m in result["per_stream_mbps"])
+    assert [s["warmup"] for s in result["samples"]] == [True, False]
+
+
+def test_wrong_token_gets_no_data(server):
+    result = measure("127.0.0.1", server.port, "download", streams=1, duration=1, warmup=0, token="wrong")
+    assert result["bytes"] == 0
+
+
+def test_connections_over_the_limit_are_closed(server):
+    held = [throughput._open_stream("127.0.0.1", server.port, "upload", 5, "s3cret") for _ in range(4)]
+    try:
+        time.sleep(0.2)     # обробники всіх чотирьох з'єднань встигли зайняти слоти
+        extra = socket.create_connection(("127.0.0.1", server.port), timeout=2)
+        assert extra.recv(1) == b""
+        extra.close()
+    finally:
+        for sock in held:
+            sock.close()
+
+
+def test_lan_host_requires_token():
+    with pytest.raises(ValueError):
+        ThroughputServer("0.0.0.0", 0, token="").start()
+
+
+def test_stale_speedtest_is_not_a_wan_reference(server, monkeypatch):
+    monkeypatch.setattr(throughput, "measure", lambda *args, **kwargs: {"mbps": 300.0})
+    fresh = {"timestamp": (datetime.now() - timedelta(minutes=10)).isoformat(), "download": 100.0, "upload": 20.0}
+    stale = dict(fresh, timestamp=(datetime.now() - timedelta(days=2)).isoformat())
+
+    data = throughput.measure_segments(f"127.0.0.1:{server.port}", wan_reference=fresh)
+    assert data["wan"]["age_s"] == pytest.approx(600, abs=5) and data["bottleneck"] == "wan"
+    data = throughput.measure_segments(f"127.0.0.1:{server.port}", wan_reference=stale)
+    assert data["wan"] is None and data["bottleneck"] is None
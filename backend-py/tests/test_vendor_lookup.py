@@ -0,0 +1,65 @@
+"""OUIIndex against manuf.MacParser on a fixed sample of registered and random MACs."""
+import random
+
+import pytest
+
+from vendor_lookup import OUIIndex, UNKNOWN_VENDOR
+
+manuf = pytest.importorskip("manuf.manuf")
+
+
+@pytest.fixture(scope="module")
+def manuf_path():
+    return manuf.MacParser.get_packaged_manuf_file_path()
+
+
+def _registered_prefixes(path):
+    """(hex digits, prefix bits) of every entry in the manuf file."""
+    prefixes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            parts = line.split("\t")[0].split("/")
+            digits = parts[0].replace(":", "").replace("-", "").replace(".", "")
+            bits = min(4 * len(digits), int(parts[1])) if len(parts) > 1 else 4 * len(digits)
+            prefixes.append((digits, bits))
+    return prefixes
+
+
+def _sample_macs(path, seed=0, step=53, n_random=500):
+    rng = random.Random(seed)
+    macs = []
+    for digits, bits in _registered_prefixes(path)[::step]:
+        # префікс з бази + випадковий хвіст, тобто MAC усередині цього блоку
+        value = (int(digits, 16) << (48 - 4 * len(digits))) >> (48 - bits) << (48 - bits)
+        value |= rng.getrandbits(48 - bits)
+        macs.append(value)
+    macs += [rng.getrandbits(48) for _ in range(n_random)]
+    return [":".join(f"{value:012X}"[i:i + 2] for i in range(0, 12, 2)) for value in macs]
+
+
+def test_matches_mac_parser(manuf_path):
+    parser = manuf.MacParser(manuf_path, update=False)
+    index = OUIIndex(manuf_path)
+    macs = _sample_macs(manuf_path)
+    assert len(macs) > 1000
+
+    mismatches = [
+        (mac, index.lookup(mac), parser.get_manuf(mac))
+        for mac in macs
+        if index.lookup(mac) != (parser.get_manuf(mac) or UNKNOWN_VENDOR)
+    ]
+    assert mismatches == []
+
+
+def test_separators_and_garbage(manuf_path):
+    index = OUIIndex(manuf_path)
+    mac = _sample_macs(manuf_path, n_random=0)[0]
+    vendor = index.lookup(mac)
+    assert vendor != UNKNOWN_VENDOR
+    assert index.lookup(mac.lower().replace(":", "-")) == vendor
+    assert index.lookup(mac.replace(":", "")) == vendor
+    for bad in (None, "", "zz:zz:zz:zz:zz:zz", "00:11:22"):
+        assert index.lookup(bad) == UNKNOWN_VENDOR
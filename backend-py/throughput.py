@@ -0,0 +1,381 @@
+"""
+Multi-stream TCP throughput measurement against our own server, fully offline.
+
+The backend can run the server side itself (THROUGHPUT_SERVER_PORT), so a box on
+the LAN measures the Wi-Fi segment between a client and it, while the speedtest
+(or a throughput server outside the LAN) measures the WAN.
+
+The server listens on THROUGHPUT_SERVER_HOST (loopback by default). Binding it to
+a LAN interface requires a shared THROUGHPUT_TOKEN, which clients send in the
+stream header.
+
+    THROUGHPUT_TOKEN=secret python throughput.py serve --host 192.168.1.10 --port 5201
+    THROUGHPUT_TOKEN=secret python throughput.py run --host 192.168.1.10 --port 5201 --streams 4 --duration 10
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import statistics
+import threading
+import time
+from datetime import datetime
+
+THROUGHPUT_SERVER_PORT = int(os.getenv("THROUGHPUT_SERVER_PORT", "0"))   # 0 - сервер вимкнено
+THROUGHPUT_SERVER_HOST = os.getenv("THROUGHPUT_SERVER_HOST", "127.0.0.1")   # адреса інтерфейсу в LAN
+THROUGHPUT_TOKEN = os.getenv("THROUGHPUT_TOKEN", "")                     # спільний для сервера і клієнтів
+THROUGHPUT_MAX_CONNECTIONS = int(os.getenv("THROUGHPUT_MAX_CONNECTIONS", "64"))
+THROUGHPUT_TARGET = os.getenv("THROUGHPUT_TARGET", "")                   # host:port для /api/throughput/run
+THROUGHPUT_STREAMS = int(os.getenv("THROUGHPUT_STREAMS", "4"))
+THROUGHPUT_DURATION = float(os.getenv("THROUGHPUT_DURATION", "10"))
+THROUGHPUT_WARMUP = float(os.getenv("THROUGHPUT_WARMUP", "2"))
+# Старіший спідтест не годиться як WAN-орієнтир: канал міг змінитися
+THROUGHPUT_WAN_MAX_AGE = float(os.getenv("THROUGHPUT_WAN_MAX_AGE", str(6 * 3600)))
+MAX_STREAMS = 32
+MAX_DURATION = 60.0
+SAMPLE_INTERVAL = 1.0
+CONNECT_TIMEOUT = 3.0
+BUFFER_SIZE = 128 * 1024
+MAX_HEADER = 256
+
+# Якщо Wi-Fi сегмент не набагато швидший за WAN - вузьке місце саме він
+WIFI_BOTTLENECK_MARGIN = 1.2
+
+_MAGIC = b"TPUT1"
+_PAYLOAD = os.urandom(BUFFER_SIZE)
+
+
+class ThroughputBusy(Exception):
+    """Raised when another throughput measurement is already running."""
+
+
+# --- server ---
+
+class _ThroughputHandler(socketserver.BaseRequestHandler):
+    """
+    One line header "TPUT1 <D|U> <seconds> [token]\\n". D: server sends data for
+    <seconds> (or until the client closes); U: server reads and drops everything
+    until EOF. Connections over the server's limit or with a wrong token are closed.
+    """
+
+    def handle(self):
+        if not self.server.slots.acquire(blocking=False):
+            return
+        try:
+            self._handle()
+        finally:
+            self.server.slots.release()
+
+    def _handle(self):
+        sock = self.request
+        # заголовок має прийти одразу - повільний клієнт не тримає слот хвилину
+        sock.settimeout(CONNECT_TIMEOUT)
+        header = b""
+        try:
+            while not header.endswith(b"\n") and len(header) < MAX_HEADER:
+                chunk = sock.recv(1)
+                if not chunk:
+                    return
+                header += chunk
+        except OSError:
+            return
+        parts = header.split()
+        try:
+            magic, direction, seconds = parts[:3]
+            seconds = min(float(seconds), MAX_DURATION)
+        except ValueError:
+            return
+        token = parts[3] if len(parts) > 3 else b""
+        if magic != _MAGIC or len(parts) > 4 or not hmac.compare_digest(token, self.server.token):
+            return
+
+        sock.settimeout(MAX_DURATION + 10)
+        try:
+            if direction == b"D":
+                deadline = time.monotonic() + seconds
+                while time.monotonic() < deadline:
+                    sock.sendall(_PAYLOAD)
+            elif direction == b"U":
+                buffer = bytearray(BUFFER_SIZE)
+                while sock.recv_into(buffer):
+                    pass
+        except OSError:
+            # клієнт закрив з'єднання після свого часу - це нормально
+            pass
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ThroughputServer:
+    def __init__(self, host: str = THROUGHPUT_SERVER_HOST, port: int = THROUGHPUT_SERVER_PORT,
+                 token: str = THROUGHPUT_TOKEN, max_connections: int = THROUGHPUT_MAX_CONNECTIONS):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.max_connections = max_connections
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self._server is None:
+            # без токена будь-хто в мережі міг би забивати канал нашим трафіком
+            if not self.token and not _is_loopback(self.host):
+                raise ValueError(f"THROUGHPUT_TOKEN is required to serve on {self.host}")
+            self._server = _Server((self.host, self.port), _ThroughputHandler)
+            self._server.token = self.token.encode()
+            self._server.slots = threading.BoundedSemaphore(self.max_connections)
+            # port=0 - вільний порт, який обрала ОС
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, name="throughput-server", daemon=True)
+            self._thread.start()
+        return self.port
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def running(self) -> bool:
+        return self._server is not None
+
+
+throughput_server = ThroughputServer()
+
+
+# --- client ---
+
+def _stream_worker(sock, direction, counters, index, stop):
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(_PAYLOAD)
+    try:
+        while not stop.is_set():
+            if direction == "download":
+                n = sock.recv_into(buffer)
+                if not n:
+                    break
+            else:
+                n = sock.send(view)
+            counters[index] += n
+    except OSError:
+        pass
+
+
+def _open_stream(host, port, direction, seconds, token):
+    sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+    sock.settimeout(seconds + CONNECT_TIMEOUT)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(b"%s %s %.1f %s\n" % (_MAGIC, b"D" if direction == "download" else b"U", seconds,
+                                        token.encode()))
+    return sock
+
+
+def _mbps(n_bytes, seconds):
+    return round(n_bytes * 8 / seconds / 1_000_000, 2) if seconds > 0 else 0.0
+
+
+def measure(host: str, port: int, direction: str = "download", streams: int = THROUGHPUT_STREAMS,
+            duration: float = THROUGHPUT_DURATION, warmup: float = THROUGHPUT_WARMUP,
+            token: str = THROUGHPUT_TOKEN) -> dict:
+    """
+    Runs `streams` parallel TCP streams to a throughput server for warmup + duration
+    seconds. Per-second samples are kept; the warm-up ones (TCP slow start, Wi-Fi
+    rate adaptation) are reported but left out of the result.
+    """
+    if direction not in ("download", "upload"):
+        raise ValueError("direction must be 'download' or 'upload'")
+    streams = max(1, min(int(streams), MAX_STREAMS))
+    duration = max(SAMPLE_INTERVAL, min(float(duration), MAX_DURATION))
+    warmup = max(0.0, min(float(warmup), MAX_DURATION - duration))
+    total_seconds = warmup + duration
+
+    sockets = []
+    try:
+        for _ in range(streams):
+            sockets.append(_open_stream(host, port, direction, total_seconds + 1, token))
+    except OSError:
+        for sock in sockets:
+            sock.close()
+        raise
+
+    counters = [0] * streams
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=_stream_worker, args=(sock, direction, counters, i, stop), daemon=True)
+        for i, sock in enumerate(sockets)
+    ]
+
+    samples = []
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+
+    # відлік по секундах; після прогріву запам'ятовуємо точку відліку для результату
+    previous_total, previous_t = 0, start
+    warm_total, warm_t, warm_streams = 0, start, [0] * streams
+    next_tick = start + SAMPLE_INTERVAL
+    while True:
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+        now = time.perf_counter()
+        snapshot = list(counters)
+        total = sum(snapshot)
+        elapsed = now - start
+        # межі вимірів - за розкладом тіків, а не за фактичним часом пробудження
+        tick = (len(samples) + 1) * SAMPLE_INTERVAL
+        in_warmup = tick <= warmup + 1e-6
+        samples.append({
+            "t": round(elapsed, 2),
+            "mbps": _mbps(total - previous_total, now - previous_t),
+            "warmup": in_warmup,
+        })
+        if in_warmup:
+            warm_total, warm_t, warm_streams = total, now, snapshot
+        previous_total, previous_t = total, now
+        if tick >= total_seconds - 1e-6:
+            break
+        next_tick += SAMPLE_INTERVAL
+
+    stop.set()
+    for sock in sockets:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+    for worker in workers:
+        worker.join(CONNECT_TIMEOUT)
+
+    measured = [s["mbps"] for s in samples if not s["warmup"]]
+    measured_seconds = previous_t - warm_t
+    return {
+        "target": f"{host}:{port}",
+        "direction": direction,
+        "streams": streams,
+        "duration": duration,
+        "warmup": warmup,
+        "mbps": _mbps(previous_total - warm_total, measured_seconds),
+        "per_stream_mbps": [_mbps(snapshot[i] - warm_streams[i], measured_seconds) for i in range(streams)],
+        "min_mbps": min(measured) if measured else None,
+        "max_mbps": max(measured) if measured else None,
+        "stdev_mbps": round(statistics.stdev(measured), 2) if len(measured) > 1 else 0.0,
+        "bytes": previous_total,
+        "samples": samples,
+    }
+
+
+def parse_target(spec: str):
+    host, _, port = spec.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected host:port, got {spec!r}")
+    return host.strip("[]"), int(port)
+
+
+# Один тест пропускної здатності за раз - вимір throughput або спідтест (speedtest_service
+# бере цей самий лок): паралельні тести ділять той самий канал і псують обидва результати
+link_test_lock = threading.Lock()
+
+
+def _reference_age(reference):
+    try:
+        return round(time.time() - datetime.fromisoformat(reference["timestamp"]).timestamp())
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def measure_segments(lan_target: str, wan_target: str = None, streams: int = THROUGHPUT_STREAMS,
+                     duration: float = THROUGHPUT_DURATION, warmup: float = THROUGHPUT_WARMUP,
+                     wan_reference=None, token: str = THROUGHPUT_TOKEN) -> dict:
+    """
+    Download and upload to a throughput server on the LAN (the Wi-Fi segment) and,
+    if wan_target is given, to one outside it (the WAN path). Without wan_target the
+    WAN figure comes from wan_reference - the last speedtest result, if it is not
+    older than THROUGHPUT_WAN_MAX_AGE.
+    Holds link_test_lock, so it never overlaps a speedtest or another measurement.
+    """
+    if not link_test_lock.acquire(blocking=False):
+        raise ThroughputBusy("Another bandwidth test (speedtest or throughput) is running")
+    try:
+        lan_host, lan_port = parse_target(lan_target)
+        wifi = {
+            direction: measure(lan_host, lan_port, direction, streams, duration, warmup, token)
+            for direction in ("download", "upload")
+        }
+        wan = None
+        if wan_target:
+            wan_host, wan_port = parse_target(wan_target)
+            wan = {"source": "throughput", "target": wan_target}
+            for direction in ("download", "upload"):
+                wan[direction] = measure(wan_host, wan_port, direction, streams, duration, warmup, token)["mbps"]
+        elif wan_reference:
+            age = _reference_age(wan_reference)
+            if age is not None and age <= THROUGHPUT_WAN_MAX_AGE:
+                wan = {"source": "speedtest", "timestamp": wan_reference.get("timestamp"), "age_s": age,
+                       "download": wan_reference.get("download"), "upload": wan_reference.get("upload")}
+    finally:
+        link_test_lock.release()
+
+    bottleneck = None
+    if wan and wan.get("download"):
+        bottleneck = "wifi" if wifi["download"]["mbps"] <= wan["download"] * WIFI_BOTTLENECK_MARGIN else "wan"
+
+    return {
+        "wifi": {
+            "download_mbps": wifi["download"]["mbps"],
+            "upload_mbps": wifi["upload"]["mbps"],
+            "details": wifi,
+        },
+        "wan": wan,
+        "bottleneck": bottleneck,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the throughput server")
+    serve.add_argument("--host", default=THROUGHPUT_SERVER_HOST)
+    serve.add_argument("--port", type=int, default=THROUGHPUT_SERVER_PORT or 5201)
+    serve.add_argument("--token", default=THROUGHPUT_TOKEN)
+    run = sub.add_parser("run", help="measure against a throughput server")
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=THROUGHPUT_SERVER_PORT or 5201)
+    run.add_argument("--direction", choices=["download", "upload"], default="download")
+    run.add_argument("--streams", type=int, default=THROUGHPUT_STREAMS)
+    run.add_argument("--duration", type=float, default=THROUGHPUT_DURATION)
+    run.add_argument("--warmup", type=float, default=THROUGHPUT_WARMUP)
+    run.add_argument("--token", default=THROUGHPUT_TOKEN)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = ThroughputServer(args.host, args.port, args.token)
+        print(f"Throughput server on {args.host}:{server.start()}", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    result = measure(args.host, args.port, args.direction, args.streams, args.duration, args.warmup, args.token)
+    for sample in result["samples"]:
+        print(f"{sample['t']:6.2f}s {sample['mbps']:10.2f} Mbps{'  (warm-up)' if sample['warmup'] else ''}")
+    print(json.dumps({k: v for k, v in result.items() if k != "samples"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
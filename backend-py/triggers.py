@@ -1,11 +1,65 @@
+import threading
+import time
+
+from channel_analysis import analyze_channels, congestion_alerts
 from notification_service import add_notification, NotificationCategory, NotificationSeverity
 
-def check_scan_results(networks_list):
+
+class AlertCooldown:
+    """
+    Remembers when each key was last alerted about. Expired keys are dropped as
+    new ones come in, so the table holds only keys alerted within the cooldown;
+    safe to use from the scheduler and request threads at once.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._alerted = {}      # key -> time.monotonic(), у порядку сповіщень
+        self._lock = threading.Lock()
+
+    def ready(self, key, now=None) -> bool:
+        """True (and the key is marked as alerted) if it was not alerted within the cooldown."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # ключі лежать у порядку часу сповіщення - прострочені завжди на початку
+            while self._alerted:
+                oldest = next(iter(self._alerted))
+                if now - self._alerted[oldest] < self.seconds:
+                    break
+                del self._alerted[oldest]
+            if key in self._alerted:
+                return False
+            self._alerted[key] = now
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._alerted)
+
+
+# Секунди між однаковими сповіщеннями про перевантаження каналу
+CONGESTION_ALERT_COOLDOWN = 3600
+_congestion_cooldown = AlertCooldown(CONGESTION_ALERT_COOLDOWN)
+
+# Про ту саму відкриту мережу (BSSID) - не частіше, ніж раз на стільки секунд
+OPEN_NETWORK_ALERT_COOLDOWN = 24 * 3600
+_open_network_cooldown = AlertCooldown(OPEN_NETWORK_ALERT_COOLDOWN)
+
+def check_scan_results(networks_list, current_bssid=None):
     """
     Аналізує список мереж і створює сповіщення, якщо є проблеми.
+    Повертає аналіз каналів (channel_analysis.analyze_channels).
     """
     # 1. Перевірка на відкриті мережі (Security)
-    open_networks = [n for n in networks_list if "Open" in n.get('security', '')]
+    # фонове сканування повторює ті самі мережі кожні кілька секунд - сповіщаємо лише про нові
+    now = time.monotonic()
+    open_networks = []
+    for n in networks_list:
+        if "Open" not in (n.get('security') or ''):
+            continue
+        key = (n.get('bssid') or n.get('ssid') or '').lower()
+        if _open_network_cooldown.ready(key, now):
+            open_networks.append(n)
     if open_networks:
         names = ", ".join([n.get('ssid', 'Hidden') for n in open_networks[:3]])
         add_notification(
@@ -16,17 +70,19 @@ def check_scan_results(networks_list):
         )
 
     # 2. Перевірка на перевантаження каналів (Wi-Fi)
-    # Спрощена логіка: якщо більше 5 мереж на одному каналі
-    channels = [n.get('channel') for n in networks]
-    for ch in set(channels):
-        count = channels.count(ch)
-        if count > 5:
-            add_notification(
-                NotificationCategory.WIFI,
-                "Channel Congestion",
-                f"Channel {ch} is very crowded ({count} networks). Consider switching.",
-                NotificationSeverity.WARNING
-            )
+    # Перекриття каналів з урахуванням сили сигналу - див. channel_analysis
+    analysis = analyze_channels(networks_list, current_bssid)
+    for key, title, description in congestion_alerts(analysis):
+        # про той самий канал - не частіше, ніж раз на CONGESTION_ALERT_COOLDOWN
+        if not _congestion_cooldown.ready(key, now):
+            continue
+        add_notification(
+            NotificationCategory.WIFI,
+            title,
+            description,
+            NotificationSeverity.WARNING
+        )
+    return analysis
 
 def check_speedtest_result(download, upload, ping):
     """
@@ -48,4 +104,23 @@ def check_speedtest_result(download, upload, ping):
             "High Latency Detected",
             f"Ping is {ping} ms. This may affect online gaming and calls.",
             NotificationSeverity.WARNING
-        )
\ No newline at end of file
+        )
+
+def check_probe_result(result):
+    """
+    Сповіщення за результатом latency_probe: початок і кінець обриву зв'язку.
+    """
+    if result["status"] == "down" and result.get("previous_status") != "down":
+        add_notification(
+            NotificationCategory.INTERNET,
+            "Internet Connection Lost",
+            f"None of the probe targets answered ({', '.join(t['target'] for t in result['targets'])}).",
+            NotificationSeverity.CRITICAL
+        )
+    elif result["status"] != "down" and result.get("previous_status") == "down":
+        add_notification(
+            NotificationCategory.INTERNET,
+            "Internet Connection Restored",
+            f"Targets answer again, latency {result['latency_ms']} ms.",
+            NotificationSeverity.INFO
+        )
@@ -0,0 +1,122 @@
+import re
+import sys
+import threading
+from functools import lru_cache
+
+UNKNOWN_VENDOR = "Unknown"
+VENDOR_CACHE_SIZE = 4096
+
+_MAC_SEPARATORS = re.compile(r"[-:.]")
+
+
+class OUIIndex:
+    """
+    Compact MAC prefix -> vendor index built from the manuf database on first use.
+
+    Prefixes are grouped by length (/24 OUIs, /28 MA-M, /36 MA-S, ...), so a lookup
+    is one dict probe per prefix length that actually exists in the database instead
+    of manuf's 48. Results are memoized per OUI; OUIs that are split into longer
+    prefixes are memoized per /36 block instead.
+    """
+
+    def __init__(self, manuf_path=None, cache_size: int = VENDOR_CACHE_SIZE):
+        self._manuf_path = manuf_path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._tables = []             # [(shift, {prefix: vendor})], найдовші префікси першими
+        self._subdivided = set()      # OUI, всередині яких є /25../36 префікси
+        self._fine = set()            # OUI з префіксами, довшими за /36 (одиниці)
+        self._lookup_prefix = lru_cache(maxsize=cache_size)(self._lookup_prefix_uncached)
+
+    def _load(self):
+        path = self._manuf_path
+        if path is None:
+            from manuf import manuf
+            path = manuf.MacParser.get_packaged_manuf_file_path()
+
+        by_bits = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] == "#":
+                    continue
+                fields = [field.strip() for field in line.replace("\t\t", "\t").split("\t")]
+                if len(fields) < 2:
+                    continue
+
+                parts = fields[0].split("/")
+                digits = _MAC_SEPARATORS.sub("", parts[0])
+                bits = 4 * len(digits)
+                if len(parts) > 1:
+                    bits = min(bits, int(parts[1]))
+
+                prefix = (int(digits, 16) << (48 - 4 * len(digits))) >> (48 - bits)
+                # однакові назви виробників зберігаємо одним об'єктом
+                by_bits.setdefault(bits, {})[prefix] = sys.intern(fields[1])
+
+                if bits > 36:
+                    self._fine.add(prefix >> (bits - 24))
+                elif bits > 24:
+                    self._subdivided.add(prefix >> (bits - 24))
+
+        self._tables = [(48 - bits, by_bits[bits]) for bits in sorted(by_bits, reverse=True)]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                try:
+                    self._load()
+                except Exception as e:
+                    # без бази всі виробники "Unknown", але не перечитуємо файл на кожен запит
+                    print(f"Warning: Manuf DB load failed: {e}")
+                    self._tables = []
+                self._loaded = True
+
+    def _search(self, mac_int: int) -> str:
+        for shift, table in self._tables:
+            vendor = table.get(mac_int >> shift)
+            if vendor is not None:
+                return vendor
+        return UNKNOWN_VENDOR
+
+    def _lookup_prefix_uncached(self, prefix: int, shift: int) -> str:
+        return self._search(prefix << shift)
+
+    def lookup(self, mac) -> str:
+        if not mac:
+            return UNKNOWN_VENDOR
+        try:
+            digits = mac.replace(":", "").replace("-", "").replace(".", "")
+            if len(digits) != 12:
+                return UNKNOWN_VENDOR
+            mac_int = int(digits, 16)
+        except (TypeError, ValueError):
+            return UNKNOWN_VENDOR
+
+        self._ensure_loaded()
+
+        oui = mac_int >> 24
+        if oui in self._fine:
+            return self._search(mac_int)
+        if oui in self._subdivided:
+            # MA-M / MA-S блоки - кешуємо по /36
+            return self._lookup_prefix(mac_int >> 12, 12)
+        return self._lookup_prefix(oui, 24)
+
+    def cache_info(self) -> dict:
+        info = self._lookup_prefix.cache_info()
+        return {"loaded": self._loaded, "hits": info.hits, "misses": info.misses,
+                "size": info.currsize, "maxsize": info.maxsize}
+
+
+vendor_index = OUIIndex()
+
+
+def get_vendor(bssid) -> str:
+    try:
+        return vendor_index.lookup(bssid)
+    except Exception as e:
+        print(f"Vendor lookup failed: {e}")
+        return UNKNOWN_VENDOR
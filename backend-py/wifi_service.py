@@ -1,27 +1,19 @@
 import math
+import os
 import re
 import subprocess
+import threading
 import time
 import platform
 import shutil
+from functools import lru_cache
 
-import pywifi
-from manuf import manuf
+import numpy as np
 
+from link_state import current_link, link_fingerprint
+from scan_backends import get_scan_backend, get_scan_timing_stats
 from triggers import check_scan_results
-
-try:
-    p = manuf.MacParser(update=False)
-except Exception as e:
-    print(f"Warning: Manuf DB load failed: {e}")
-    p = None
-
-def get_vendor(bssid):
-    if not p: return "Unknown"
-    try:
-        return p.get_manuf(bssid) or "Unknown"
-    except:
-        return "Unknown"
+from vendor_lookup import get_vendor, vendor_index
 
 def calculate_distance(rssi, freq_mhz):
     """FSPL формула для відстані"""
@@ -85,18 +77,145 @@ def get_wifi_details(freq_mhz: int):
         return 0, f"{freq} MHz"
 
 
-def get_current_wifi():
+# Кешуємо виправлені SSID: ті самі мережі приходять у кожному скані
+_fix_encoding_cached = lru_cache(maxsize=2048)(fix_encoding)
+
+
+class ScanRow:
+    """One enriched scan entry; as_dict() gives the JSON shape the API returns."""
+
+    __slots__ = ("ssid", "bssid", "rssi", "channel", "band", "security", "quality", "distance", "vendor", "width")
+
+    def __init__(self, ssid, bssid, rssi, channel, band, security, quality, distance, vendor, width=None):
+        self.ssid = ssid
+        self.bssid = bssid
+        self.rssi = rssi
+        self.channel = channel
+        self.band = band
+        self.security = security
+        self.quality = quality
+        self.distance = distance
+        self.vendor = vendor
+        self.width = width
+
+    def as_dict(self) -> dict:
+        return {
+            "ssid": self.ssid,
+            "bssid": self.bssid,
+            "rssi": self.rssi,
+            "channel": self.channel,
+            "band": self.band,
+            "security": self.security,
+            "quality": self.quality,
+            "distance": self.distance,
+            "vendor": self.vendor,
+            "width": self.width,
+        }
+
+
+def _as_float_array(values):
+    """Numbers -> float64 array, anything unparsable -> NaN (як except у скалярних функціях)."""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def enrich_scan(raw_rows):
+    """
+    Batched version of the per-row helpers above. raw_rows are
+    (ssid, bssid, signal, freq, security[, width]) tuples (scan_backends.RawNetwork);
+    channel, band, quality and FSPL distance are computed for the whole scan at once.
+    Returns a list of ScanRow.
+    """
+    if not raw_rows:
+        return []
+
+    columns = list(zip(*raw_rows))
+    ssids, bssids, signals, freqs, securities = columns[:5]
+    widths = columns[5] if len(columns) > 5 else [None] * len(raw_rows)
+    rssi = _as_float_array(signals)
+    freq_raw = _as_float_array(freqs)
 
+    # get_wifi_details: частоту можуть віддати в кГц
+    freq = np.where(freq_raw > 10000, np.floor_divide(freq_raw, 1000), freq_raw)
+    freq = np.nan_to_num(np.trunc(freq), nan=0.0)
+    is_24 = (freq >= 2412) & (freq <= 2484)
+    is_5 = (freq >= 5180) & (freq <= 5825)
+    is_6 = (freq >= 5925) & (freq <= 7125)
+    channel = np.select(
+        [freq == 2484, is_24, is_5, is_6],
+        [14, (freq - 2407) // 5, (freq - 5000) // 5, (freq - 5930) // 5],
+        default=0
+    ).astype(np.int64)
 
+    # calculate_quality
+    rssi_int = np.trunc(rssi)
+    quality = np.clip(2 * (rssi_int + 100), 0, 100)
+    quality = np.where(np.isnan(quality), 0, quality).astype(np.int64)
+
+    # calculate_distance (FSPL) - як і раніше, з "сирою" частотою
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        exponent = (27.55 - 20 * np.log10(freq_raw) + np.abs(rssi)) / 20.0
+        distance = np.round(np.power(10.0, exponent), 2)
+    distance = np.where(np.isfinite(distance), distance, 0.0)
+
+    bands = np.select([is_24, is_5, is_6], ["2.4", "5", "6"], default="").tolist()
+    for i, band in enumerate(bands):
+        if not band:
+            bands[i] = f"{int(freq[i])} MHz" if freq_raw[i] == freq_raw[i] else "Unknown"
+
+    # .tolist() одразу дає int/float Python - без numpy-скалярів у JSON
+    rows = [
+        ScanRow(_fix_encoding_cached(ssid), bssid, signal, ch, band, security, q, dist, get_vendor(bssid), width)
+        for ssid, bssid, signal, security, ch, band, q, dist, width in zip(
+            ssids, bssids, signals, securities, channel.tolist(), bands, quality.tolist(), distance.tolist(), widths
+        )
+    ]
+    return rows
+
+
+# Скільки секунд тримаємо поточне підключення в кеші (зміна лінку скидає кеш раніше)
+CURRENT_WIFI_TTL = float(os.getenv("CURRENT_WIFI_TTL", "5"))
+
+_current_wifi = {"value": None, "at": None, "fingerprint": None}
+_current_wifi_lock = threading.Lock()
+
+
+def get_current_wifi():
+    """Current connection; cached for CURRENT_WIFI_TTL, on Linux dropped as soon as the link changes."""
     system = platform.system()
-    
+    fingerprint = link_fingerprint() if system == "Linux" else None
+
+    with _current_wifi_lock:
+        cached_at = _current_wifi["at"]
+        if (cached_at is not None and time.monotonic() - cached_at <= CURRENT_WIFI_TTL
+                and _current_wifi["fingerprint"] == fingerprint):
+            value = _current_wifi["value"]
+            return dict(value) if value else value
+
     if system == "Windows":
-        return _get_wifi_windows()
+        value = _get_wifi_windows()
     elif system == "Linux":
-        return _get_wifi_linux()
+        value = _get_wifi_linux()
     else:
         print(f"Unsupported OS: {system}")
-        return None
+        value = None
+
+    with _current_wifi_lock:
+        _current_wifi.update(value=value, at=time.monotonic(), fingerprint=fingerprint)
+    return dict(value) if value else value
+
+
+def invalidate_current_wifi():
+    with _current_wifi_lock:
+        _current_wifi["at"] = None
 
 def _get_wifi_windows():
     try:
@@ -124,6 +243,15 @@ def _get_wifi_windows():
         return None
 
 def _get_wifi_linux():
+    # Спосіб 0: напряму з ядра (/proc, sysfs, nl80211) - без запуску процесів
+    try:
+        return current_link()
+    except OSError as e:
+        print(f"Kernel Wi-Fi lookup unavailable ({e}), falling back to iwconfig/nmcli")
+    return _get_wifi_linux_tools()
+
+
+def _get_wifi_linux_tools():
     try:
         # Спосіб 1: iwconfig 
         if shutil.which("iwconfig"):
@@ -172,54 +300,152 @@ def _get_wifi_linux():
 
 
 def scan_networks():
-    wifi = pywifi.PyWiFi()
-    
-    try:
-        iface = wifi.interfaces()[0]
-    except Exception as e:
-        print(f"Error getting interface: {e}")
-        return [] 
-
-    iface.scan()
-    print("Scanning... (waiting 3 seconds)")
-    time.sleep(3) 
+    backend = get_scan_backend()
+    if backend is None:
+        print("No Wi-Fi scan backend available (pywifi / iw); set SCAN_BACKEND=fake for fixtures")
+        return []
 
-    scan_results = iface.scan_results()
-    networks_list = []
-    
+    raw_rows = []
     seen_bssids = set()
 
-    for profile in scan_results:
-        if profile.bssid in seen_bssids:
+    for network in backend.scan():
+        # без рівня сигналу мережа не годиться ні для сортування, ні для історії
+        if network.bssid in seen_bssids or network.signal is None:
             continue
-        seen_bssids.add(profile.bssid)
-
-        security_types = []
-        for akm in profile.akm:
-            if akm == pywifi.const.AKM_TYPE_WPA2PSK: security_types.append("WPA2")
-            elif akm == pywifi.const.AKM_TYPE_WPAPSK: security_types.append("WPA")
-            elif akm == pywifi.const.AKM_TYPE_NONE: security_types.append("Open")
-        
-        freq_hz = profile.freq
-        channel, band = get_wifi_details(freq_hz)
-        clean_ssid = fix_encoding(profile.ssid)
-        
-        networks_list.append({
-            "ssid": clean_ssid,
-            "bssid": profile.bssid,
-            "rssi": profile.signal,
-            "channel": channel,
-            "band": band,
-            "security": " / ".join(security_types) or "Open",
-            "quality": calculate_quality(profile.signal),
-            "distance": calculate_distance(profile.signal, profile.freq),
-            "vendor": get_vendor(profile.bssid)
-        })
+        seen_bssids.add(network.bssid)
+        raw_rows.append(network)
 
+    networks_list = [row.as_dict() for row in enrich_scan(raw_rows)]
 
     try:
-        check_scan_results(networks_list)
+        # поточна точка доступу - щоб тригери порадили канал саме для неї (get_current_wifi кешований)
+        current = get_current_wifi() or {}
+        check_scan_results(networks_list, current_bssid=current.get("bssid"))
     except Exception as e:
         print(f"Error in notification triggers: {e}")
 
-    return sorted(networks_list, key=lambda x: x['rssi'], reverse=True)
\ No newline at end of file
+    return sorted(networks_list, key=lambda x: x['rssi'], reverse=True)
+
+
+# Скільки секунд результат сканування вважається свіжим
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "10"))
+
+
+class _ScanFlight:
+    """One in-progress hardware scan that several callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.scanned_at = None
+        self.error = None
+
+
+def _copy_rows(networks):
+    """Each caller gets its own row dicts, so nobody mutates the cached scan or stream state."""
+    return [dict(n) for n in networks]
+
+
+class ScanCoordinator:
+    """
+    Shares one radio between all callers: a fresh enough cached result is returned
+    as is, and concurrent callers that need a new scan wait for the same in-flight
+    scan instead of starting their own (single-flight).
+    """
+
+    def __init__(self, scan_fn, ttl: float = SCAN_CACHE_TTL):
+        self.ttl = ttl
+        self._scan_fn = scan_fn
+        self._lock = threading.Lock()
+        self._result = None
+        self._scanned_at = None        # time.time() для клієнтів
+        self._scanned_mono = None      # time.monotonic() для віку
+        self._flight = None
+        self._listeners = []
+        self._scans = 0
+        self._cache_hits = 0
+        self._joined = 0
+
+    def get(self, max_age=None):
+        """Returns (networks, scanned_at). max_age (seconds) overrides the TTL for this call."""
+        limit = self.ttl if max_age is None else max_age
+
+        with self._lock:
+            if self._result is not None and time.monotonic() - self._scanned_mono <= limit:
+                self._cache_hits += 1
+                return _copy_rows(self._result), self._scanned_at
+
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _ScanFlight()
+                self._scans += 1
+            else:
+                self._joined += 1
+
+        if leader:
+            try:
+                flight.result = self._scan_fn()
+                flight.scanned_at = time.time()
+                with self._lock:
+                    self._result = flight.result
+                    self._scanned_at = flight.scanned_at
+                    self._scanned_mono = time.monotonic()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._flight = None
+                flight.done.set()
+            # ті, хто чекав на скан, уже отримали результат - повільні слухачі їх не затримують
+            if flight.error is None:
+                self._notify(_copy_rows(flight.result), flight.scanned_at)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return _copy_rows(flight.result), flight.scanned_at
+
+    def add_listener(self, listener):
+        """
+        listener(networks, scanned_at) is called after every successful hardware scan,
+        once the callers waiting on it have been released. The listeners share one
+        copy of the rows.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, networks, scanned_at):
+        for listener in self._listeners:
+            try:
+                listener(networks, scanned_at)
+            except Exception as e:
+                print(f"Error in scan listener: {e}")
+
+    def invalidate(self):
+        with self._lock:
+            self._result = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = time.monotonic() - self._scanned_mono if self._result is not None else None
+            return {
+                "backend": getattr(get_scan_backend(), "name", None),
+                "durations": get_scan_timing_stats(),
+                "vendor_cache": vendor_index.cache_info(),
+                "ttl": self.ttl,
+                "scans": self._scans,
+                "cache_hits": self._cache_hits,
+                "joined_in_flight": self._joined,
+                "in_flight": self._flight is not None,
+                "age": round(age, 2) if age is not None else None,
+            }
+
+
+scan_coordinator = ScanCoordinator(scan_networks)
+
+
+def get_networks(max_age=None):
+    """Scan results through the shared coordinator (cached / single-flight)."""
+    networks, _ = scan_coordinator.get(max_age)
+    return networks